@@ -1,8 +1,8 @@
 from logging.config import fileConfig
-from sqlalchemy import engine_from_config
 from sqlalchemy import pool
 from alembic import context
 from app.db.models import Base
+from app.db.session import create_db_engine
 import os
 
 from dotenv import load_dotenv
@@ -31,10 +31,12 @@ def run_migrations_offline():
 
 
 def run_migrations_online():
-    connectable = engine_from_config(
-        config.get_section(config.config_ini_section, {}),
-        prefix="sqlalchemy.",
+    # Mesma fábrica da aplicação, sem pool e sem statement_timeout (migrações longas)
+    connectable = create_db_engine(
+        config.get_main_option("sqlalchemy.url"),
+        name="alembic",
         poolclass=pool.NullPool,
+        statement_timeout_ms=0,
     )
 
     with connectable.connect() as connection:
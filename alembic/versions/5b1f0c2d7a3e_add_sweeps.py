@@ -0,0 +1,58 @@
+"""Add sweeps
+
+Revision ID: 5b1f0c2d7a3e
+Revises: 3cd315445084
+Create Date: 2026-10-18 10:12:31.204518
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b1f0c2d7a3e'
+down_revision: Union[str, Sequence[str], None] = '3cd315445084'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('sweeps',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('ticker', sa.String(), nullable=False),
+    sa.Column('start_date', sa.Date(), nullable=False),
+    sa.Column('end_date', sa.Date(), nullable=False),
+    sa.Column('strategy_type', sa.String(), nullable=False),
+    sa.Column('param_grid', sa.JSON(), nullable=False),
+    sa.Column('initial_cash', sa.Float(), nullable=False),
+    sa.Column('commission', sa.Float(), nullable=False),
+    sa.Column('num_variants', sa.Integer(), nullable=True),
+    sa.Column('status', postgresql.ENUM('PENDING', 'RUNNING', 'COMPLETED', 'FAILED', name='backteststatus', create_type=False), nullable=True),
+    sa.Column('message', sa.String(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('sweep_results',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('sweep_id', sa.Integer(), nullable=False),
+    sa.Column('rank', sa.Integer(), nullable=False),
+    sa.Column('params', sa.JSON(), nullable=False),
+    sa.Column('total_return', sa.Float(), nullable=False),
+    sa.Column('sharpe', sa.Float(), nullable=False),
+    sa.Column('max_drawdown', sa.Float(), nullable=False),
+    sa.Column('num_trades', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['sweep_id'], ['sweeps.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_sweep_results_sweep_rank', 'sweep_results', ['sweep_id', 'rank'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_sweep_results_sweep_rank', table_name='sweep_results')
+    op.drop_table('sweep_results')
+    op.drop_table('sweeps')
@@ -0,0 +1,32 @@
+"""Backtest queue
+
+Revision ID: 8d2e4a9c1f07
+Revises: 5b1f0c2d7a3e
+Create Date: 2026-10-18 11:40:02.518330
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d2e4a9c1f07'
+down_revision: Union[str, Sequence[str], None] = '5b1f0c2d7a3e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        op.execute("ALTER TYPE backteststatus ADD VALUE IF NOT EXISTS 'CANCELLED'")
+    op.add_column('backtests', sa.Column('engine', sa.String(), server_default='backtrader', nullable=False))
+    op.create_index('ix_backtests_status_created', 'backtests', ['status', 'created_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_backtests_status_created', table_name='backtests')
+    op.drop_column('backtests', 'engine')
@@ -0,0 +1,30 @@
+"""Sweep heartbeat
+
+Revision ID: a2f7c41e9b36
+Revises: c3a8d5e17f42
+Create Date: 2026-10-18 23:59:54.418290
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a2f7c41e9b36'
+down_revision: Union[str, Sequence[str], None] = 'c3a8d5e17f42'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('sweeps', sa.Column('claimed_at', sa.DateTime(), nullable=True))
+    op.add_column('sweeps', sa.Column('heartbeat_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('sweeps', 'heartbeat_at')
+    op.drop_column('sweeps', 'claimed_at')
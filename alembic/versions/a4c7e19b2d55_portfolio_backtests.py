@@ -0,0 +1,28 @@
+"""Portfolio backtests
+
+Revision ID: a4c7e19b2d55
+Revises: 8d2e4a9c1f07
+Create Date: 2026-10-18 13:05:47.118902
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4c7e19b2d55'
+down_revision: Union[str, Sequence[str], None] = '8d2e4a9c1f07'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('backtests', sa.Column('tickers', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('backtests', 'tickers')
@@ -0,0 +1,48 @@
+"""Robustness analyses
+
+Revision ID: a93d5e0c7b14
+Revises: f4c1a7e93b08
+Create Date: 2026-10-18 23:58:02.417936
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a93d5e0c7b14'
+down_revision: Union[str, Sequence[str], None] = 'f4c1a7e93b08'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('robustness_analyses',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('backtest_id', sa.Integer(), nullable=False),
+    sa.Column('method', sa.String(), nullable=False),
+    sa.Column('source', sa.String(), nullable=False),
+    sa.Column('num_samples', sa.Integer(), nullable=False),
+    sa.Column('block_size', sa.Integer(), nullable=False),
+    sa.Column('noise_scale', sa.Float(), nullable=False),
+    sa.Column('seed', sa.BigInteger(), nullable=True),
+    sa.Column('status', postgresql.ENUM('PENDING', 'RUNNING', 'COMPLETED', 'FAILED', 'CANCELLED', name='backteststatus', create_type=False), nullable=True),
+    sa.Column('message', sa.String(), nullable=True),
+    sa.Column('observed', sa.JSON(), nullable=True),
+    sa.Column('summary', sa.JSON(), nullable=True),
+    sa.Column('bands_blob', sa.LargeBinary(), nullable=True),
+    sa.ForeignKeyConstraint(['backtest_id'], ['backtests.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_robustness_analyses_backtest_id', 'robustness_analyses', ['backtest_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_robustness_analyses_backtest_id', table_name='robustness_analyses')
+    op.drop_table('robustness_analyses')
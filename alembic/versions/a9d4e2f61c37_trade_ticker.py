@@ -0,0 +1,28 @@
+"""Trade ticker
+
+Revision ID: a9d4e2f61c37
+Revises: f7a3d2c68e15
+Create Date: 2026-10-18 23:59:59.804215
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a9d4e2f61c37'
+down_revision: Union[str, Sequence[str], None] = 'f7a3d2c68e15'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('trades', sa.Column('ticker', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('trades', 'ticker')
@@ -0,0 +1,40 @@
+"""ML models
+
+Revision ID: b5e27c4f9d31
+Revises: a93d5e0c7b14
+Create Date: 2026-10-18 23:59:40.118274
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b5e27c4f9d31'
+down_revision: Union[str, Sequence[str], None] = 'a93d5e0c7b14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('ml_models',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('model_type', sa.String(), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('path', sa.String(), nullable=False),
+    sa.Column('features', sa.JSON(), nullable=False),
+    sa.Column('feature_version', sa.String(), nullable=True),
+    sa.Column('params', sa.JSON(), nullable=True),
+    sa.Column('metrics', sa.JSON(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('model_type', 'version', name='uq_ml_models_type_version')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('ml_models')
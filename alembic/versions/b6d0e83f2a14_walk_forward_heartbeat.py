@@ -0,0 +1,30 @@
+"""Walk-forward heartbeat
+
+Revision ID: b6d0e83f2a14
+Revises: a2f7c41e9b36
+Create Date: 2026-10-18 23:59:56.702915
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b6d0e83f2a14'
+down_revision: Union[str, Sequence[str], None] = 'a2f7c41e9b36'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('walk_forwards', sa.Column('claimed_at', sa.DateTime(), nullable=True))
+    op.add_column('walk_forwards', sa.Column('heartbeat_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('walk_forwards', 'heartbeat_at')
+    op.drop_column('walk_forwards', 'claimed_at')
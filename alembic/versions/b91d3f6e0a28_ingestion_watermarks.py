@@ -0,0 +1,45 @@
+"""Ingestion watermarks
+
+Revision ID: b91d3f6e0a28
+Revises: a4c7e19b2d55
+Create Date: 2026-10-18 14:22:09.403117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b91d3f6e0a28'
+down_revision: Union[str, Sequence[str], None] = 'a4c7e19b2d55'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('ingestion_watermarks',
+    sa.Column('symbol_id', sa.Integer(), nullable=False),
+    sa.Column('last_date', sa.Date(), nullable=True),
+    sa.Column('checked_until', sa.Date(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['symbol_id'], ['symbols.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('symbol_id')
+    )
+    # prices.id não tinha default: inserts sem id falhavam por NOT NULL
+    op.execute("CREATE SEQUENCE IF NOT EXISTS prices_id_seq")
+    op.execute("SELECT setval('prices_id_seq', COALESCE((SELECT MAX(id) FROM prices), 0) + 1, false)")
+    op.execute("ALTER TABLE prices ALTER COLUMN id SET DEFAULT nextval('prices_id_seq')")
+    op.execute(
+        "INSERT INTO ingestion_watermarks (symbol_id, last_date, checked_until, updated_at) "
+        "SELECT symbol_id, MAX(date), MAX(date) + 1, now() FROM prices GROUP BY symbol_id"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("ALTER TABLE prices ALTER COLUMN id DROP DEFAULT")
+    op.execute("DROP SEQUENCE IF EXISTS prices_id_seq")
+    op.drop_table('ingestion_watermarks')
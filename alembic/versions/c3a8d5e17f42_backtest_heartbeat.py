@@ -0,0 +1,30 @@
+"""Backtest heartbeat
+
+Revision ID: c3a8d5e17f42
+Revises: b5e27c4f9d31
+Create Date: 2026-10-18 23:59:52.604137
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3a8d5e17f42'
+down_revision: Union[str, Sequence[str], None] = 'b5e27c4f9d31'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('backtests', sa.Column('claimed_at', sa.DateTime(), nullable=True))
+    op.add_column('backtests', sa.Column('heartbeat_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('backtests', 'heartbeat_at')
+    op.drop_column('backtests', 'claimed_at')
@@ -0,0 +1,37 @@
+"""Indicator watermarks
+
+Revision ID: c5e8a2f41b93
+Revises: b91d3f6e0a28
+Create Date: 2026-10-18 19:45:31.207554
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5e8a2f41b93'
+down_revision: Union[str, Sequence[str], None] = 'b91d3f6e0a28'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('indicator_watermarks',
+    sa.Column('symbol_id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('params_hash', sa.String(), nullable=False),
+    sa.Column('last_date', sa.Date(), nullable=False),
+    sa.Column('state', sa.JSON(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['symbol_id'], ['symbols.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('symbol_id', 'name', 'params_hash')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('indicator_watermarks')
@@ -0,0 +1,34 @@
+"""Backtest result storage
+
+Revision ID: d7a3f0c86e21
+Revises: c5e8a2f41b93
+Create Date: 2026-10-18 21:12:08.431907
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7a3f0c86e21'
+down_revision: Union[str, Sequence[str], None] = 'c5e8a2f41b93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('backtest_results', sa.Column('num_bars', sa.Integer(), nullable=True))
+    op.add_column('backtest_results', sa.Column('equity_blob', sa.LargeBinary(), nullable=True))
+    op.create_index('ix_backtest_results_backtest_id', 'backtest_results', ['backtest_id'], unique=False)
+    op.create_index('ix_trades_backtest_id', 'trades', ['backtest_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_trades_backtest_id', table_name='trades')
+    op.drop_index('ix_backtest_results_backtest_id', table_name='backtest_results')
+    op.drop_column('backtest_results', 'equity_blob')
+    op.drop_column('backtest_results', 'num_bars')
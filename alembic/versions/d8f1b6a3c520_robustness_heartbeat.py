@@ -0,0 +1,30 @@
+"""Robustness heartbeat
+
+Revision ID: d8f1b6a3c520
+Revises: b6d0e83f2a14
+Create Date: 2026-10-18 23:59:58.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd8f1b6a3c520'
+down_revision: Union[str, Sequence[str], None] = 'b6d0e83f2a14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('robustness_analyses', sa.Column('claimed_at', sa.DateTime(), nullable=True))
+    op.add_column('robustness_analyses', sa.Column('heartbeat_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('robustness_analyses', 'heartbeat_at')
+    op.drop_column('robustness_analyses', 'claimed_at')
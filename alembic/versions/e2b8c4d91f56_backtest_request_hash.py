@@ -0,0 +1,30 @@
+"""Backtest request hash
+
+Revision ID: e2b8c4d91f56
+Revises: d7a3f0c86e21
+Create Date: 2026-10-18 22:03:47.918245
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2b8c4d91f56'
+down_revision: Union[str, Sequence[str], None] = 'd7a3f0c86e21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('backtests', sa.Column('request_hash', sa.String(length=64), nullable=True))
+    op.create_index('ix_backtests_request_hash', 'backtests', ['request_hash'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_backtests_request_hash', table_name='backtests')
+    op.drop_column('backtests', 'request_hash')
@@ -0,0 +1,32 @@
+"""Sweep result metrics
+
+Revision ID: e6c2a9f47b13
+Revises: d8f1b6a3c520
+Create Date: 2026-10-18 23:59:59.127406
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e6c2a9f47b13'
+down_revision: Union[str, Sequence[str], None] = 'd8f1b6a3c520'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+COLUMNS = ('cagr', 'sortino', 'calmar', 'win_rate', 'exposure', 'turnover')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for column in COLUMNS:
+        op.add_column('sweep_results', sa.Column(column, sa.Float(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for column in reversed(COLUMNS):
+        op.drop_column('sweep_results', column)
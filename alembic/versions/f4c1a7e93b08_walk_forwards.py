@@ -0,0 +1,49 @@
+"""Walk forwards
+
+Revision ID: f4c1a7e93b08
+Revises: e2b8c4d91f56
+Create Date: 2026-10-18 22:41:15.602381
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f4c1a7e93b08'
+down_revision: Union[str, Sequence[str], None] = 'e2b8c4d91f56'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('walk_forwards',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('ticker', sa.String(), nullable=False),
+    sa.Column('start_date', sa.Date(), nullable=False),
+    sa.Column('end_date', sa.Date(), nullable=False),
+    sa.Column('strategy_type', sa.String(), nullable=False),
+    sa.Column('param_grid', sa.JSON(), nullable=False),
+    sa.Column('train_bars', sa.Integer(), nullable=False),
+    sa.Column('test_bars', sa.Integer(), nullable=False),
+    sa.Column('anchored', sa.Boolean(), nullable=False),
+    sa.Column('objective', sa.String(), nullable=False),
+    sa.Column('initial_cash', sa.Float(), nullable=False),
+    sa.Column('commission', sa.Float(), nullable=False),
+    sa.Column('status', postgresql.ENUM('PENDING', 'RUNNING', 'COMPLETED', 'FAILED', 'CANCELLED', name='backteststatus', create_type=False), nullable=True),
+    sa.Column('message', sa.String(), nullable=True),
+    sa.Column('folds', sa.JSON(), nullable=True),
+    sa.Column('metrics', sa.JSON(), nullable=True),
+    sa.Column('equity_blob', sa.LargeBinary(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('walk_forwards')
@@ -0,0 +1,28 @@
+"""Symbol prices version
+
+Revision ID: f7a3d2c68e15
+Revises: e6c2a9f47b13
+Create Date: 2026-10-18 23:59:59.604817
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f7a3d2c68e15'
+down_revision: Union[str, Sequence[str], None] = 'e6c2a9f47b13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('symbols', sa.Column('prices_version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('symbols', 'prices_version')
@@ -0,0 +1,63 @@
+from datetime import date
+from typing import List, Optional
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db import models
+
+# Versões assíncronas das consultas de leitura de crud.py, usadas pelas rotas GET.
+
+async def get_symbol_by_ticker(db: AsyncSession, ticker: str) -> Optional[models.Symbol]:
+    result = await db.execute(select(models.Symbol).where(models.Symbol.ticker == ticker).limit(1))
+    return result.scalars().first()
+
+
+async def get_prices_by_symbol(
+    db: AsyncSession, symbol_id: int, start_date: date, end_date: date,
+    after: Optional[date] = None, limit: Optional[int] = None,
+) -> List[models.Price]:
+    stmt = select(models.Price).where(
+        models.Price.symbol_id == symbol_id,
+        models.Price.date >= start_date,
+        models.Price.date <= end_date,
+    )
+    if after is not None:
+        stmt = stmt.where(models.Price.date > after)
+    stmt = stmt.order_by(models.Price.date.asc())
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    result = await db.execute(stmt)
+    return list(result.scalars())
+
+
+async def get_prices_by_ticker(db: AsyncSession, ticker: str, start_date: date, end_date: date,
+                               after: Optional[date] = None, limit: Optional[int] = None):
+    symbol = await get_symbol_by_ticker(db, ticker)
+    if not symbol:
+        return []
+    return await get_prices_by_symbol(db, symbol.id, start_date, end_date, after, limit)
+
+
+async def get_backtest_results(db: AsyncSession, backtest_id: int) -> Optional[models.BacktestResult]:
+    result = await db.execute(
+        select(models.BacktestResult).where(models.BacktestResult.backtest_id == backtest_id).limit(1)
+    )
+    return result.scalars().first()
+
+
+async def get_trades(db: AsyncSession, backtest_id: int) -> List[models.Trade]:
+    result = await db.execute(
+        select(models.Trade).where(models.Trade.backtest_id == backtest_id).order_by(models.Trade.entry_date)
+    )
+    return list(result.scalars())
+
+
+async def get_daily_positions(db: AsyncSession, backtest_id: int):
+    """Linhas (date, equity, cash, position_size, drawdown) em ordem de data."""
+    p = models.DailyPosition
+    result = await db.execute(
+        select(p.date, p.equity, p.cash, p.position_size, p.drawdown)
+        .where(p.backtest_id == backtest_id)
+        .order_by(p.date)
+    )
+    return result.all()
@@ -0,0 +1,64 @@
+import io
+from typing import List, Optional, Sequence
+import pandas as pd
+
+COPY_CHUNK_SIZE = 500_000
+
+def _dbapi_cursor(db):
+    # Conexão DBAPI da sessão (psycopg 3 ou psycopg2), dentro da transação corrente
+    return db.connection().connection.dbapi_connection.cursor()
+
+def copy_frame(cursor, table: str, frame: pd.DataFrame):
+    """COPY ... FROM STDIN em CSV. Compatível com psycopg 3 (cursor.copy) e psycopg2 (copy_expert)."""
+    buf = io.StringIO()
+    frame.to_csv(buf, index=False, header=False, na_rep="")
+    sql = f"COPY {table} ({', '.join(frame.columns)}) FROM STDIN WITH (FORMAT csv)"
+    if hasattr(cursor, "copy"):
+        with cursor.copy(sql) as copy:
+            copy.write(buf.getvalue())
+    else:
+        buf.seek(0)
+        cursor.copy_expert(sql, buf)
+
+def copy_insert(db, table: str, frame: pd.DataFrame, chunk_size: int = COPY_CHUNK_SIZE) -> int:
+    """COPY direto na tabela destino, para linhas sem chave de conflito (ex.: daily_positions)."""
+    cursor = _dbapi_cursor(db)
+    for start in range(0, len(frame), chunk_size):
+        copy_frame(cursor, table, frame.iloc[start:start + chunk_size])
+    return len(frame)
+
+def copy_upsert(db, table: str, frame: pd.DataFrame, conflict_columns: Sequence[str],
+                update_columns: Optional[List[str]] = None, chunk_size: int = COPY_CHUNK_SIZE) -> int:
+    """
+    Carrega `frame` via COPY em uma tabela temporária e mescla no destino com
+    INSERT ... ON CONFLICT. Com `update_columns` vazio usa DO NOTHING. Roda na transação
+    da sessão `db`; o commit fica com o chamador. Retorna o número de linhas inseridas/atualizadas.
+    """
+    if frame.empty:
+        return 0
+    columns = list(frame.columns)
+    column_list = ", ".join(columns)
+    staging = f"_staging_{table}"
+
+    if update_columns:
+        action = "DO UPDATE SET " + ", ".join(f"{c} = EXCLUDED.{c}" for c in update_columns)
+    else:
+        action = "DO NOTHING"
+    merge_sql = (
+        f"INSERT INTO {table} ({column_list}) SELECT {column_list} FROM {staging} "
+        f"ON CONFLICT ({', '.join(conflict_columns)}) {action}"
+    )
+
+    # ON CONFLICT não aceita a mesma chave duas vezes no mesmo comando
+    frame = frame.drop_duplicates(subset=list(conflict_columns), keep="last")
+
+    cursor = _dbapi_cursor(db)
+    cursor.execute(f"DROP TABLE IF EXISTS {staging}")
+    cursor.execute(f"CREATE TEMP TABLE {staging} ON COMMIT DROP AS SELECT {column_list} FROM {table} WITH NO DATA")
+    affected = 0
+    for start in range(0, len(frame), chunk_size):
+        copy_frame(cursor, staging, frame.iloc[start:start + chunk_size])
+        cursor.execute(merge_sql)
+        affected += cursor.rowcount
+        cursor.execute(f"TRUNCATE {staging}")
+    return affected
@@ -28,6 +28,14 @@ def get_symbol_by_ticker(db: Session, ticker: str) -> Optional[models.Symbol]:
     return db.query(models.Symbol).filter(models.Symbol.ticker == ticker).first()
 
 
+def get_or_create_symbol(db: Session, ticker: str) -> models.Symbol:
+    """Símbolo do ticker; se ainda não existe, é cadastrado com o próprio ticker como nome."""
+    symbol = get_symbol_by_ticker(db, ticker)
+    if symbol is None:
+        symbol = create_symbol(db, symbol_schemas.SymbolCreate(ticker=ticker, name=ticker, exchange="", currency=""))
+    return symbol
+
+
 def get_symbols(db: Session, skip: int = 0, limit: int = 100) -> List[models.Symbol]:
     return db.query(models.Symbol).offset(skip).limit(limit).all()
 
@@ -49,18 +57,24 @@ def bulk_insert_prices(db: Session, prices: List[models.Price]):
 
 
 def get_prices_by_symbol(
-    db: Session, symbol_id: int, start_date: date, end_date: date
+    db: Session, symbol_id: int, start_date: date, end_date: date,
+    after: Optional[date] = None, limit: Optional[int] = None,
 ) -> List[models.Price]:
-    return (
+    # Paginação por chave: `after` é a última data da página anterior
+    query = (
         db.query(models.Price)
         .filter(
             models.Price.symbol_id == symbol_id,
             models.Price.date >= start_date,
             models.Price.date <= end_date,
         )
-        .order_by(models.Price.date.asc())
-        .all()
     )
+    if after is not None:
+        query = query.filter(models.Price.date > after)
+    query = query.order_by(models.Price.date.asc())
+    if limit is not None:
+        query = query.limit(limit)
+    return query.all()
 
 
 ##BACKTESTS
@@ -115,9 +129,10 @@ def get_backtest_results(db: Session, backtest_id: int) -> Optional[models.Backt
         .first()
     )
     
-def get_prices_by_ticker(db: Session, ticker: str, start_date: date, end_date: date):
+def get_prices_by_ticker(db: Session, ticker: str, start_date: date, end_date: date,
+                         after: Optional[date] = None, limit: Optional[int] = None):
     symbol = get_symbol_by_ticker(db, ticker)
     if not symbol:
         return []
-    return get_prices_by_symbol(db, symbol.id, start_date, end_date)
+    return get_prices_by_symbol(db, symbol.id, start_date, end_date, after, limit)
 
@@ -1,5 +1,5 @@
 from sqlalchemy import (
-    Column, Integer, BigInteger, String, Date, DateTime, Float, JSON, Enum, ForeignKey, Index, Numeric, UniqueConstraint, PrimaryKeyConstraint
+    Column, Integer, BigInteger, String, Date, DateTime, Float, JSON, Enum, ForeignKey, Index, Numeric, UniqueConstraint, PrimaryKeyConstraint, Sequence, LargeBinary, Boolean, text
 )
 from sqlalchemy.orm import declarative_base, relationship
 from datetime import datetime
@@ -12,6 +12,7 @@ class BacktestStatus(str, enum.Enum):
     RUNNING = "RUNNING"
     COMPLETED = "COMPLETED"
     FAILED = "FAILED"
+    CANCELLED = "CANCELLED"
 
 class TradeSide(str, enum.Enum):
     LONG = "LONG"
@@ -32,6 +33,7 @@ class Symbol(Base):
     exchange = Column(String, nullable=False)
     currency = Column(String, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
+    prices_version = Column(Integer, nullable=False, default=0, server_default="0")  # +1 a cada persist_prices
 
     prices = relationship("Price", back_populates="symbol", cascade="all, delete-orphan")
     indicators = relationship("Indicator", back_populates="symbol", cascade="all, delete-orphan")
@@ -50,7 +52,8 @@ class Price(Base):
         {"postgresql_partition_by": "HASH (symbol_id)"},
     )
 
-    id = Column(Integer)
+    # Default no servidor: o COPY em massa (app/db/bulk.py) não passa pelo ORM
+    id = Column(Integer, Sequence("prices_id_seq"), server_default=text("nextval('prices_id_seq')"), autoincrement=True)
     
     symbol_id = Column(Integer, ForeignKey("symbols.id", ondelete="CASCADE"), nullable=False)
     
@@ -84,11 +87,14 @@ class Backtest(Base):
     __tablename__ = "backtests"
     __table_args__ = (
         Index("ix_backtests_ticker_created", "ticker", "created_at"),
+        Index("ix_backtests_status_created", "status", "created_at"),
+        Index("ix_backtests_request_hash", "request_hash"),
     )
 
     id = Column(Integer, primary_key=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     ticker = Column(String, nullable=False)
+    tickers = Column(JSON, nullable=True)  # preenchido em backtests de carteira
     start_date = Column(Date, nullable=False)
     end_date = Column(Date, nullable=False)
     strategy_type = Column(String, nullable=False)
@@ -96,8 +102,12 @@ class Backtest(Base):
     initial_cash = Column(Float, nullable=False)
     commission = Column(Float, nullable=False)
     timeframe = Column(String, nullable=False)
+    engine = Column(String, nullable=False, default="backtrader", server_default="backtrader")
     status = Column(Enum(BacktestStatus), default=BacktestStatus.PENDING)
     message = Column(String, nullable=True)
+    request_hash = Column(String(64), nullable=True)  # pedido + dados + código (result_cache)
+    claimed_at = Column(DateTime, nullable=True)    # reservado pelo executor
+    heartbeat_at = Column(DateTime, nullable=True)  # último sinal de vida do executor que o roda
 
     trades = relationship("Trade", back_populates="backtest", cascade="all, delete-orphan")
     daily_positions = relationship("DailyPosition", back_populates="backtest", cascade="all, delete-orphan")
@@ -106,17 +116,137 @@ class Backtest(Base):
     results = relationship("BacktestResult", back_populates="backtest")
 class BacktestResult(Base):
     __tablename__ = "backtest_results"
+    __table_args__ = (
+        Index("ix_backtest_results_backtest_id", "backtest_id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     backtest_id = Column(Integer, ForeignKey("backtests.id"), nullable=False)
     metrics = Column(JSON, nullable=True)
     trades = Column(JSON, nullable=True)
+    num_bars = Column(Integer, nullable=True)
+    equity_blob = Column(LargeBinary, nullable=True)  # curva .npz comprimida (BACKTEST_EQUITY_STORAGE=blob)
     created_at = Column(DateTime, default=datetime.utcnow)
 
     backtest = relationship("Backtest", back_populates="results")
 
+class Sweep(Base):
+    __tablename__ = "sweeps"
+
+    id = Column(Integer, primary_key=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    ticker = Column(String, nullable=False)
+    start_date = Column(Date, nullable=False)
+    end_date = Column(Date, nullable=False)
+    strategy_type = Column(String, nullable=False)
+    param_grid = Column(JSON, nullable=False)
+    initial_cash = Column(Float, nullable=False)
+    commission = Column(Float, nullable=False)
+    num_variants = Column(Integer, nullable=True)
+    status = Column(Enum(BacktestStatus), default=BacktestStatus.PENDING)
+    message = Column(String, nullable=True)
+    claimed_at = Column(DateTime, nullable=True)    # reservado pelo executor
+    heartbeat_at = Column(DateTime, nullable=True)  # último sinal de vida do executor que o roda
+
+    results = relationship("SweepResult", back_populates="sweep", cascade="all, delete-orphan", order_by="SweepResult.rank")
+
+
+class WalkForward(Base):
+    __tablename__ = "walk_forwards"
+
+    id = Column(Integer, primary_key=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    ticker = Column(String, nullable=False)
+    start_date = Column(Date, nullable=False)
+    end_date = Column(Date, nullable=False)
+    strategy_type = Column(String, nullable=False)
+    param_grid = Column(JSON, nullable=False)
+    train_bars = Column(Integer, nullable=False)
+    test_bars = Column(Integer, nullable=False)
+    anchored = Column(Boolean, nullable=False, default=False)
+    objective = Column(String, nullable=False, default="sharpe")
+    initial_cash = Column(Float, nullable=False)
+    commission = Column(Float, nullable=False)
+    status = Column(Enum(BacktestStatus), default=BacktestStatus.PENDING)
+    message = Column(String, nullable=True)
+    claimed_at = Column(DateTime, nullable=True)    # reservado pelo executor
+    heartbeat_at = Column(DateTime, nullable=True)  # último sinal de vida do executor que o roda
+    folds = Column(JSON, nullable=True)        # parâmetros escolhidos, métricas e tempos por fold
+    metrics = Column(JSON, nullable=True)      # métricas da curva fora da amostra encadeada
+    equity_blob = Column(LargeBinary, nullable=True)
+
+
+class RobustnessAnalysis(Base):
+    __tablename__ = "robustness_analyses"
+    __table_args__ = (
+        Index("ix_robustness_analyses_backtest_id", "backtest_id"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    backtest_id = Column(Integer, ForeignKey("backtests.id", ondelete="CASCADE"), nullable=False)
+    method = Column(String, nullable=False)   # bootstrap | shuffle | noise
+    source = Column(String, nullable=False)   # returns | trades
+    num_samples = Column(Integer, nullable=False)
+    block_size = Column(Integer, nullable=False, default=1)
+    noise_scale = Column(Float, nullable=False, default=0.5)
+    seed = Column(BigInteger, nullable=True)
+    status = Column(Enum(BacktestStatus), default=BacktestStatus.PENDING)
+    message = Column(String, nullable=True)
+    claimed_at = Column(DateTime, nullable=True)    # reservado pelo executor
+    heartbeat_at = Column(DateTime, nullable=True)  # último sinal de vida do executor que o roda
+    observed = Column(JSON, nullable=True)     # métricas da série original
+    summary = Column(JSON, nullable=True)      # distribuição das métricas, probabilidades e tempos
+    bands_blob = Column(LargeBinary, nullable=True)  # bandas de percentis de capital e drawdown (.npz)
+
+
+class MLModel(Base):
+    __tablename__ = "ml_models"
+    __table_args__ = (
+        UniqueConstraint("model_type", "version", name="uq_ml_models_type_version"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    model_type = Column(String, nullable=False)
+    version = Column(Integer, nullable=False)
+    path = Column(String, nullable=False)            # artefato joblib (sem compressão, mapeável)
+    features = Column(JSON, nullable=False)
+    feature_version = Column(String, nullable=True)  # hash das FEATURES usadas no treino
+    params = Column(JSON, nullable=True)
+    metrics = Column(JSON, nullable=True)
+
+
+class SweepResult(Base):
+    __tablename__ = "sweep_results"
+    __table_args__ = (
+        Index("ix_sweep_results_sweep_rank", "sweep_id", "rank"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    sweep_id = Column(Integer, ForeignKey("sweeps.id", ondelete="CASCADE"), nullable=False)
+    rank = Column(Integer, nullable=False)
+    params = Column(JSON, nullable=False)
+    total_return = Column(Float, nullable=False)
+    sharpe = Column(Float, nullable=False)
+    max_drawdown = Column(Float, nullable=False)
+    num_trades = Column(Integer, nullable=False)
+    # Nulas nos resultados gravados antes destas colunas existirem
+    cagr = Column(Float, nullable=True)
+    sortino = Column(Float, nullable=True)
+    calmar = Column(Float, nullable=True)
+    win_rate = Column(Float, nullable=True)
+    exposure = Column(Float, nullable=True)
+    turnover = Column(Float, nullable=True)
+
+    sweep = relationship("Sweep", back_populates="results")
+
+
 class Trade(Base):
     __tablename__ = "trades"
+    __table_args__ = (
+        Index("ix_trades_backtest_id", "backtest_id"),
+    )
 
     id = Column(Integer, primary_key=True)
     backtest_id = Column(Integer, ForeignKey("backtests.id", ondelete="CASCADE"), nullable=False)
@@ -128,6 +258,7 @@ class Trade(Base):
     size = Column(Float, nullable=False)
     commission = Column(Float, nullable=False)
     pnl = Column(Float, nullable=True)
+    ticker = Column(String, nullable=True)  # símbolo do trade em backtests de carteira
 
     backtest = relationship("Backtest", back_populates="trades")
 
@@ -163,6 +294,26 @@ class Metric(Base):
     backtest = relationship("Backtest", back_populates="metrics")
 
 
+class IngestionWatermark(Base):
+    __tablename__ = "ingestion_watermarks"
+
+    symbol_id = Column(Integer, ForeignKey("symbols.id", ondelete="CASCADE"), primary_key=True)
+    last_date = Column(Date, nullable=True)      # último candle gravado em prices
+    checked_until = Column(Date, nullable=False)  # fim (exclusivo) do último intervalo consultado
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class IndicatorWatermark(Base):
+    __tablename__ = "indicator_watermarks"
+
+    symbol_id = Column(Integer, ForeignKey("symbols.id", ondelete="CASCADE"), primary_key=True)
+    name = Column(String, primary_key=True)
+    params_hash = Column(String, primary_key=True)
+    last_date = Column(Date, nullable=False)  # último candle já processado
+    state = Column(JSON, nullable=True)       # estado das médias recursivas (EMA, RSI, ATR)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
 class JobRun(Base):
     __tablename__ = "job_runs"
     __table_args__ = (
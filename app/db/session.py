@@ -1,13 +1,144 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, exc
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 import os
+import time
+import threading
+from typing import Dict, Optional
 from dotenv import load_dotenv
 
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
-engine = create_engine(DATABASE_URL, echo=False, future=True)
+# Pool de conexões (valem para todas as engines criadas por create_db_engine)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))
+DB_PGBOUNCER = os.getenv("DB_PGBOUNCER", "false").lower() == "true"
+
+class PoolMetrics:
+    """Checkouts, timeouts e tempo de espera por uma conexão livre de um pool."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def record(self, waited: float, timed_out: bool = False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+
+    def snapshot(self, pool) -> Dict:
+        with self._lock:
+            waits = self.checkouts + self.timeouts
+            return {
+                "size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "overflow": max(pool.overflow(), 0),
+                "checked_in": pool.checkedin(),
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_avg_ms": round(1000 * self.wait_total / waits, 3) if waits else 0.0,
+                "wait_max_ms": round(1000 * self.wait_max, 3),
+            }
+
+class _TimedPool:
+    metrics: PoolMetrics
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except exc.TimeoutError:
+            self.metrics.record(time.perf_counter() - start, timed_out=True)
+            raise
+        self.metrics.record(time.perf_counter() - start)
+        return conn
+
+_ENGINES = {}
+
+def _timed_pool_class(base, metrics: PoolMetrics):
+    # Subclasse por engine: Pool.recreate() (dispose) reinstancia a mesma classe e mantém as métricas
+    return type(f"Timed{base.__name__}", (_TimedPool, base), {"metrics": metrics})
+
+def engine_options(url: str, is_async: bool = False, statement_timeout_ms: Optional[int] = None,
+                   pgbouncer: Optional[bool] = None) -> Dict:
+    """Opções de pool/conexão comuns. Bancos que não são Postgres usam os defaults do SQLAlchemy."""
+    if not url.startswith("postgres"):
+        return {}
+    statement_timeout_ms = DB_STATEMENT_TIMEOUT_MS if statement_timeout_ms is None else statement_timeout_ms
+    pgbouncer = DB_PGBOUNCER if pgbouncer is None else pgbouncer
+
+    options = {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+    connect_args = {}
+    if pgbouncer:
+        # Transaction pooling: sem prepared statements e sem parâmetros de startup
+        # (statement_timeout deve ser configurado no PgBouncer ou no role do banco)
+        if url.split("://")[0].endswith("+psycopg") or is_async:
+            connect_args["prepare_threshold"] = None
+    elif statement_timeout_ms:
+        connect_args["options"] = f"-c statement_timeout={statement_timeout_ms}"
+    if connect_args:
+        options["connect_args"] = connect_args
+    return options
+
+def create_db_engine(url: Optional[str] = None, name: str = "default", is_async: bool = False, **overrides):
+    """
+    Fábrica única de engines (API, workers, jobs e Alembic). Pools QueuePool ganham
+    métricas de espera registradas em `name`; `overrides` (ex.: poolclass=NullPool,
+    statement_timeout_ms=0) têm precedência sobre as variáveis DB_*.
+    """
+    url = url or DATABASE_URL
+    if is_async:
+        url = async_database_url(url)
+    options = engine_options(url, is_async, overrides.pop("statement_timeout_ms", None), overrides.pop("pgbouncer", None))
+    if "poolclass" in overrides:
+        for key in ("pool_size", "max_overflow", "pool_timeout"):
+            options.pop(key, None)
+    elif options:
+        metrics = PoolMetrics()
+        options["poolclass"] = _timed_pool_class(AsyncAdaptedQueuePool if is_async else QueuePool, metrics)
+    options.update(overrides)
+
+    engine = (create_async_engine if is_async else create_engine)(url, echo=False, **options)
+    _ENGINES[name] = engine
+    return engine
+
+def pool_metrics() -> Dict[str, Dict]:
+    """Estado dos pools com métricas (exposto em GET /health/db)."""
+    result = {}
+    for name, engine in _ENGINES.items():
+        pool = engine.pool
+        if isinstance(pool, _TimedPool):
+            result[name] = pool.metrics.snapshot(pool)
+    return result
+
+def async_database_url(url: str) -> str:
+    """Mesmo banco pelo driver psycopg 3, que também tem modo assíncrono."""
+    scheme, sep, rest = url.partition("://")
+    if scheme.split("+")[0] in ("postgresql", "postgres"):
+        return f"postgresql+psycopg://{rest}"
+    return url
+
+engine = create_db_engine(DATABASE_URL, name="sync")
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 def get_db():
@@ -15,4 +146,20 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+_async_engine = None
+
+def get_async_engine():
+    # Criado no primeiro uso: processos que só usam a sessão síncrona (workers, jobs)
+    # não precisam do driver assíncrono
+    global _async_engine
+    if _async_engine is None:
+        _async_engine = create_db_engine(DATABASE_URL, name="async", is_async=True)
+    return _async_engine
+
+AsyncSessionLocal = async_sessionmaker(autoflush=False, expire_on_commit=False)
+
+async def get_async_db():
+    async with AsyncSessionLocal(bind=get_async_engine()) as db:
+        yield db
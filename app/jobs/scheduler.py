@@ -3,10 +3,13 @@ from apscheduler.triggers.cron import CronTrigger
 from datetime import datetime
 import os
 from dotenv import load_dotenv
-from db.session import SessionLocal
-from db.models import JobRun
-from services.data_service import fetch_ohlcv
-from services.indicator_service import calculate_indicators
+from sqlalchemy import text
+from app.db.session import SessionLocal
+from app.db.models import JobRun
+from app.services.data_service import fetch_ohlcv
+from app.services.indicator_service import calculate_indicators
+from app.services.ingestion import run_incremental_ingestion
+from app.services.ml_pipeline import update_features
 
 load_dotenv(dotenv_path="../.env")
 
@@ -33,15 +36,20 @@ def daily_indicators_job():
     start_time = time.time()
     job_name = "daily_indicators"
     try:
-        db = SessionLocal()
-        tickers = [t[0] for t in db.execute("SELECT ticker FROM symbols").fetchall()]
-        db.close()
+        # Ingestão incremental: só busca os candles após o watermark de cada símbolo
+        summary = run_incremental_ingestion()
 
-        for ticker in tickers:
-            df = fetch_ohlcv(ticker, "2020-01-01", datetime.today().strftime("%Y-%m-%d"))
-            calculate_indicators(ticker, ["SMA","EMA","ATR","RSI","Momentum"])
+        # Uma sessão (uma conexão do pool) para todos os tickers; só os que ganharam candles
+        db = SessionLocal()
+        try:
+            for ticker in [t for t, n in summary["rows"].items() if n > 0]:
+                calculate_indicators(ticker, ["SMA","EMA","ATR","RSI","Momentum"], db=db)
+                update_features(db, ticker)
+        finally:
+            db.close()
         
-        log_job_run(job_name, status="COMPLETED", elapsed_ms=int((time.time()-start_time)*1000))
+        message = f"failed: {sorted(summary['failed'])}" if summary["failed"] else ""
+        log_job_run(job_name, status="COMPLETED", message=message, elapsed_ms=int((time.time()-start_time)*1000))
     except Exception as e:
         log_job_run(job_name, status="FAILED", message=str(e))
 
@@ -53,8 +61,10 @@ def health_check_job():
     job_name = "health_check"
     try:
         db = SessionLocal()
-        db.execute("SELECT 1")
-        db.close()
+        try:
+            db.execute(text("SELECT 1"))
+        finally:
+            db.close()
         fetch_ohlcv("AAPL", "2020-01-01", "2020-01-10")
         log_job_run(job_name, status="COMPLETED", elapsed_ms=int((time.time()-start_time)*1000))
     except Exception as e:
@@ -1,13 +1,23 @@
-from fastapi import APIRouter, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, Response, Query
 from datetime import datetime
-from typing import Optional
+from typing import Optional, Dict, Any, List
 from pydantic import BaseModel
-from app.db.session import SessionLocal
-from app.db.models import Backtest, Trade, DailyPosition, Metric
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.session import SessionLocal, get_async_db
 from app.db import crud
-from app.services.backtest_runner import run_backtest
+from app.db.models import Backtest, Trade, DailyPosition, Metric, Sweep, SweepResult, WalkForward, RobustnessAnalysis, BacktestStatus
+from app.services.backtest_runner import ENGINES
+from app.services.executor import executor
 from app.services.data_service import fetch_ohlcv, persist_prices
 from app.services.indicator_service import calculate_indicators
+from app.services.sweep import RESULT_METRICS, expand_grid, result_order
+from app.services.result_store import aload_backtest_result
+from app.services.result_cache import normalize_request, backtest_key, lock_key, find_reusable
+from app.services.series_export import to_columnar_json
+from app.services.walk_forward import OBJECTIVES, make_folds, walk_forward_curve
+from app.services.robustness import METHODS, SOURCES, decode_bands
+from app.services.model_registry import resolve_model_id
 import json
 
 router = APIRouter(prefix="/backtests", tags=["backtests"])
@@ -21,19 +31,119 @@ class BacktestRunRequest(BaseModel):
     initial_cash: Optional[float] = 100000
     commission: Optional[float] = 0.0
     timeframe: Optional[str] = "1d"
+    engine: Optional[str] = "backtrader"
 
 class BacktestCreatedResponse(BaseModel):
     id: int
     status: str
+    cached: bool = False  # backtest idêntico reaproveitado (concluído ou em andamento)
+
+class PortfolioBacktestRequest(BaseModel):
+    tickers: List[str]
+    start_date: str
+    end_date: str
+    strategy_type: str
+    strategy_params: Optional[dict] = {}
+    initial_cash: Optional[float] = 100000
+    commission: Optional[float] = 0.0
+    timeframe: Optional[str] = "1d"
+
+class SweepRequest(BaseModel):
+    ticker: str
+    start_date: str
+    end_date: str
+    strategy_type: str
+    # {"fast": [10, 20], "slow": {"start": 50, "stop": 200, "step": 10}}
+    param_grid: Dict[str, Any]
+    initial_cash: Optional[float] = 100000
+    commission: Optional[float] = 0.0
+
+class SweepCreatedResponse(BaseModel):
+    id: int
+    status: str
+    num_variants: int
+
+class WalkForwardRequest(SweepRequest):
+    train_bars: int = 504
+    test_bars: int = 126
+    anchored: bool = False
+    objective: str = "sharpe"
+
+class WalkForwardCreatedResponse(BaseModel):
+    id: int
+    status: str
+
+class RobustnessRequest(BaseModel):
+    method: str = "bootstrap"   # bootstrap | shuffle | noise
+    source: str = "returns"     # returns (diários) | trades (PnL por trade)
+    num_samples: int = 1000
+    block_size: int = 1
+    noise_scale: float = 0.5
+    seed: Optional[int] = None
+
+class RobustnessCreatedResponse(BaseModel):
+    id: int
+    status: str
+
+class JobCancelledResponse(BaseModel):
+    id: int
+    status: str
+
+def _pin_model(strategy_type: str, params: dict, db) -> dict:
+    """
+    ml_signal: troca o tipo do modelo ("logreg") pelo id da versão atual no registro,
+    para que o backtest (e sua chave de cache) não mude quando um novo modelo é treinado.
+    """
+    if strategy_type.lower() != "ml_signal":
+        return params
+    try:
+        model_id = resolve_model_id(params.get("model", "logreg"), db)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    return params if model_id is None else {**params, "model": model_id}
 
 @router.post("/run", response_model=BacktestCreatedResponse)
-def create_backtest(request: BacktestRunRequest, background_tasks: BackgroundTasks):
+def create_backtest(request: BacktestRunRequest, force: bool = Query(False)):
+    """
+    Pedidos idênticos (mesmos parâmetros, mesmos preços no intervalo e mesmo código de
+    estratégia) devolvem o backtest já concluído ou em andamento em vez de rodar de novo;
+    `force=true` ignora o cache.
+    """
     db = SessionLocal()
     try:
         start = datetime.fromisoformat(request.start_date)
         end = datetime.fromisoformat(request.end_date)
         if start >= end:
             raise HTTPException(400, "start_date deve ser menor que end_date")
+        if request.engine not in ENGINES:
+            raise HTTPException(400, f"engine deve ser um de {ENGINES}")
+
+        request.strategy_params = _pin_model(request.strategy_type, request.strategy_params or {}, db)
+        normalized = normalize_request(request.model_dump())
+        if not force:
+            existing = find_reusable(db, backtest_key(db, normalized))
+            if existing:
+                return {"id": existing.id, "status": existing.status.value, "cached": True}
+            db.rollback()
+
+        # Garantir dados antes de enfileirar: o executor pode reservar a linha imediatamente
+        df = fetch_ohlcv(request.ticker, request.start_date, request.end_date)
+        if df.empty:
+            raise HTTPException(400, f"Sem dados de preços para {request.ticker}")
+        persist_prices(crud.get_or_create_symbol(db, request.ticker).id, df)
+
+        indicators = request.strategy_params.get("indicators", [])
+        if indicators:
+            calculate_indicators(request.ticker, indicators)
+
+        # Os preços podem ter mudado: a chave é recalculada e, sob o lock, conferida de novo
+        # (pedidos simultâneos idênticos acompanham a mesma execução)
+        key = backtest_key(db, normalized)
+        lock_key(db, key)
+        existing = None if force else find_reusable(db, key)
+        if existing:
+            db.rollback()
+            return {"id": existing.id, "status": existing.status.value, "cached": True}
 
         backtest = Backtest(
             ticker=request.ticker,
@@ -44,37 +154,292 @@ def create_backtest(request: BacktestRunRequest, background_tasks: BackgroundTas
             initial_cash=request.initial_cash,
             commission=request.commission,
             timeframe=request.timeframe,
+            engine=request.engine,
+            status="PENDING",
+            request_hash=key,
+        )
+        db.add(backtest)
+        db.commit()
+        db.refresh(backtest)
+
+        # A linha PENDING é a fila: o executor reserva e roda no pool de processos
+        executor.wake()
+
+        return {"id": backtest.id, "status": backtest.status}
+    finally:
+        db.close()
+
+@router.post("/portfolio", response_model=BacktestCreatedResponse)
+def create_portfolio_backtest(request: PortfolioBacktestRequest):
+    db = SessionLocal()
+    try:
+        start = datetime.fromisoformat(request.start_date)
+        end = datetime.fromisoformat(request.end_date)
+        if start >= end:
+            raise HTTPException(400, "start_date deve ser menor que end_date")
+        tickers = list(dict.fromkeys(request.tickers))
+        if not tickers:
+            raise HTTPException(400, "tickers não pode ser vazio")
+        request.strategy_params = _pin_model(request.strategy_type, request.strategy_params or {}, db)
+
+        # Os preços são lidos direto da tabela prices em uma única consulta pelo executor
+        backtest = Backtest(
+            ticker=",".join(tickers),
+            tickers=tickers,
+            start_date=start,
+            end_date=end,
+            strategy_type=request.strategy_type,
+            strategy_params_json=json.dumps(request.strategy_params),
+            initial_cash=request.initial_cash,
+            commission=request.commission,
+            timeframe=request.timeframe,
+            engine="vectorized",
             status="PENDING"
         )
         db.add(backtest)
         db.commit()
         db.refresh(backtest)
 
-        # Garantir dados
+        executor.wake()
+
+        return {"id": backtest.id, "status": backtest.status}
+    finally:
+        db.close()
+
+@router.post("/{backtest_id}/cancel", response_model=BacktestCreatedResponse)
+def cancel_backtest(backtest_id: int):
+    if not executor.cancel(backtest_id):
+        raise HTTPException(status_code=409, detail="Backtest não encontrado ou já finalizado")
+    return {"id": backtest_id, "status": "CANCELLED"}
+
+@router.get("/{backtest_id}/results")
+async def get_backtest_results(backtest_id: int, db: AsyncSession = Depends(get_async_db)):
+    results = await aload_backtest_result(db, backtest_id)
+    if not results:
+        raise HTTPException(status_code=404, detail="Backtest results not found")
+    # Curva diária colunar ({"columns", "data"}) com status, métricas e trades no topo
+    curve = results.pop("equity_curve")
+    return Response(to_columnar_json(curve, **results), media_type="application/json")
+
+@router.post("/{backtest_id}/robustness", response_model=RobustnessCreatedResponse)
+def create_robustness(backtest_id: int, request: RobustnessRequest):
+    """
+    Análise de robustez de um backtest concluído: métricas de milhares de séries
+    sintéticas (bootstrap, embaralhamento da ordem ou ruído) dos retornos diários ou
+    do PnL dos trades.
+    """
+    if request.method not in METHODS:
+        raise HTTPException(400, f"method deve ser um de {METHODS}")
+    if request.source not in SOURCES:
+        raise HTTPException(400, f"source deve ser um de {SOURCES}")
+    if not 1 <= request.num_samples <= 100000:
+        raise HTTPException(400, "num_samples deve estar entre 1 e 100000")
+    if request.block_size < 1 or request.noise_scale < 0:
+        raise HTTPException(400, "block_size deve ser >= 1 e noise_scale >= 0")
+    db = SessionLocal()
+    try:
+        backtest = db.get(Backtest, backtest_id)
+        if not backtest:
+            raise HTTPException(404, "Backtest not found")
+        if backtest.status != BacktestStatus.COMPLETED:
+            raise HTTPException(409, "Backtest ainda não concluído")
+
+        analysis = RobustnessAnalysis(
+            backtest_id=backtest_id,
+            method=request.method,
+            source=request.source,
+            num_samples=request.num_samples,
+            block_size=request.block_size,
+            noise_scale=request.noise_scale,
+            seed=request.seed,
+            status="PENDING"
+        )
+        db.add(analysis)
+        db.commit()
+        db.refresh(analysis)
+
+        executor.wake()
+
+        return {"id": analysis.id, "status": analysis.status}
+    finally:
+        db.close()
+
+@router.get("/robustness/{analysis_id}")
+async def get_robustness(analysis_id: int, db: AsyncSession = Depends(get_async_db)):
+    analysis = await db.get(RobustnessAnalysis, analysis_id)
+    if not analysis:
+        raise HTTPException(status_code=404, detail="Robustness analysis not found")
+    # Bandas de percentis colunares ({"columns", "data"}); distribuição das métricas no topo
+    bands = decode_bands(analysis.bands_blob) if analysis.bands_blob else {}
+    return Response(to_columnar_json(
+        bands,
+        id=analysis.id,
+        backtest_id=analysis.backtest_id,
+        status=analysis.status.value if analysis.status else None,
+        message=analysis.message,
+        method=analysis.method,
+        source=analysis.source,
+        num_samples=analysis.num_samples,
+        observed=analysis.observed or {},
+        summary=analysis.summary or {},
+    ), media_type="application/json")
+
+@router.post("/robustness/{analysis_id}/cancel", response_model=JobCancelledResponse)
+def cancel_robustness(analysis_id: int):
+    if not executor.cancel(analysis_id, "robustness"):
+        raise HTTPException(status_code=409, detail="Análise de robustez não encontrada ou já finalizada")
+    return {"id": analysis_id, "status": "CANCELLED"}
+
+@router.post("/sweep", response_model=SweepCreatedResponse)
+def create_sweep(request: SweepRequest):
+    db = SessionLocal()
+    try:
+        start = datetime.fromisoformat(request.start_date)
+        end = datetime.fromisoformat(request.end_date)
+        if start >= end:
+            raise HTTPException(400, "start_date deve ser menor que end_date")
+        try:
+            combos = expand_grid(request.strategy_type, request.param_grid)
+        except ValueError as e:
+            raise HTTPException(400, str(e))
+        if not combos:
+            raise HTTPException(400, "param_grid não gera nenhuma combinação")
+
+        # Garantir dados antes de enfileirar: a série é carregada uma única vez para todas as variantes
         df = fetch_ohlcv(request.ticker, request.start_date, request.end_date)
         if df.empty:
             raise HTTPException(400, f"Sem dados de preços para {request.ticker}")
-        persist_prices(1, df) 
+        persist_prices(crud.get_or_create_symbol(db, request.ticker).id, df)
 
-        indicators = request.strategy_params.get("indicators", [])
-        if indicators:
-            calculate_indicators(request.ticker, indicators)
+        sweep = Sweep(
+            ticker=request.ticker,
+            start_date=start,
+            end_date=end,
+            strategy_type=request.strategy_type,
+            param_grid=request.param_grid,
+            initial_cash=request.initial_cash,
+            commission=request.commission,
+            num_variants=len(combos),
+            status="PENDING"
+        )
+        db.add(sweep)
+        db.commit()
+        db.refresh(sweep)
 
-        background_tasks.add_task(run_backtest, backtest.id)
+        # Mesma fila durável dos backtests: o executor reserva a linha PENDING e roda no pool
+        executor.wake()
 
-        return {"id": backtest.id, "status": backtest.status}
+        return {"id": sweep.id, "status": sweep.status, "num_variants": len(combos)}
     finally:
         db.close()
 
-@router.get("/{backtest_id}/results")
-def get_backtest_results(backtest_id: int):
+@router.get("/sweep/{sweep_id}")
+async def get_sweep_results(sweep_id: int, limit: int = 100, sort_by: str = "sharpe",
+                            db: AsyncSession = Depends(get_async_db)):
+    if sort_by not in RESULT_METRICS:
+        raise HTTPException(400, f"sort_by deve ser um de {RESULT_METRICS}")
+    sweep = await db.get(Sweep, sweep_id)
+    if not sweep:
+        raise HTTPException(status_code=404, detail="Sweep not found")
+
+    rows = (await db.execute(
+        select(SweepResult)
+        .where(SweepResult.sweep_id == sweep_id)
+        .order_by(result_order(sort_by))
+        .limit(limit)
+    )).scalars().all()
+    return {
+        "id": sweep.id,
+        "status": sweep.status,
+        "num_variants": sweep.num_variants,
+        "message": sweep.message,
+        "results": [
+            {
+                "rank": r.rank,
+                "params": r.params,
+                **{name: getattr(r, name) for name in RESULT_METRICS},
+                "num_trades": r.num_trades,
+            }
+            for r in rows
+        ],
+    }
+
+@router.post("/sweep/{sweep_id}/cancel", response_model=JobCancelledResponse)
+def cancel_sweep(sweep_id: int):
+    if not executor.cancel(sweep_id, "sweep"):
+        raise HTTPException(status_code=409, detail="Sweep não encontrado ou já finalizado")
+    return {"id": sweep_id, "status": "CANCELLED"}
+
+@router.post("/walk-forward", response_model=WalkForwardCreatedResponse)
+def create_walk_forward(request: WalkForwardRequest):
+    """
+    Otimização walk-forward: em cada fold o param_grid é avaliado na janela de treino
+    (train_bars candles, ou todo o histórico anterior com anchored) e a melhor variante
+    segundo `objective` roda nos test_bars candles seguintes.
+    """
     db = SessionLocal()
     try:
-        results = crud.get_backtest_results(db, backtest_id)
-        if not results:
-            raise HTTPException(status_code=404, detail="Backtest results not found")
-        return results
+        start = datetime.fromisoformat(request.start_date)
+        end = datetime.fromisoformat(request.end_date)
+        if start >= end:
+            raise HTTPException(400, "start_date deve ser menor que end_date")
+        if request.objective not in OBJECTIVES:
+            raise HTTPException(400, f"objective deve ser um de {OBJECTIVES}")
+        try:
+            combos = expand_grid(request.strategy_type, request.param_grid)
+            make_folds(request.train_bars + 2, request.train_bars, request.test_bars)
+        except ValueError as e:
+            raise HTTPException(400, str(e))
+        if not combos:
+            raise HTTPException(400, "param_grid não gera nenhuma combinação")
+
+        df = fetch_ohlcv(request.ticker, request.start_date, request.end_date)
+        if df.empty:
+            raise HTTPException(400, f"Sem dados de preços para {request.ticker}")
+        persist_prices(crud.get_or_create_symbol(db, request.ticker).id, df)
+
+        wf = WalkForward(
+            ticker=request.ticker,
+            start_date=start,
+            end_date=end,
+            strategy_type=request.strategy_type,
+            param_grid=request.param_grid,
+            train_bars=request.train_bars,
+            test_bars=request.test_bars,
+            anchored=request.anchored,
+            objective=request.objective,
+            initial_cash=request.initial_cash,
+            commission=request.commission,
+            status="PENDING"
+        )
+        db.add(wf)
+        db.commit()
+        db.refresh(wf)
+
+        executor.wake()
+
+        return {"id": wf.id, "status": wf.status}
     finally:
         db.close()
-        
-        
\ No newline at end of file
+
+@router.get("/walk-forward/{walk_forward_id}")
+async def get_walk_forward(walk_forward_id: int, db: AsyncSession = Depends(get_async_db)):
+    wf = await db.get(WalkForward, walk_forward_id)
+    if not wf:
+        raise HTTPException(status_code=404, detail="Walk-forward not found")
+    # Curva fora da amostra colunar ({"columns", "data"}); folds e métricas no topo
+    curve = walk_forward_curve(wf.equity_blob) if wf.equity_blob else {}
+    return Response(to_columnar_json(
+        curve,
+        id=wf.id,
+        status=wf.status.value if wf.status else None,
+        message=wf.message,
+        metrics=wf.metrics or {},
+        folds=wf.folds or [],
+    ), media_type="application/json")
+
+@router.post("/walk-forward/{walk_forward_id}/cancel", response_model=JobCancelledResponse)
+def cancel_walk_forward(walk_forward_id: int):
+    if not executor.cancel(walk_forward_id, "walk_forward"):
+        raise HTTPException(status_code=409, detail="Walk-forward não encontrado ou já finalizado")
+    return {"id": walk_forward_id, "status": "CANCELLED"}
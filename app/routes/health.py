@@ -1,5 +1,6 @@
 from fastapi import APIRouter
 from datetime import datetime
+from app.db.session import pool_metrics
 
 router = APIRouter(tags=["health"])
 
@@ -11,3 +12,8 @@ def health():
         "timestamp": datetime.utcnow(),
         "yfinance_latency_ms": 0
     }
+
+@router.get("/health/db")
+def health_db():
+    """Estado dos pools de conexão: em uso, overflow, checkouts, timeouts e espera."""
+    return {"pools": pool_metrics(), "timestamp": datetime.utcnow()}
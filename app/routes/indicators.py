@@ -1,10 +1,38 @@
-from fastapi import APIRouter
+from datetime import date
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.session import get_async_db
+from app.db import async_crud
 from app.schemas.indicator_schemas import IndicatorUpdateRequest
 from app.services.indicator_service import calculate_indicators
+from app.services.series_export import parse_series, aload_indicator_columns, encode_columns
 
 router = APIRouter(prefix="/data", tags=["indicators"])
+read_router = APIRouter(prefix="/indicators", tags=["indicators"])
 
 @router.post("/indicators/update")
 def update_indicators(request: IndicatorUpdateRequest):
-    result_msg = calculate_indicators(request.ticker, request.indicators)
+    try:
+        result_msg = calculate_indicators(request.ticker, request.indicators)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
     return {"ticker": request.ticker, "message": result_msg}
+
+@read_router.get("/{ticker}")
+async def get_indicators(ticker: str, series: List[str] = Query(default=[]), start_date: date = date(2000, 1, 1),
+                         end_date: Optional[date] = None, format: str = "json", db: AsyncSession = Depends(get_async_db)):
+    """
+    Séries gravadas por calculate_indicators, alinhadas pela data, em colunas.
+    `series` repetível: "SMA", "SMA:period=50", "RSI:period=7"; vazio = todas as gravadas.
+    `format`: "json" (colunar) ou "arrow" (stream Arrow IPC).
+    """
+    symbol = await async_crud.get_symbol_by_ticker(db, ticker)
+    if not symbol:
+        raise HTTPException(status_code=404, detail="Ticker não encontrado")
+    try:
+        data = await aload_indicator_columns(db, symbol.id, start_date, end_date or date.today(), parse_series(series))
+        body, media_type = encode_columns(data, format, ticker=ticker)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    return Response(content=body, media_type=media_type)
@@ -1,10 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from app.db.session import SessionLocal
-from app.db import crud
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.session import SessionLocal, get_async_db
+from app.db import crud, async_crud
 from app.services.data_service import fetch_ohlcv, persist_prices
+from app.services.series_export import (
+    STREAM_FORMATS, parse_columns, aload_price_columns, encode_columns, stream_prices,
+)
 from app.schemas.price_schemas import PriceFetchRequest, PriceResponse
 from datetime import date
+from typing import Optional
 
 
 router = APIRouter(prefix="/prices", tags=["prices"])
@@ -22,9 +28,45 @@ def fetch_and_save_prices(request: PriceFetchRequest, db: Session = Depends(get_
     if df.empty:
         raise HTTPException(status_code=404, detail="Nenhum dado encontrado")
 
-    persist_prices(1, df)
+    persist_prices(crud.get_or_create_symbol(db, request.ticker).id, df)
     return {"ticker": request.ticker, "rows_saved": len(df)}
 
 @router.get("/{ticker}", response_model=list[PriceResponse])
-def get_prices(ticker: str, db: Session = Depends(get_db)):
-    return crud.get_prices_by_ticker(db, ticker, start_date=date(2000,1,1), end_date=date.today())
+async def get_prices(ticker: str, response: Response, start_date: date = date(2000, 1, 1), end_date: Optional[date] = None,
+                     columns: Optional[str] = None, format: str = "rows",
+                     cursor: Optional[date] = None, limit: Optional[int] = Query(None, ge=1),
+                     db: AsyncSession = Depends(get_async_db)):
+    """
+    `format=rows` (padrão) mantém a lista de objetos; `json` devolve colunas
+    ({"data": {"date": [...], "close": [...]}}) e `arrow` um stream Arrow IPC.
+    `ndjson` e `csv` são transmitidos em blocos lidos por cursor no servidor.
+    `columns` (ex.: "close,volume") projeta só as colunas pedidas nos demais formatos.
+    Paginação: `limit` linhas após `cursor` (exclusivo); o header X-Next-Cursor traz o
+    cursor da próxima página quando a página veio cheia.
+    """
+    end_date = end_date or date.today()
+    if format == "rows":
+        rows = await async_crud.get_prices_by_ticker(db, ticker, start_date=start_date, end_date=end_date,
+                                                     after=cursor, limit=limit)
+        if limit is not None and len(rows) == limit:
+            response.headers["X-Next-Cursor"] = rows[-1].date.isoformat()
+        return rows
+
+    symbol = await async_crud.get_symbol_by_ticker(db, ticker)
+    if not symbol:
+        raise HTTPException(status_code=404, detail="Ticker não encontrado")
+    try:
+        selected = parse_columns(columns)
+        if format in STREAM_FORMATS:
+            return StreamingResponse(
+                stream_prices(symbol.id, start_date, end_date, format, selected, cursor, limit),
+                media_type=STREAM_FORMATS[format],
+            )
+        data = await aload_price_columns(db, symbol.id, start_date, end_date, selected, cursor, limit)
+        body, media_type = encode_columns(data, format, ticker=ticker)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+    headers = {}
+    if limit is not None and len(data["date"]) == limit:
+        headers["X-Next-Cursor"] = str(data["date"][-1])
+    return Response(content=body, media_type=media_type, headers=headers)
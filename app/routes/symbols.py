@@ -1,7 +1,8 @@
 from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
-from app.db.session import SessionLocal
-from app.db import crud
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.session import SessionLocal, get_async_db
+from app.db import crud, async_crud
 from app.schemas.symbol_schemas import SymbolCreate, SymbolResponse
 
 router = APIRouter(prefix="/symbols", tags=["symbols"])
@@ -18,5 +19,5 @@ def create_symbol(symbol: SymbolCreate, db: Session = Depends(get_db)):
     return crud.create_symbol(db, symbol)
 
 @router.get("/{ticker}", response_model=SymbolResponse)
-def get_symbol(ticker: str, db: Session = Depends(get_db)):
-    return crud.get_symbol_by_ticker(db, ticker)
+async def get_symbol(ticker: str, db: AsyncSession = Depends(get_async_db)):
+    return await async_crud.get_symbol_by_ticker(db, ticker)
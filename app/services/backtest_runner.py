@@ -1,56 +1,96 @@
 import backtrader as bt
 import pandas as pd
 import json
-import os
+from typing import Optional
 from app.db.session import SessionLocal
-from app.db.models import Backtest, Trade, DailyPosition, Metric
-from app.strategies.trend_following import TrendFollowingStrategy
+from app.db.models import Backtest, BacktestStatus
+from app.services.strategies import build_signals, atr_stop
+from app.services.vectorized_engine import run_vectorized_backtest
+from app.services.price_cache import price_cache
+from app.services.portfolio import load_price_matrix, build_portfolio_states, run_portfolio_backtest
+from app.services.result_store import persist_backtest_result
+from app.strategies.signal_strategy import SignalStrategy
 
-RESULTS_DIR = "./results"
-os.makedirs(RESULTS_DIR, exist_ok=True)
+ENGINES = ("backtrader", "vectorized")
 
-def run_backtest(backtest_id: int):
+def load_strategy_params(bt_obj: Backtest) -> dict:
+    params = bt_obj.strategy_params_json or {}
+    if isinstance(params, str):
+        params = json.loads(params)
+    return params
+
+def load_price_frame(db, ticker: str, start_date, end_date) -> pd.DataFrame:
+    # Séries quentes vêm do cache em processo, sem ida ao banco
+    symbol_id = price_cache.symbol_id(db, ticker)
+    if symbol_id is None:
+        return pd.DataFrame(columns=["open", "high", "low", "close", "volume"], index=pd.DatetimeIndex([], name="date"))
+    return price_cache.frame(db, symbol_id, start_date, end_date)
+
+def run_backtrader_backtest(df: pd.DataFrame, signals: pd.Series, stop_distance: pd.Series,
+                            initial_cash: float = 100000, commission: float = 0.0) -> dict:
+    cerebro = bt.Cerebro(stdstats=False)
+    data_feed = bt.feeds.PandasData(dataname=df)
+    cerebro.adddata(data_feed)
+    cerebro.addstrategy(SignalStrategy,
+                        signals=signals.to_numpy(dtype=float),
+                        stop_distance=stop_distance.to_numpy(dtype=float),
+                        initial_cash=initial_cash,
+                        commission=commission)
+    cerebro.broker.setcash(initial_cash)
+    cerebro.broker.setcommission(commission=commission)
+    cerebro.broker.set_checksubmit(False)
+    strategy = cerebro.run()[0]
+
+    return {
+        "dates": pd.DatetimeIndex(df.index),
+        "equity": pd.Series(strategy.equity).to_numpy(),
+        "cash": pd.Series(strategy.cash).to_numpy(),
+        "position": pd.Series(strategy.position_sizes, dtype=float).to_numpy(),
+        "trades": strategy.trades_log,
+    }
+
+def run_backtest(backtest_id: int, engine: Optional[str] = None):
     db = SessionLocal()
     try:
         bt_obj = db.query(Backtest).filter(Backtest.id==backtest_id).first()
-        if not bt_obj:
+        if not bt_obj or bt_obj.status == BacktestStatus.CANCELLED:
             return
 
         bt_obj.status = "RUNNING"
         db.commit()
+        engine = engine or bt_obj.engine
 
-        # Preparar feed
-        df = pd.read_sql(f"SELECT * FROM prices WHERE symbol_id=(SELECT id FROM symbols WHERE ticker='{bt_obj.ticker}') AND date BETWEEN '{bt_obj.start_date}' AND '{bt_obj.end_date}' ORDER BY date", db.bind)
-        df.set_index("date", inplace=True)
+        params = load_strategy_params(bt_obj)
+        if bt_obj.tickers:
+            # Carteira: matriz alinhada de todos os símbolos e capital compartilhado
+            matrix = load_price_matrix(db, bt_obj.tickers, bt_obj.start_date, bt_obj.end_date)
+            states = build_portfolio_states(matrix, bt_obj.strategy_type, params)
+            result = run_portfolio_backtest(matrix, states, bt_obj.initial_cash, bt_obj.commission)
+        else:
+            # Preparar feed
+            df = load_price_frame(db, bt_obj.ticker, bt_obj.start_date, bt_obj.end_date)
+            signals = build_signals(df, bt_obj.strategy_type, params)
+            stop_distance = atr_stop(df, period=params.get("atr_period", 14), multiplier=params.get("atr_multiplier", 3.0))
 
-        cerebro = bt.Cerebro()
-        data_feed = bt.feeds.PandasData(dataname=df)
-        cerebro.adddata(data_feed)
-        cerebro.addstrategy(TrendFollowingStrategy,
-                             initial_cash=bt_obj.initial_cash,
-                             commission=bt_obj.commission)
-        cerebro.broker.setcash(bt_obj.initial_cash)
-        cerebro.run()
+            if engine == "vectorized":
+                result = run_vectorized_backtest(df, signals, stop_distance, bt_obj.initial_cash, bt_obj.commission)
+            elif engine == "backtrader":
+                result = run_backtrader_backtest(df, signals, stop_distance, bt_obj.initial_cash, bt_obj.commission)
+            else:
+                raise ValueError(f"engine inválido: {engine}")
 
-        
+        db.refresh(bt_obj)
+        if bt_obj.status == BacktestStatus.CANCELLED:
+            return
+        # Resultado e status COMPLETED na mesma transação
+        persist_backtest_result(db, backtest_id, result)
         bt_obj.status = "COMPLETED"
         db.commit()
 
     except Exception as e:
+        db.rollback()
         bt_obj.status = "FAILED"
         bt_obj.message = str(e)
         db.commit()
     finally:
         db.close()
-
-def save_backtest_result_json(backtest_id: int, metrics: dict, trades: list, daily_positions: list):
-    result = {
-        "backtest_id": backtest_id,
-        "metrics": metrics,
-        "trades": trades,
-        "daily_positions": daily_positions
-    }
-    path = os.path.join(RESULTS_DIR, f"backtest_{backtest_id}.json")
-    with open(path, "w") as f:
-        json.dump(result, f, indent=4, default=str)  # default=str converte datas para string
-    return path
\ No newline at end of file
@@ -1,57 +1,220 @@
 import yfinance as yf
 import pandas as pd
 import os
-import pickle
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+from sqlalchemy import text
 from app.db.session import SessionLocal
-from app.db.models import Price, Symbol
-from sqlalchemy.exc import IntegrityError
+from app.services.price_store import PriceStore
+from app.core.logging import get_logger
+from app.db.bulk import copy_upsert
+from app.services.price_cache import price_cache
 
 CACHE_DIR = os.getenv("YFINANCE_CACHE_DIR", "./cache")
 os.makedirs(CACHE_DIR, exist_ok=True)
 
-def fetch_ohlcv(ticker: str, start: str, end: str) -> pd.DataFrame:
-    cache_file = os.path.join(CACHE_DIR, f"{ticker}_{start}_{end}.pkl")
-    if os.path.exists(cache_file):
-        with open(cache_file, "rb") as f:
-            df = pickle.load(f)
-            return df
-
-    df = yf.download(ticker, start=start, end=end)
-    
-    if isinstance(df.columns, pd.MultiIndex):
-        df.columns = [c[0].lower() for c in df.columns] 
+DOWNLOAD_BATCH_SIZE = int(os.getenv("OHLCV_BATCH_SIZE", "50"))
+DOWNLOAD_MAX_WORKERS = int(os.getenv("OHLCV_MAX_WORKERS", "4"))
+DOWNLOAD_RATE_LIMIT = float(os.getenv("OHLCV_RATE_LIMIT", "2.0"))  # requisições por segundo
+DOWNLOAD_MAX_RETRIES = int(os.getenv("OHLCV_MAX_RETRIES", "3"))
+
+price_store = PriceStore(os.path.join(CACHE_DIR, "arrow"))
+logger = get_logger(job_name="data_service")
+
+def _normalize_ohlcv(df: pd.DataFrame) -> pd.DataFrame:
     if df.empty:
         return df
+    df = df.reset_index()
+    df.columns = [str(c).lower() for c in df.columns]
+    return df
 
-    df.reset_index(inplace=True)
-    df.rename(columns={"Date": "date", "Open":"open","High":"high","Low":"low","Close":"close","Volume":"volume"}, inplace=True)
-    with open(cache_file, "wb") as f:
-        pickle.dump(df, f)
+class YahooDownloader:
+    """Baixa vários tickers em uma única chamada ao yf.download."""
 
-    return df
+    def download(self, tickers: List[str], start: str, end: str) -> Dict[str, pd.DataFrame]:
+        raw = yf.download(tickers, start=start, end=end, group_by="ticker", threads=False, progress=False)
+        if raw.empty:
+            return {}
+        frames = {}
+        for ticker in tickers:
+            if isinstance(raw.columns, pd.MultiIndex):
+                if ticker not in raw.columns.get_level_values(0):
+                    continue
+                df = raw[ticker]
+            else:
+                df = raw
+            frames[ticker] = _normalize_ohlcv(df.dropna(how="all"))
+        return frames
+
+class LocalDownloader:
+    """
+    Provedor offline: lê `{root}/{ticker}.csv` (colunas date, open, high, low, close, volume).
+    Útil para testes e desenvolvimento sem acesso ao Yahoo.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def download(self, tickers: List[str], start: str, end: str) -> Dict[str, pd.DataFrame]:
+        frames = {}
+        for ticker in tickers:
+            path = os.path.join(self.root, f"{ticker}.csv")
+            if not os.path.exists(path):
+                continue
+            df = pd.read_csv(path, parse_dates=["date"])
+            frames[ticker] = df[(df["date"] >= start) & (df["date"] < end)].reset_index(drop=True)
+        return frames
+
+downloader = LocalDownloader(os.getenv("OHLCV_LOCAL_DIR")) if os.getenv("OHLCV_LOCAL_DIR") else YahooDownloader()
+
+class RateLimiter:
+    """Garante um intervalo mínimo entre chamadas, compartilhado entre threads."""
+
+    def __init__(self, per_second: float):
+        self.interval = 1.0 / per_second if per_second > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next = 0.0
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if wait > 0:
+            time.sleep(wait)
+
+def download_ohlcv(ticker: str, start: str, end: str) -> pd.DataFrame:
+    return downloader.download([ticker], start, end).get(ticker, pd.DataFrame())
+
+def _download_batch(provider, tickers: List[str], start: str, end: str, limiter: RateLimiter,
+                    max_retries: int) -> Dict[str, pd.DataFrame]:
+    for attempt in range(max_retries + 1):
+        limiter.wait()
+        try:
+            return provider.download(tickers, start, end)
+        except Exception as e:
+            if attempt == max_retries:
+                raise
+            backoff = 2 ** attempt
+            logger.warning(f"Download failed ({e}), retrying in {backoff}s", tickers=len(tickers), attempt=attempt + 1)
+            time.sleep(backoff)
+
+def _download_gaps(provider, tickers: List[str], gaps, limiter: RateLimiter, max_retries: int) -> list:
+    return [
+        (gap_start, gap_end, _download_batch(provider, tickers, gap_start, gap_end, limiter, max_retries))
+        for gap_start, gap_end in gaps
+    ]
+
+def fetch_ohlcv_many(tickers: List[str], start: str, end: str, provider=None,
+                     batch_size: int = DOWNLOAD_BATCH_SIZE, max_workers: int = DOWNLOAD_MAX_WORKERS,
+                     rate_limit: float = DOWNLOAD_RATE_LIMIT,
+                     max_retries: int = DOWNLOAD_MAX_RETRIES) -> Iterator[Tuple[str, Union[pd.DataFrame, Exception]]]:
+    """
+    Versão em lote de fetch_ohlcv. Tickers com a mesma lacuna no cache são agrupados em
+    downloads de até `batch_size`, executados em até `max_workers` threads com limite de
+    taxa e retry com backoff exponencial. Gera (ticker, df) à medida que cada lote termina,
+    para que o chamador persista sem esperar o universo inteiro. Tickers de um lote que
+    falhou todas as tentativas são gerados com a exceção no lugar do DataFrame (um
+    DataFrame vazio significa só que não há candles no intervalo).
+    """
+    provider = provider or downloader
+    start, end = str(start), str(end)
+    today = date.today().isoformat()
+
+    by_gap = {}
+    ready = []
+    for ticker in dict.fromkeys(tickers):
+        with price_store.lock(ticker):
+            if not os.path.exists(price_store.path(ticker)):
+                price_store.import_pickles(ticker, CACHE_DIR)
+        gaps = tuple(price_store.missing_ranges(ticker, start, end))
+        if gaps:
+            by_gap.setdefault(gaps, []).append(ticker)
+        else:
+            ready.append(ticker)
+
+    for ticker in ready:
+        yield ticker, price_store.read(ticker, start, end)
+
+    limiter = RateLimiter(rate_limit)
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {}
+        for gaps, group in by_gap.items():
+            for i in range(0, len(group), batch_size):
+                batch = group[i:i + batch_size]
+                future = pool.submit(_download_gaps, provider, batch, gaps, limiter, max_retries)
+                futures[future] = batch
+
+        for future in as_completed(futures):
+            batch = futures[future]
+            try:
+                results = future.result()
+            except Exception as e:
+                logger.error(f"Batch download failed: {e}", tickers=batch)
+                for ticker in batch:
+                    yield ticker, e
+                continue
+            for ticker in batch:
+                with price_store.lock(ticker):
+                    for gap_start, gap_end, frames in results:
+                        df = frames.get(ticker)
+                        if df is not None and not df.empty:
+                            price_store.write(ticker, df, gap_start, min(gap_end, today))
+                yield ticker, price_store.read(ticker, start, end)
+
+def fetch_ohlcv(ticker: str, start: str, end: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """
+    Serve [start, end) do cache colunar, baixando do Yahoo apenas os trechos ainda
+    não cobertos. `columns` (ex.: ["close"]) lê só essas colunas do disco.
+    """
+    start, end = str(start), str(end)
+    # O candle de hoje ainda pode mudar: a cobertura registrada termina em hoje (exclusivo)
+    today = date.today().isoformat()
+    with price_store.lock(ticker):
+        if not os.path.exists(price_store.path(ticker)):
+            price_store.import_pickles(ticker, CACHE_DIR)
+        for gap_start, gap_end in price_store.missing_ranges(ticker, start, end):
+            df = download_ohlcv(ticker, gap_start, gap_end)
+            # Download vazio (feriado, falha da API) não marca o intervalo como coberto
+            if not df.empty:
+                price_store.write(ticker, df, gap_start, min(gap_end, today))
+
+    return price_store.read(ticker, start, end, columns)
+
+PRICE_COLUMNS = ["open", "high", "low", "close", "volume"]
+
+def persist_prices(symbol_id: int, df: pd.DataFrame) -> int:
+    """
+    Carga em massa via COPY + INSERT ... ON CONFLICT (symbol_id, date) DO UPDATE:
+    datas já existentes são atualizadas e as demais inseridas, sem descartar o lote.
+    """
+    if df.empty:
+        return 0
 
-def persist_prices(symbol_id: int, df: pd.DataFrame):
-    print(df.columns)
+    frame = pd.DataFrame({
+        "symbol_id": symbol_id,
+        "date": pd.to_datetime(df["date"]).dt.strftime("%Y-%m-%d"),
+        "open": df["open"].astype(float).round(4),
+        "high": df["high"].astype(float).round(4),
+        "low": df["low"].astype(float).round(4),
+        "close": df["close"].astype(float).round(4),
+        "volume": df["volume"].astype("int64"),
+    })
 
     db = SessionLocal()
-    prices = []
-    
-    for row in df.itertuples():
-        prices.append(
-            Price(
-                symbol_id=symbol_id,
-                date=pd.to_datetime(row[1]).date(),
-                open=float(row[5]),
-                high=float(row[3]),
-                low=float(row[4]),
-                close=float(row[2]),
-                volume=int(row[6])
-            )
-        )
     try:
-        db.bulk_save_objects(prices)
+        rows = copy_upsert(db, "prices", frame, ["symbol_id", "date"], PRICE_COLUMNS)
+        # Nova versão dos preços do símbolo: caches de preços de todos os processos a comparam
+        db.execute(text("UPDATE symbols SET prices_version = prices_version + 1 WHERE id = :symbol_id"),
+                   {"symbol_id": symbol_id})
         db.commit()
-    except IntegrityError:
+        price_cache.invalidate(symbol_id)
+    except Exception:
         db.rollback()
+        raise
     finally:
         db.close()
+    return rows
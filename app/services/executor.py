@@ -0,0 +1,263 @@
+import os
+import time
+import threading
+import multiprocessing
+from datetime import datetime, timedelta
+from concurrent.futures import ProcessPoolExecutor
+from app.db.session import SessionLocal
+from app.db.models import Backtest, BacktestStatus, RobustnessAnalysis, Sweep, WalkForward
+from app.services.backtest_runner import run_backtest
+from app.services.robustness import run_robustness_job
+from app.services.sweep import run_sweep_job
+from app.services.walk_forward import run_walk_forward_job
+from app.core.logging import get_logger
+
+BACKTEST_WORKERS = int(os.getenv("BACKTEST_WORKERS", os.cpu_count() or 1))
+BACKTEST_POLL_INTERVAL = float(os.getenv("BACKTEST_POLL_INTERVAL", "2.0"))
+# O executor renova o heartbeat das linhas que roda; RUNNING sem heartbeat recente é de
+# um processo que morreu (API ou worker) e volta à fila. Vale para todas as filas (JOBS).
+BACKTEST_HEARTBEAT_INTERVAL = float(os.getenv("BACKTEST_HEARTBEAT_INTERVAL", "15"))
+BACKTEST_STALE_AFTER = float(os.getenv("BACKTEST_STALE_AFTER", "120"))
+
+logger = get_logger(job_name="backtest_executor")
+
+# Filas consumidas pelo executor: linhas PENDING de cada tabela, rodadas por `run(id)`
+JOBS = {
+    "backtest": (Backtest, run_backtest),
+    "sweep": (Sweep, run_sweep_job),
+    "walk_forward": (WalkForward, run_walk_forward_job),
+    "robustness": (RobustnessAnalysis, run_robustness_job),
+}
+
+def claim_pending(model, limit: int) -> list:
+    """
+    Reserva até `limit` linhas PENDING de `model` (FOR UPDATE SKIP LOCKED), marcando-as
+    como RUNNING na mesma transação. Vários processos da API podem consumir a fila sem
+    reservar a mesma linha duas vezes. Retorna os ids reservados.
+    """
+    db = SessionLocal()
+    try:
+        rows = (
+            db.query(model)
+            .filter(model.status == BacktestStatus.PENDING)
+            .order_by(model.created_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+            .all()
+        )
+        now = datetime.utcnow()
+        for row in rows:
+            row.status = BacktestStatus.RUNNING
+            row.claimed_at = now
+            row.heartbeat_at = now
+        db.commit()
+        return [row.id for row in rows]
+    finally:
+        db.close()
+
+def release(model, ids: list):
+    """Devolve à fila linhas reservadas que não chegaram a executar."""
+    if not ids:
+        return
+    db = SessionLocal()
+    try:
+        (
+            db.query(model)
+            .filter(model.id.in_(ids), model.status == BacktestStatus.RUNNING)
+            .update({model.status: BacktestStatus.PENDING}, synchronize_session=False)
+        )
+        db.commit()
+    finally:
+        db.close()
+
+def heartbeat(model, ids: list):
+    """Renova o heartbeat das linhas RUNNING deste executor."""
+    if not ids:
+        return
+    db = SessionLocal()
+    try:
+        (
+            db.query(model)
+            .filter(model.id.in_(ids), model.status == BacktestStatus.RUNNING)
+            .update({model.heartbeat_at: datetime.utcnow()}, synchronize_session=False)
+        )
+        db.commit()
+    finally:
+        db.close()
+
+def requeue_stale(model, stale_after: float = BACKTEST_STALE_AFTER) -> list:
+    """
+    Devolve à fila linhas RUNNING sem heartbeat há mais de `stale_after` segundos (ou
+    sem heartbeat algum): o processo que as reservou morreu sem concluí-las.
+    """
+    db = SessionLocal()
+    try:
+        cutoff = datetime.utcnow() - timedelta(seconds=stale_after)
+        rows = (
+            db.query(model)
+            .filter(model.status == BacktestStatus.RUNNING,
+                    (model.heartbeat_at < cutoff) | model.heartbeat_at.is_(None))
+            .with_for_update(skip_locked=True)
+            .all()
+        )
+        for row in rows:
+            row.status = BacktestStatus.PENDING
+            row.claimed_at = None
+            row.heartbeat_at = None
+        db.commit()
+        return [row.id for row in rows]
+    finally:
+        db.close()
+
+def _init_worker():
+    # Cada processo do pool abre suas próprias conexões
+    from app.db.session import engine
+    engine.dispose(close=False)
+
+class BacktestExecutor:
+    """
+    Executa os jobs de JOBS (backtests, sweeps...) em um pool de processos,
+    consumindo as filas duráveis das suas tabelas. Uma thread de
+    despacho reserva linhas PENDING conforme há slots livres, começando a cada rodada
+    por uma fila diferente, e, a cada `heartbeat_interval`, renova o heartbeat das linhas
+    em execução e devolve à fila as RUNNING abandonadas (também ao iniciar).
+    """
+
+    def __init__(self, max_workers: int = BACKTEST_WORKERS, poll_interval: float = BACKTEST_POLL_INTERVAL,
+                 heartbeat_interval: float = BACKTEST_HEARTBEAT_INTERVAL, stale_after: float = BACKTEST_STALE_AFTER):
+        self.max_workers = max_workers
+        self.poll_interval = poll_interval
+        self.heartbeat_interval = heartbeat_interval
+        self.stale_after = stale_after
+        self._pool = None
+        self._thread = None
+        self._futures = {}  # (tipo, id) -> future
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._rotation = 0
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._recover()
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+        )
+        self._thread = threading.Thread(target=self._dispatch_loop, name="backtest-dispatcher", daemon=True)
+        self._thread.start()
+        logger.info("Backtest executor started", workers=self.max_workers)
+
+    def wake(self):
+        """Acorda o despacho imediatamente (ex.: logo após inserir uma linha PENDING)."""
+        self._wake.set()
+
+    def running(self, kind: str = None) -> list:
+        """Chaves (tipo, id) em execução, ou só os ids de `kind`."""
+        with self._lock:
+            keys = list(self._futures)
+        return keys if kind is None else [job_id for k, job_id in keys if k == kind]
+
+    def cancel(self, job_id: int, kind: str = "backtest") -> bool:
+        """
+        Marca o job `kind` (chave de JOBS) como CANCELLED. Se ainda está na fila do pool o
+        processo nem chega a rodar; se já está rodando, o job descarta o resultado ao terminar.
+        """
+        model = JOBS[kind][0]
+        db = SessionLocal()
+        try:
+            updated = (
+                db.query(model)
+                .filter(model.id == job_id,
+                        model.status.in_([BacktestStatus.PENDING, BacktestStatus.RUNNING]))
+                .update({model.status: BacktestStatus.CANCELLED}, synchronize_session=False)
+            )
+            db.commit()
+        finally:
+            db.close()
+
+        with self._lock:
+            future = self._futures.get((kind, job_id))
+        if future is not None:
+            future.cancel()
+        return bool(updated)
+
+    def shutdown(self, wait: bool = True):
+        """
+        Para o despacho, devolve à fila o que ainda não começou e aguarda os processos
+        em execução terminarem.
+        """
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._wake.set()
+        self._thread.join()
+        self._thread = None
+
+        with self._lock:
+            futures = list(self._futures.items())
+        not_started = [key for key, f in futures if f.cancel()]
+        for kind, (model, _) in JOBS.items():
+            release(model, [job_id for k, job_id in not_started if k == kind])
+        self._pool.shutdown(wait=wait, cancel_futures=True)
+        self._pool = None
+        logger.info("Backtest executor stopped", released=len(not_started))
+
+    def _recover(self):
+        for kind, (model, _) in JOBS.items():
+            requeued = requeue_stale(model, self.stale_after)
+            if requeued:
+                logger.warning(f"Requeued stale {kind} jobs", ids=requeued)
+
+    def _heartbeat(self):
+        # Renova as próprias linhas e recupera as de outros processos que pararam de bater
+        for kind, (model, _) in JOBS.items():
+            heartbeat(model, self.running(kind))
+        self._recover()
+
+    def _claim(self, free: int) -> list:
+        # Cada rodada começa por uma fila diferente: backtests não seguram sweeps para sempre
+        kinds = list(JOBS)
+        self._rotation = (self._rotation + 1) % len(kinds)
+        claimed = []
+        for kind in kinds[self._rotation:] + kinds[:self._rotation]:
+            if len(claimed) >= free:
+                break
+            claimed += [(kind, job_id) for job_id in claim_pending(JOBS[kind][0], free - len(claimed))]
+        return claimed
+
+    def _dispatch_loop(self):
+        last_heartbeat = time.monotonic()
+        while not self._stop.is_set():
+            try:
+                if time.monotonic() - last_heartbeat >= self.heartbeat_interval:
+                    self._heartbeat()
+                    last_heartbeat = time.monotonic()
+                with self._lock:
+                    free = self.max_workers - len(self._futures)
+                if free > 0:
+                    for key in self._claim(free):
+                        self._submit(key)
+            except Exception as e:
+                logger.error(f"Backtest dispatcher error: {e}")
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+
+    def _submit(self, key):
+        kind, job_id = key
+        future = self._pool.submit(JOBS[kind][1], job_id)
+        with self._lock:
+            self._futures[key] = future
+        future.add_done_callback(lambda f, key=key: self._on_done(key, f))
+
+    def _on_done(self, key, future):
+        with self._lock:
+            self._futures.pop(key, None)
+        if not future.cancelled() and future.exception() is not None:
+            logger.error(f"{key[0]} {key[1]} crashed: {future.exception()}", job=key[0], job_id=key[1])
+        self._wake.set()
+
+executor = BacktestExecutor()
@@ -0,0 +1,213 @@
+import os
+import json
+import fcntl
+import hashlib
+import threading
+from contextlib import contextmanager
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional, Tuple
+from app.services.indicator_registry import REGISTRY, IndicatorPlan
+
+def feature_version(features: Dict[str, Tuple[str, Dict]]) -> str:
+    """Hash da definição das features: mudar nomes, ordem ou parâmetros invalida as matrizes gravadas."""
+    return hashlib.md5(json.dumps(list(features.items())).encode()).hexdigest()[:12]
+
+def feature_warmup(name: str, params: Dict) -> int:
+    spec = REGISTRY[name]
+    return spec.warmup(spec.resolve(params))
+
+def feature_matrix(df, features: Dict[str, Tuple[str, Dict]], states: Optional[Dict] = None,
+                   cache: Dict = None) -> Tuple[np.ndarray, Dict]:
+    """
+    Matriz float32 (n, F) C-contígua, colunas na ordem de `features`, calculada num
+    plano só (intermediários compartilhados). `states` ({coluna: estado}) continua as
+    séries recursivas; retorna também o estado de cada coluna ao fim da janela.
+    """
+    plan = IndicatorPlan()
+    keys = [plan.add(name, params) for name, params in features.values()]
+    key_states = {key: states[column] for column, key in zip(features, keys) if states and states.get(column)}
+    values, new_states = plan.compute(df, key_states or None, cache)
+    out = np.empty((len(df), len(keys)), dtype=np.float32)
+    for j, key in enumerate(keys):
+        out[:, j] = values[key]
+    return out, {column: new_states.get(key) for column, key in zip(features, keys)}
+
+def _as_dates(df: pd.DataFrame) -> np.ndarray:
+    dates = df["date"] if "date" in df.columns else df.index
+    return pd.DatetimeIndex(dates).to_numpy().astype("datetime64[D]")
+
+class FeatureStore:
+    """
+    Matrizes de features por símbolo, em disco e lidas via memory-map: `{ticker}.f32`
+    (float32, n x F, linha a linha), `{ticker}.dates` (datetime64[D]) e `{ticker}.json`
+    (versão das features, número de linhas, último candle e estado das séries recursivas).
+
+    Candles novos são calculados só com a janela de aquecimento e anexados ao fim dos
+    arquivos; o .json é publicado depois (os.replace), então leitores veem sempre as
+    primeiras `n` linhas completas. Escritores de processos diferentes (scheduler,
+    workers) se excluem por um flock em `{ticker}.lock`.
+    """
+
+    def __init__(self, root: str, features: Dict[str, Tuple[str, Dict]]):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self.features = dict(features)
+        self.columns = list(self.features)
+        self.version = feature_version(self.features)
+        self.warmup = max((feature_warmup(name, params) for name, params in self.features.values()), default=0)
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+
+    @contextmanager
+    def lock(self, ticker: str):
+        """Exclusão mútua na escrita do símbolo: entre threads (Lock) e entre processos (flock)."""
+        with self._locks_guard:
+            thread_lock = self._locks.setdefault(ticker, threading.Lock())
+        with thread_lock, open(self.path(ticker, "lock"), "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def path(self, ticker: str, ext: str) -> str:
+        return os.path.join(self.root, f"{ticker}.{ext}")
+
+    def meta(self, ticker: str) -> Optional[Dict]:
+        """Metadados do símbolo, ou None se não há matriz gravada com a versão atual das features."""
+        try:
+            with open(self.path(ticker, "json")) as f:
+                meta = json.load(f)
+        except FileNotFoundError:
+            return None
+        return meta if meta.get("version") == self.version else None
+
+    def read(self, ticker: str) -> Tuple[np.ndarray, np.ndarray]:
+        """(datas, matriz float32 (n, F)) mapeadas em memória, somente leitura."""
+        meta = self.meta(ticker)
+        n = meta["n"] if meta else 0
+        if not n:
+            return np.array([], dtype="datetime64[D]"), np.empty((0, len(self.columns)), dtype=np.float32)
+        values = np.memmap(self.path(ticker, "f32"), dtype=np.float32, mode="r", shape=(n, len(self.columns)))
+        dates = np.memmap(self.path(ticker, "dates"), dtype=np.int64, mode="r", shape=(n,)).view("datetime64[D]")
+        return dates, values
+
+    def covers(self, ticker: str, start, end) -> bool:
+        meta = self.meta(ticker)
+        return bool(meta and meta["n"]) and meta["first_date"] <= str(start)[:10] and str(end)[:10] <= meta["last_date"]
+
+    def update(self, ticker: str, df: pd.DataFrame) -> int:
+        """
+        Sincroniza a matriz com os preços de `df` (OHLCV, indexado por data ou com coluna
+        date, em ordem). Se `df` contém o último candle gravado e o aquecimento anterior a
+        ele, só os candles seguintes são calculados e anexados; se cobre todo o intervalo
+        gravado, a matriz é recalculada. Outras janelas não alteram a matriz. Retorna o
+        número de linhas gravadas.
+        """
+        dates = _as_dates(df)
+        if not len(dates):
+            return 0
+        with self.lock(ticker):
+            meta = self.meta(ticker)
+            if meta and meta["n"] and meta["states"] is not None:
+                last = np.datetime64(meta["last_date"], "D")
+                pos = int(np.searchsorted(dates, last))
+                if pos < len(dates) and dates[pos] == last and pos + 1 >= self.warmup:
+                    if pos + 1 == len(dates):
+                        return 0
+                    values, states = self._compute_tail(df, pos + 1, meta["states"])
+                    self._append(ticker, meta, dates[pos + 1:], values, states)
+                    return len(values)
+                # Só recalcula se `df` cobre tudo o que está gravado (senão perderia histórico)
+                if dates[0] > np.datetime64(meta["first_date"], "D") or dates[-1] < last:
+                    return 0
+            values, states = feature_matrix(df, self.features)
+            self._rewrite(ticker, dates, values, states)
+            return len(values)
+
+    def _compute_tail(self, df: pd.DataFrame, first_new: int, states: Dict) -> Tuple[np.ndarray, Dict]:
+        # Colunas com o mesmo aquecimento formam um plano: séries recursivas precisam da
+        # janela exata (começando `warmup` candles antes do primeiro novo)
+        groups = {}
+        for j, (name, params) in enumerate(self.features.values()):
+            groups.setdefault(feature_warmup(name, params), []).append(j)
+        out = np.empty((len(df) - first_new, len(self.columns)), dtype=np.float32)
+        new_states = {}
+        for warmup, cols in groups.items():
+            subset = {self.columns[j]: self.features[self.columns[j]] for j in cols}
+            values, group_states = feature_matrix(df.iloc[first_new - warmup:], subset, states)
+            out[:, cols] = values[warmup:]
+            new_states.update(group_states)
+        return out, new_states
+
+    def _write_meta(self, ticker: str, n: int, first_date, last_date, states: Dict):
+        # Estado None (série recursiva sem histórico suficiente) obriga a recalcular tudo depois
+        meta = {
+            "version": self.version,
+            "columns": self.columns,
+            "n": n,
+            "first_date": str(first_date),
+            "last_date": str(last_date),
+            "states": None if any(s is None for s in states.values()) else states,
+        }
+        tmp = f"{self.path(ticker, 'json')}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp, self.path(ticker, "json"))
+
+    def _append(self, ticker: str, meta: Dict, dates: np.ndarray, values: np.ndarray, states: Dict):
+        n = meta["n"]
+        # Trunca em n linhas: sobras de uma escrita interrompida antes do .json são descartadas
+        for ext, row_bytes, data in (("f32", 4 * len(self.columns), values), ("dates", 8, dates.astype(np.int64))):
+            with open(self.path(ticker, ext), "r+b") as f:
+                f.truncate(n * row_bytes)
+                f.seek(0, os.SEEK_END)
+                f.write(np.ascontiguousarray(data).tobytes())
+        self._write_meta(ticker, n + len(values), meta["first_date"], dates[-1], states)
+
+    def _rewrite(self, ticker: str, dates: np.ndarray, values: np.ndarray, states: Dict):
+        for ext, data in (("f32", values), ("dates", dates.astype(np.int64))):
+            tmp = f"{self.path(ticker, ext)}.{os.getpid()}.{threading.get_ident()}.tmp"
+            np.ascontiguousarray(data).tofile(tmp)
+            os.replace(tmp, self.path(ticker, ext))
+        self._write_meta(ticker, len(values), dates[0], dates[-1], states)
+
+    def _window(self, ticker: str, start=None, end=None, dropna: bool = True):
+        dates, values = self.read(ticker)
+        lo = np.searchsorted(dates, np.datetime64(str(start)[:10], "D")) if start is not None else 0
+        hi = np.searchsorted(dates, np.datetime64(str(end)[:10], "D"), side="right") if end is not None else len(dates)
+        dates, values = dates[lo:hi], values[lo:hi]
+        if dropna:
+            valid = ~np.isnan(values).any(axis=1)
+            if not valid.all():
+                dates, values = dates[valid], values[valid]
+        return dates, values
+
+    def frame(self, ticker: str, start=None, end=None, dropna: bool = True) -> pd.DataFrame:
+        """Features do símbolo em [start, end] (datas inclusivas), sem as linhas de aquecimento (NaN)."""
+        dates, values = self._window(ticker, start, end, dropna)
+        index = pd.DatetimeIndex(dates.astype("datetime64[ns]"), name="date")
+        return pd.DataFrame(values, columns=self.columns, index=index, copy=False)
+
+    def stack(self, tickers: List[str], start=None, end=None) -> Tuple[np.ndarray, pd.MultiIndex]:
+        """
+        Matriz float32 única (soma das linhas, F) com as features de vários símbolos,
+        empilhadas na ordem de `tickers`, e o índice (ticker, date) de cada linha. A
+        matriz é alocada uma vez e preenchida direto dos arquivos mapeados.
+        """
+        windows = [self._window(ticker, start, end) for ticker in tickers]
+        X = np.empty((sum(len(d) for d, _ in windows), len(self.columns)), dtype=np.float32)
+        codes = np.empty(len(X), dtype=np.int32)
+        dates = np.empty(len(X), dtype="datetime64[D]")
+        row = 0
+        for code, (d, values) in enumerate(windows):
+            X[row:row + len(d)] = values
+            codes[row:row + len(d)] = code
+            dates[row:row + len(d)] = d
+            row += len(d)
+        index = pd.MultiIndex.from_arrays(
+            [pd.Categorical.from_codes(codes, categories=list(tickers)), dates.astype("datetime64[ns]")],
+            names=["ticker", "date"],
+        )
+        return X, index
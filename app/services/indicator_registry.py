@@ -0,0 +1,226 @@
+import numpy as np
+import pandas as pd
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+PRICE_INPUTS = ("open", "high", "low", "close", "volume")
+
+class IndicatorSpec:
+    """
+    Declaração de um indicador: entradas (colunas de preço ou outros indicadores, estes
+    como nome ou (nome, params)), parâmetros com defaults, aquecimento e cálculo.
+
+    `compute(inputs, params, state)` recebe os arrays float64 das entradas, alinhados ao
+    frame, e devolve (valores, estado). Estado {} indica série sem recursão; None, série
+    recursiva ainda não semeada (histórico menor que o período).
+    `warmup(params)` é o número de candles anteriores ao primeiro candle novo necessários
+    para continuar a série a partir do estado salvo.
+    """
+
+    def __init__(self, name: str, compute: Callable, inputs: Tuple = ("close",), defaults: Dict = None,
+                 warmup: Callable[[Dict], int] = None, public: bool = True):
+        self.name = name
+        self.compute = compute
+        self.inputs = inputs
+        self.defaults = defaults or {}
+        self.warmup = warmup or (lambda params: 0)
+        self.public = public
+
+    def resolve(self, params: Dict) -> Dict:
+        """Defaults + parâmetros informados (os desconhecidos são ignorados)."""
+        return {**self.defaults, **{k: v for k, v in (params or {}).items() if k in self.defaults}}
+
+REGISTRY: Dict[str, IndicatorSpec] = {}
+
+def register(spec: IndicatorSpec) -> IndicatorSpec:
+    REGISTRY[spec.name] = spec
+    return spec
+
+def _smooth(values: np.ndarray, alpha: float, period: int, prev: Optional[float] = None):
+    """
+    Média exponencial y_t = y_{t-1} + alpha * (x_t - y_{t-1}). Sem `prev` é semeada com a
+    média simples dos `period` primeiros valores, como no TA-Lib; com `prev` continua a
+    série a partir do último valor gravado. Retorna (série, último valor).
+    """
+    out = np.full(len(values), np.nan)
+    if prev is None:
+        if len(values) < period:
+            return out, None
+        prev = values[:period].mean()
+        out[period - 1] = prev
+        start = period
+    else:
+        start = 0
+    if start < len(values):
+        seeded = np.concatenate(([prev], values[start:]))
+        out[start:] = pd.Series(seeded).ewm(alpha=alpha, adjust=False).mean().to_numpy()[1:]
+    last = out[-1] if len(out) else prev
+    return out, float(last)
+
+def _shift(values: np.ndarray, n: int) -> np.ndarray:
+    out = np.full(len(values), np.nan)
+    if n < len(values):
+        out[n:] = values[:len(values) - n]
+    return out
+
+# --- intermediários --------------------------------------------------------------
+
+def _cumsum(inputs, params, state):
+    return np.cumsum(inputs[0]), {}
+
+def _delta(inputs, params, state):
+    return inputs[0] - _shift(inputs[0], 1), {}
+
+def _true_range(inputs, params, state):
+    high, low, close = inputs
+    prev_close = _shift(close, 1)
+    return np.fmax(high - low, np.maximum(np.abs(high - prev_close), np.abs(low - prev_close))), {}
+
+register(IndicatorSpec("CUMSUM", _cumsum, public=False))
+register(IndicatorSpec("DELTA", _delta, public=False))
+register(IndicatorSpec("TR", _true_range, inputs=("high", "low", "close"), public=False))
+
+# --- indicadores -----------------------------------------------------------------
+
+def _sma(inputs, params, state):
+    # Uma soma acumulada serve a todas as janelas do pedido
+    cumsum, period = inputs[0], params["period"]
+    out = np.full(len(cumsum), np.nan)
+    if period <= len(cumsum):
+        out[period - 1:] = (cumsum[period - 1:] - np.concatenate(([0.0], cumsum[:len(cumsum) - period]))) / period
+    return out, {}
+
+def _ema(inputs, params, state):
+    period = params["period"]
+    values, last = _smooth(inputs[0], 2.0 / (period + 1), period, state and state["ema"])
+    return values, (None if last is None else {"ema": last})
+
+def _rsi(inputs, params, state):
+    period = params["period"]
+    delta = inputs[0][1:]  # o primeiro candle só fornece o fechamento anterior
+    gain, _ = _smooth(np.clip(delta, 0, None), 1.0 / period, period, state and state["avg_gain"])
+    loss, _ = _smooth(np.clip(-delta, 0, None), 1.0 / period, period, state and state["avg_loss"])
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rsi = np.where(gain + loss > 0, 100 * gain / (gain + loss), 0.0)
+    rsi[np.isnan(gain)] = np.nan
+    values = np.concatenate(([np.nan], rsi))
+    if not len(gain) or np.isnan(gain[-1]):
+        return values, None
+    return values, {"avg_gain": float(gain[-1]), "avg_loss": float(loss[-1])}
+
+def _atr(inputs, params, state):
+    atr, last = _smooth(inputs[0][1:], 1.0 / params["period"], params["period"], state and state["atr"])
+    values = np.concatenate(([np.nan], atr))
+    return values, (None if last is None or np.isnan(last) else {"atr": last})
+
+def _momentum(inputs, params, state):
+    return inputs[0] - _shift(inputs[0], params["period"]), {}
+
+def _ret(inputs, params, state):
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return inputs[0] / _shift(inputs[0], params["period"]) - 1, {}
+
+def _vol(inputs, params, state):
+    return pd.Series(inputs[0]).rolling(params["period"]).std().to_numpy(), {}
+
+def _max_high(inputs, params, state):
+    # Máxima das `period` barras anteriores (sem a barra atual)
+    return _shift(pd.Series(inputs[0]).rolling(params["period"]).max().to_numpy(), 1), {}
+
+def _min_low(inputs, params, state):
+    return _shift(pd.Series(inputs[0]).rolling(params["period"]).min().to_numpy(), 1), {}
+
+register(IndicatorSpec("SMA", _sma, inputs=("CUMSUM",), defaults={"period": 14}, warmup=lambda p: p["period"] - 1))
+register(IndicatorSpec("EMA", _ema, defaults={"period": 14}))
+register(IndicatorSpec("RSI", _rsi, inputs=("DELTA",), defaults={"period": 14}, warmup=lambda p: 1))
+register(IndicatorSpec("ATR", _atr, inputs=("TR",), defaults={"period": 14}, warmup=lambda p: 1))
+register(IndicatorSpec("Momentum", _momentum, defaults={"period": 10}, warmup=lambda p: p["period"]))
+register(IndicatorSpec("RET", _ret, defaults={"period": 1}, warmup=lambda p: p["period"]))
+register(IndicatorSpec("VOL", _vol, inputs=(("RET", {"period": 1}),), defaults={"period": 10}, warmup=lambda p: p["period"]))
+register(IndicatorSpec("MAX_HIGH", _max_high, inputs=("high",), defaults={"period": 20}, warmup=lambda p: p["period"]))
+register(IndicatorSpec("MIN_LOW", _min_low, inputs=("low",), defaults={"period": 10}, warmup=lambda p: p["period"]))
+
+# --- planejamento ----------------------------------------------------------------
+
+def node_key(name: str, params: Dict) -> Tuple:
+    return (name, tuple(sorted(params.items())))
+
+class IndicatorPlan:
+    """
+    Grafo de cálculo de um pedido: cada série distinta (nome + parâmetros resolvidos) é
+    um nó, as dependências entram antes de quem as usa e nós repetidos são calculados
+    uma única vez (ex.: um TR alimenta todos os ATRs, uma soma acumulada todos os SMAs).
+    """
+
+    def __init__(self, requests: List[Tuple[str, Dict]] = ()):
+        self.nodes: "OrderedDict[Tuple, Tuple[IndicatorSpec, Dict, List]]" = OrderedDict()
+        self.targets: List[Tuple] = []
+        for name, params in requests:
+            self.add(name, params)
+
+    def add(self, name: str, params: Dict = None) -> Tuple:
+        spec = REGISTRY.get(name)
+        if spec is None or not spec.public:
+            raise ValueError(f"indicador inválido: {name}")
+        key = self._add(name, params)
+        if key not in self.targets:
+            self.targets.append(key)
+        return key
+
+    def _add(self, name: str, params: Dict = None) -> Tuple:
+        spec = REGISTRY[name]
+        params = spec.resolve(params)
+        key = node_key(name, params)
+        if key not in self.nodes:
+            deps = []
+            for dep in spec.inputs:
+                if dep in PRICE_INPUTS:
+                    deps.append(dep)
+                elif isinstance(dep, tuple):
+                    deps.append(self._add(*dep))
+                else:
+                    deps.append(self._add(dep))
+            self.nodes[key] = (spec, params, deps)
+        return key
+
+    def compute(self, df, states: Dict = None, cache: Dict = None) -> Tuple[Dict, Dict]:
+        """
+        Calcula todos os nós sobre `df` (frame ou dict de arrays). `states` continua séries
+        recursivas a partir do estado salvo; `cache` (só sem `states`) reaproveita nós já
+        calculados sobre o mesmo frame, ex.: entre as variantes de um sweep.
+        Retorna ({key: valores}, {key: estado}).
+        """
+        states = states or {}
+        if states:
+            cache = None
+        columns = {}
+        values, new_states = {}, {}
+        for key, (spec, params, deps) in self.nodes.items():
+            if cache is not None and key in cache:
+                values[key] = cache[key]
+                continue
+            args = []
+            for dep in deps:
+                if isinstance(dep, str):
+                    if dep not in columns:
+                        columns[dep] = np.asarray(df[dep], dtype=float)
+                    args.append(columns[dep])
+                else:
+                    args.append(values[dep])
+            values[key], new_states[key] = spec.compute(args, params, states.get(key))
+            if cache is not None:
+                cache[key] = values[key]
+        return values, new_states
+
+def indicator(df: pd.DataFrame, name: str, cache: Dict = None, **params) -> pd.Series:
+    """Série de um indicador indexada como `df`, memoizada em `cache` quando informado."""
+    plan = IndicatorPlan([(name, params)])
+    values, _ = plan.compute(df, cache=cache)
+    return pd.Series(values[plan.targets[0]], index=df.index)
+
+def indicator_frame(df: pd.DataFrame, requests: Dict[str, Tuple[str, Dict]], cache: Dict = None) -> pd.DataFrame:
+    """Várias séries de uma vez ({coluna: (nome, params)}), compartilhando os intermediários."""
+    plan = IndicatorPlan()
+    keys = {column: plan.add(name, params) for column, (name, params) in requests.items()}
+    values, _ = plan.compute(df, cache=cache)
+    return pd.DataFrame({column: values[key] for column, key in keys.items()}, index=df.index)
@@ -1,58 +1,166 @@
+import numpy as np
 import pandas as pd
-import talib
 import hashlib
 import json
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple, Union
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import insert
 from app.db.session import SessionLocal
-from app.db.models import Indicator, Symbol
+from app.db.models import IndicatorWatermark, Symbol
+from app.db.bulk import copy_upsert
+from app.services.price_cache import price_cache
+from app.services.indicator_registry import REGISTRY, IndicatorPlan, indicator
 
-def calculate_indicators(ticker: str, indicators: list):
-    db = SessionLocal()
+INDICATOR_KEY = ["symbol_id", "date", "name", "params_hash"]
+
+def params_hash(params: Dict) -> str:
+    return hashlib.md5(json.dumps(params, sort_keys=True).encode()).hexdigest()
+
+def normalize_indicators(indicators: List[Union[str, Dict]]) -> List[Tuple[str, Dict, str]]:
+    """Aceita nomes ("SMA") ou dicts ({"name": "SMA", "params": {...}}); devolve (name, params, hash) únicos."""
+    specs = {}
+    for ind in indicators:
+        if isinstance(ind, str):
+            ind = {"name": ind}
+        params = ind.get("params") or {}
+        h = params_hash(params)
+        specs[(ind["name"], h)] = (ind["name"], params, h)
+    return list(specs.values())
+
+def compute_indicator(df: pd.DataFrame, name: str, params: Dict, state: Optional[Dict] = None):
+    """(valores, estado) de um indicador do registro sobre os preços (float64)."""
+    plan = IndicatorPlan([(name, params)])
+    key = plan.targets[0]
+    values, states = plan.compute(df, {key: state} if state is not None else None)
+    return values[key], states[key]
+
+def warmup_bars(name: str, params: Dict) -> int:
+    """Candles anteriores ao primeiro candle novo necessários para continuar a série."""
+    spec = REGISTRY[name]
+    return spec.warmup(spec.resolve(params))
+
+def calculate_sma(prices: pd.Series, window: int = 14) -> pd.Series:
+    return indicator(prices.to_frame("close"), "SMA", period=window)
+
+def calculate_rsi(prices: pd.Series, window: int = 14) -> pd.Series:
+    return indicator(prices.to_frame("close"), "RSI", period=window)
+
+def load_watermarks(db, symbol_id: int, specs: List[Tuple[str, Dict, str]]) -> Dict:
+    rows = db.query(IndicatorWatermark).filter(IndicatorWatermark.symbol_id == symbol_id).all()
+    wanted = {(name, h) for name, _, h in specs}
+    return {(w.name, w.params_hash): w for w in rows if (w.name, w.params_hash) in wanted}
+
+def save_watermarks(db, values: List[Dict]):
+    if not values:
+        return
+    stmt = insert(IndicatorWatermark).values(values)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["symbol_id", "name", "params_hash"],
+        set_={
+            "last_date": stmt.excluded.last_date,
+            "state": stmt.excluded.state,
+            "updated_at": stmt.excluded.updated_at,
+        },
+    )
+    db.execute(stmt)
+
+def load_prices(db, symbol_id: int, since=None, warmup: int = 0) -> pd.DataFrame:
+    """
+    Preços float64 do símbolo. Sem `since`, o histórico completo vem do cache de preços;
+    com `since`, carrega só os candles após `since` mais os `warmup` candles anteriores
+    (até `since`, inclusive).
+    """
+    if since is None:
+        return price_cache.frame(db, symbol_id).reset_index()
+    query = (
+        "SELECT date, open::float8 AS open, high::float8 AS high, low::float8 AS low, "
+        "close::float8 AS close, volume FROM prices WHERE symbol_id = :symbol_id"
+        " AND date >= COALESCE((SELECT date FROM prices WHERE symbol_id = :symbol_id AND date <= :since "
+        "ORDER BY date DESC OFFSET GREATEST(:warmup - 1, 0) LIMIT 1), '-infinity'::date) ORDER BY date"
+    )
+    df = pd.read_sql(text(query), db.bind, params={"symbol_id": symbol_id, "since": since, "warmup": warmup})
+    df["date"] = pd.to_datetime(df["date"])
+    return df
+
+def calculate_indicators(ticker: str, indicators: list, db=None):
+    """
+    Incremental: para cada (name, params_hash) o watermark guarda o último candle
+    processado e o estado das médias recursivas. Só os candles novos (mais a janela de
+    aquecimento) são lidos e calculados; indicadores sem watermark são calculados sobre
+    todo o histórico. As linhas são gravadas de uma vez (COPY + ON CONFLICT DO NOTHING
+    em ix_indicators_symbol_date_name_hash), sem as linhas de aquecimento (NaN).
+    Retorna o número de linhas inseridas. Com `db`, usa (e confirma) essa sessão em vez
+    de abrir uma nova, ex.: um job que processa vários tickers.
+    """
+    owns_session = db is None
+    db = db or SessionLocal()
     try:
         symbol = db.query(Symbol).filter(Symbol.ticker == ticker).first()
         if not symbol:
-            return
+            return 0
 
-        df = pd.read_sql(f"SELECT * FROM prices WHERE symbol_id={symbol.id} ORDER BY date", db.bind)
+        specs = normalize_indicators(indicators)
+        if not specs:
+            return 0
+        IndicatorPlan([(name, params) for name, params, _ in specs])  # valida os nomes antes de ler preços
+        watermarks = load_watermarks(db, symbol.id, specs)
+
+        # Um indicador sem watermark obriga a ler todo o histórico
+        if len(watermarks) == len(specs):
+            since = min(w.last_date for w in watermarks.values())
+            df = load_prices(db, symbol.id, since, max(warmup_bars(name, params) for name, params, _ in specs))
+        else:
+            df = load_prices(db, symbol.id)
         if df.empty:
-            return
-
-        results = []
-        for ind in indicators:
-            name = ind["name"]
-            params = ind.get("params", {})
-            params_hash = hashlib.md5(json.dumps(params, sort_keys=True).encode()).hexdigest()
-
-            # Idempotência
-            exists = db.query(Indicator).filter(
-                Indicator.symbol_id==symbol.id,
-                Indicator.name==name,
-                Indicator.params_hash==params_hash
-            ).first()
-            if exists:
-                continue
-
-            if name == "SMA":
-                df[name] = talib.SMA(df["close"], timeperiod=params.get("period", 14))
-            elif name == "EMA":
-                df[name] = talib.EMA(df["close"], timeperiod=params.get("period", 14))
-            elif name == "RSI":
-                df[name] = talib.RSI(df["close"], timeperiod=params.get("period", 14))
-            # outros indicadores ...
-
-            # Persistir em batch
-            for row in df.itertuples():
-                results.append(
-                    Indicator(
-                        symbol_id=symbol.id,
-                        date=row.date,
-                        name=name,
-                        value=getattr(row, name),
-                        params_hash=params_hash
-                    )
-                )
-
-        if results:
-            db.bulk_save_objects(results)
-            db.commit()
+            return 0
+
+        # Indicadores com a mesma janela (primeiro candle novo e aquecimento) formam um
+        # plano só, com os intermediários (TR, somas acumuladas...) calculados uma vez.
+        # A janela precisa ser exata: séries recursivas continuam do estado salvo.
+        dates = df["date"].to_numpy()
+        groups = {}
+        for name, params, h in specs:
+            wm = watermarks.get((name, h))
+            first_new = 0 if wm is None else int(np.searchsorted(dates, np.datetime64(wm.last_date), side="right"))
+            if first_new < len(df):
+                start = max(first_new - warmup_bars(name, params), 0) if first_new else 0
+                groups.setdefault((start, first_new), []).append((name, params, h, wm.state if wm else None))
+
+        date_strings = df["date"].dt.strftime("%Y-%m-%d").to_numpy()
+        last_date = df["date"].iloc[-1].date()
+        frames, new_watermarks = [], []
+        for (start, first_new), group in groups.items():
+            plan = IndicatorPlan()
+            keys = [plan.add(name, params) for name, params, _, _ in group]
+            states = {key: state for key, (_, _, _, state) in zip(keys, group) if state is not None}
+            values, new_states = plan.compute(df.iloc[start:], states)
+
+            for key, (name, params, h, _) in zip(keys, group):
+                series = values[key][first_new - start:]
+                valid = ~np.isnan(series)
+                frames.append(pd.DataFrame({
+                    "symbol_id": symbol.id,
+                    "date": date_strings[first_new:][valid],
+                    "name": name,
+                    "value": series[valid],
+                    "params_hash": h,
+                }))
+                # Sem estado (histórico menor que o período) o próximo cálculo recomeça do zero
+                if new_states[key] is not None:
+                    new_watermarks.append({
+                        "symbol_id": symbol.id, "name": name, "params_hash": h,
+                        "last_date": last_date, "state": new_states[key] or None,
+                        "updated_at": datetime.utcnow(),
+                    })
+
+        rows = copy_upsert(db, "indicators", pd.concat(frames, ignore_index=True), INDICATOR_KEY) if frames else 0
+        save_watermarks(db, new_watermarks)
+        db.commit()
+        return rows
+    except Exception:
+        db.rollback()
+        raise
     finally:
-        db.close()
+        if owns_session:
+            db.close()
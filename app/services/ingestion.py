@@ -0,0 +1,95 @@
+from datetime import date, datetime, timedelta
+from typing import Dict, Optional
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
+from app.db.session import SessionLocal
+from app.db.models import Symbol, Price, IngestionWatermark
+from app.services.data_service import fetch_ohlcv, fetch_ohlcv_many, persist_prices
+from app.core.logging import get_logger
+
+DEFAULT_START = date(2020, 1, 1)
+
+logger = get_logger(job_name="ingestion")
+
+def load_watermarks(db) -> Dict[int, date]:
+    """
+    Próxima data a buscar por symbol_id. Usa a tabela de watermarks e, para símbolos
+    sem registro, um único MAX(date) agrupado sobre prices.
+    """
+    start_by_symbol = {
+        w.symbol_id: w.checked_until
+        for w in db.query(IngestionWatermark).all()
+    }
+    query = db.query(Price.symbol_id, func.max(Price.date)).group_by(Price.symbol_id)
+    if start_by_symbol:
+        query = query.filter(Price.symbol_id.notin_(list(start_by_symbol)))
+    for symbol_id, last_date in query.all():
+        start_by_symbol[symbol_id] = last_date + timedelta(days=1)
+    return start_by_symbol
+
+def save_watermark(db, symbol_id: int, last_date: Optional[date], checked_until: date):
+    stmt = insert(IngestionWatermark).values(
+        symbol_id=symbol_id, last_date=last_date, checked_until=checked_until, updated_at=datetime.utcnow()
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["symbol_id"],
+        set_={
+            # Sem candles novos (feriado) mantém o last_date anterior
+            "last_date": func.coalesce(stmt.excluded.last_date, IngestionWatermark.last_date),
+            "checked_until": stmt.excluded.checked_until,
+            "updated_at": stmt.excluded.updated_at,
+        },
+    )
+    db.execute(stmt)
+    db.commit()
+
+def store_symbol_frame(db, symbol: Symbol, df, end: date) -> int:
+    """Faz upsert dos candles de um símbolo em prices e avança o watermark."""
+    rows = persist_prices(symbol.id, df)
+    last_date = df["date"].max().date() if rows else None
+    # Hoje é sempre buscado de novo na próxima execução (candle pode não estar fechado)
+    save_watermark(db, symbol.id, last_date, min(end, date.today()))
+    return rows
+
+def ingest_symbol(db, symbol: Symbol, start: date, end: date) -> int:
+    """Busca [start, end) para um símbolo, faz upsert em prices e avança o watermark."""
+    df = fetch_ohlcv(symbol.ticker, start.isoformat(), end.isoformat())
+    return store_symbol_frame(db, symbol, df, end)
+
+def run_incremental_ingestion(end: Optional[date] = None, default_start: date = DEFAULT_START) -> Dict:
+    """
+    Atualiza prices apenas com os candles que faltam desde o watermark de cada símbolo.
+    Símbolos com o mesmo watermark são baixados juntos por fetch_ohlcv_many e cada
+    frame é gravado assim que seu lote termina.
+    Retorna um resumo {ticker: linhas gravadas} mais os símbolos com erro.
+    """
+    end = end or date.today() + timedelta(days=1)
+    db = SessionLocal()
+    summary = {"rows": {}, "skipped": [], "failed": {}}
+    try:
+        start_by_symbol = load_watermarks(db)
+        groups = {}
+        for symbol in db.query(Symbol).order_by(Symbol.id).all():
+            start = start_by_symbol.get(symbol.id, default_start)
+            if start >= end:
+                summary["skipped"].append(symbol.ticker)
+            else:
+                groups.setdefault(start, {})[symbol.ticker] = symbol
+
+        for start, symbols in groups.items():
+            for ticker, df in fetch_ohlcv_many(list(symbols), start.isoformat(), end.isoformat()):
+                if isinstance(df, Exception):
+                    # Download falhou: o watermark fica onde está e o intervalo é buscado de novo
+                    summary["failed"][ticker] = str(df)
+                    logger.error(f"Download failed for {ticker}: {df}", ticker=ticker)
+                    continue
+                try:
+                    summary["rows"][ticker] = store_symbol_frame(db, symbols[ticker], df, end)
+                    logger.info(f"Ingested {ticker}", ticker=ticker, start=str(start), rows=summary["rows"][ticker])
+                except Exception as e:
+                    db.rollback()
+                    summary["failed"][ticker] = str(e)
+                    logger.error(f"Ingestion failed for {ticker}: {e}", ticker=ticker)
+        return summary
+    finally:
+        db.close()
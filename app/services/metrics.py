@@ -0,0 +1,231 @@
+import numpy as np
+from typing import Dict, Optional
+
+TRADING_DAYS = 252
+
+# Todas as funções operam no último eixo: uma curva (n,) devolve um escalar e um lote
+# (k, n) — ex.: as variantes de um sweep — devolve k valores, sem laço em Python.
+
+def daily_returns(equity: np.ndarray) -> np.ndarray:
+    """
+    Retornos simples ao longo do último eixo; aceita uma curva (n,) ou um lote (k, n).
+    """
+    equity = np.asarray(equity, dtype=float)
+    return equity[..., 1:] / equity[..., :-1] - 1
+
+def total_return(equity: np.ndarray) -> np.ndarray:
+    equity = np.asarray(equity, dtype=float)
+    return equity[..., -1] / equity[..., 0] - 1
+
+def cagr(equity: np.ndarray, periods: int = TRADING_DAYS) -> np.ndarray:
+    """Retorno anualizado composto, considerando `periods` candles por ano."""
+    equity = np.asarray(equity, dtype=float)
+    years = (equity.shape[-1] - 1) / periods
+    if years <= 0:
+        return np.zeros(equity.shape[:-1])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        growth = equity[..., -1] / equity[..., 0]
+        return np.where(growth > 0, np.power(np.maximum(growth, 0), 1 / years) - 1, -1.0)
+
+def _std(returns: np.ndarray) -> np.ndarray:
+    if returns.shape[-1] < 2:
+        return np.zeros(returns.shape[:-1])
+    return returns.std(axis=-1, ddof=1)
+
+def _sharpe(mean: np.ndarray, std: np.ndarray, periods: int) -> np.ndarray:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(std > 0, mean / std * np.sqrt(periods), 0.0)
+
+def _sortino(returns: np.ndarray, mean: np.ndarray, periods: int) -> np.ndarray:
+    if returns.shape[-1] == 0:
+        return np.zeros(returns.shape[:-1])
+    downside = np.sqrt(np.mean(np.minimum(returns, 0.0) ** 2, axis=-1))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(downside > 0, mean / downside * np.sqrt(periods), 0.0)
+
+def volatility(equity: np.ndarray, periods: int = TRADING_DAYS) -> np.ndarray:
+    """Desvio-padrão anualizado dos retornos."""
+    return _std(daily_returns(equity)) * np.sqrt(periods)
+
+def sharpe_ratio(equity: np.ndarray, periods: int = TRADING_DAYS) -> np.ndarray:
+    returns = daily_returns(equity)
+    return _sharpe(returns.mean(axis=-1), returns.std(axis=-1, ddof=1), periods)
+
+def sortino_ratio(equity: np.ndarray, periods: int = TRADING_DAYS) -> np.ndarray:
+    """Como o Sharpe, com o desvio só dos retornos negativos (alvo zero)."""
+    returns = daily_returns(equity)
+    return _sortino(returns, returns.mean(axis=-1), periods)
+
+def drawdown(equity: np.ndarray) -> np.ndarray:
+    equity = np.asarray(equity, dtype=float)
+    peak = np.maximum.accumulate(equity, axis=-1)
+    return equity / peak - 1
+
+def max_drawdown(equity: np.ndarray) -> np.ndarray:
+    return drawdown(equity).min(axis=-1)
+
+def calmar_ratio(equity: np.ndarray, periods: int = TRADING_DAYS) -> np.ndarray:
+    """CAGR dividido pelo |drawdown máximo| (0 sem drawdown)."""
+    mdd = np.abs(max_drawdown(equity))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(mdd > 0, cagr(equity, periods) / mdd, 0.0)
+
+def exposure(position: np.ndarray) -> np.ndarray:
+    """Fração dos candles com posição aberta."""
+    position = np.asarray(position, dtype=float)
+    if position.shape[-1] == 0:
+        return np.zeros(position.shape[:-1])
+    return (position != 0).mean(axis=-1)
+
+def turnover(position: np.ndarray, price: np.ndarray, equity: np.ndarray, periods: int = TRADING_DAYS) -> np.ndarray:
+    """
+    Giro anualizado: valor negociado (|Δposição| x preço) sobre o patrimônio médio.
+    `price` pode ser uma única série (n,) compartilhada por todo o lote.
+    """
+    position = np.asarray(position, dtype=float)
+    equity = np.asarray(equity, dtype=float)
+    n = position.shape[-1]
+    if n == 0:
+        return np.zeros(position.shape[:-1])
+    traded = np.abs(np.diff(position, axis=-1, prepend=0.0)) * np.asarray(price, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = traded.sum(axis=-1) / equity.mean(axis=-1) * periods / n
+    return np.where(np.isfinite(ratio), ratio, 0.0)
+
+def trade_returns(pnl: np.ndarray, entry_price: np.ndarray, size: np.ndarray) -> np.ndarray:
+    """Retorno de cada trade sobre o valor de entrada; trades em aberto (pnl NaN) ficam NaN."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.asarray(pnl, dtype=float) / (np.asarray(entry_price, dtype=float) * np.asarray(size, dtype=float))
+
+def pad_trade_returns(returns_list) -> np.ndarray:
+    """Lista de arrays de tamanhos diferentes -> matriz (k, max_trades) completada com NaN."""
+    width = max((len(r) for r in returns_list), default=0)
+    out = np.full((len(returns_list), width), np.nan)
+    for i, returns in enumerate(returns_list):
+        out[i, :len(returns)] = returns
+    return out
+
+def win_rate(returns: np.ndarray) -> np.ndarray:
+    """Fração de trades fechados com retorno positivo (0 sem trades)."""
+    returns = np.asarray(returns, dtype=float)
+    closed = np.isfinite(returns).sum(axis=-1)
+    wins = (returns > 0).sum(axis=-1)
+    return np.where(closed > 0, wins / np.maximum(closed, 1), 0.0)
+
+def avg_trade_return(returns: np.ndarray) -> np.ndarray:
+    returns = np.asarray(returns, dtype=float)
+    closed = np.isfinite(returns).sum(axis=-1)
+    total = np.where(np.isfinite(returns), returns, 0.0).sum(axis=-1)
+    return np.where(closed > 0, total / np.maximum(closed, 1), 0.0)
+
+# --- janelas móveis ---------------------------------------------------------------
+# Resultado com o mesmo comprimento da curva; as primeiras posições sem janela completa
+# ficam NaN. Somas por janela vêm de somas acumuladas (O(n), sem laço por janela).
+
+def _window_sum(values: np.ndarray, window: int) -> np.ndarray:
+    cumsum = np.cumsum(values, axis=-1)
+    out = cumsum[..., window - 1:].copy()
+    out[..., 1:] -= cumsum[..., :-window]
+    return out
+
+def _pad_front(values: np.ndarray, n: int) -> np.ndarray:
+    out = np.full(values.shape[:-1] + (n,), np.nan)
+    if values.shape[-1]:
+        out[..., n - values.shape[-1]:] = values
+    return out
+
+def rolling_return(equity: np.ndarray, window: int) -> np.ndarray:
+    """Retorno dos últimos `window` candles."""
+    equity = np.asarray(equity, dtype=float)
+    n = equity.shape[-1]
+    if window >= n:
+        return np.full(equity.shape, np.nan)
+    return _pad_front(equity[..., window:] / equity[..., :-window] - 1, n)
+
+def rolling_volatility(equity: np.ndarray, window: int, periods: int = TRADING_DAYS) -> np.ndarray:
+    equity = np.asarray(equity, dtype=float)
+    returns = daily_returns(equity)
+    if window < 2 or window > returns.shape[-1]:
+        return np.full(equity.shape, np.nan)
+    mean = _window_sum(returns, window) / window
+    var = (_window_sum(returns ** 2, window) - window * mean ** 2) / (window - 1)
+    return _pad_front(np.sqrt(np.maximum(var, 0.0)) * np.sqrt(periods), equity.shape[-1])
+
+def rolling_sharpe(equity: np.ndarray, window: int, periods: int = TRADING_DAYS) -> np.ndarray:
+    """Sharpe dos últimos `window` retornos."""
+    equity = np.asarray(equity, dtype=float)
+    returns = daily_returns(equity)
+    if window < 2 or window > returns.shape[-1]:
+        return np.full(equity.shape, np.nan)
+    mean = _window_sum(returns, window) / window
+    std = np.sqrt(np.maximum((_window_sum(returns ** 2, window) - window * mean ** 2) / (window - 1), 0.0))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sharpe = np.where(std > 1e-12, mean / std * np.sqrt(periods), 0.0)
+    return _pad_front(sharpe, equity.shape[-1])
+
+def rolling_sortino(equity: np.ndarray, window: int, periods: int = TRADING_DAYS) -> np.ndarray:
+    equity = np.asarray(equity, dtype=float)
+    returns = daily_returns(equity)
+    if window < 1 or window > returns.shape[-1]:
+        return np.full(equity.shape, np.nan)
+    mean = _window_sum(returns, window) / window
+    downside = np.sqrt(_window_sum(np.minimum(returns, 0.0) ** 2, window) / window)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sortino = np.where(downside > 1e-12, mean / downside * np.sqrt(periods), 0.0)
+    return _pad_front(sortino, equity.shape[-1])
+
+def rolling_max_drawdown(equity: np.ndarray, window: int) -> np.ndarray:
+    """
+    Pior drawdown dentro de cada janela de `window` candles (pico e vale na janela).
+    Usa uma visão (n - window + 1, window) da curva: memória O(n * window) por curva.
+    """
+    equity = np.asarray(equity, dtype=float)
+    n = equity.shape[-1]
+    if window < 1 or window > n:
+        return np.full(equity.shape, np.nan)
+    windows = np.lib.stride_tricks.sliding_window_view(equity, window, axis=-1)
+    peak = np.maximum.accumulate(windows, axis=-1)
+    return _pad_front((windows / peak - 1).min(axis=-1), n)
+
+# --- resumo -----------------------------------------------------------------------
+
+def summarize(equity: np.ndarray, returns: Optional[np.ndarray] = None, position: Optional[np.ndarray] = None,
+              price: Optional[np.ndarray] = None, periods: int = TRADING_DAYS,
+              daily: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+    """
+    Métricas de uma curva (n,) ou de um lote (k, n) de uma vez. `returns` são os
+    retornos por trade ((k, m), NaN onde não há trade — ver pad_trade_returns);
+    `position` e `price` habilitam exposure e turnover. `daily` são os retornos por
+    candle da curva, quando o chamador já os tem (não são recalculados).
+    """
+    equity = np.asarray(equity, dtype=float)
+    batch = equity.shape[:-1]
+    if equity.shape[-1] < 2:
+        metrics = {name: np.zeros(batch) for name in
+                   ("total_return", "cagr", "volatility", "sharpe", "sortino", "max_drawdown", "calmar")}
+    else:
+        # Retornos, média e desvio calculados uma vez para todas as razões
+        daily = daily_returns(equity) if daily is None else np.asarray(daily, dtype=float)
+        mean, std = daily.mean(axis=-1), _std(daily)
+        mdd = max_drawdown(equity)
+        growth = cagr(equity, periods)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            calmar = np.where(mdd < 0, growth / np.abs(mdd), 0.0)
+        metrics = {
+            "total_return": total_return(equity),
+            "cagr": growth,
+            "volatility": std * np.sqrt(periods),
+            "sharpe": _sharpe(mean, std, periods),
+            "sortino": _sortino(daily, mean, periods),
+            "max_drawdown": mdd,
+            "calmar": calmar,
+        }
+    if returns is None:
+        returns = np.empty(batch + (0,))
+    metrics["win_rate"] = win_rate(returns)
+    metrics["avg_trade_return"] = avg_trade_return(returns)
+    if position is not None:
+        metrics["exposure"] = exposure(position)
+        if price is not None:
+            metrics["turnover"] = turnover(position, price, equity, periods)
+    return metrics
@@ -1,43 +1,83 @@
+import os
+import numpy as np
 import pandas as pd
-import talib
-import joblib
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.linear_model import LogisticRegression
 from sklearn.preprocessing import StandardScaler
 from sklearn.metrics import accuracy_score, precision_score, recall_score
-from typing import Tuple, Dict
+from typing import Tuple, Dict, List, Optional, Union
+from app.services.feature_store import FeatureStore, feature_matrix
+from app.services.price_cache import price_cache
+from app.services.model_registry import register_model, load_model
+from app.services import model_selection
+
+FEATURES = {
+    'ret_1': ("RET", {"period": 1}),
+    'ret_3': ("RET", {"period": 3}),
+    'ret_5': ("RET", {"period": 5}),
+    'ret_10': ("RET", {"period": 10}),
+    'SMA_10': ("SMA", {"period": 10}),
+    'SMA_50': ("SMA", {"period": 50}),
+    'RSI': ("RSI", {"period": 14}),
+    'ATR': ("ATR", {"period": 14}),
+    'vol': ("VOL", {"period": 10}),
+    'momentum': ("Momentum", {"period": 20}),
+}
+
+# Matrizes float32 por símbolo, atualizadas incrementalmente (ver FeatureStore)
+FEATURE_STORE_DIR = os.getenv("FEATURE_STORE_DIR", os.path.join(os.getenv("YFINANCE_CACHE_DIR", "./cache"), "features"))
+feature_store = FeatureStore(FEATURE_STORE_DIR, FEATURES)
+
+def prepare_features(df: pd.DataFrame, cache: Dict = None, ticker: Optional[str] = None) -> pd.DataFrame:
+    """
+    Features float32 dos candles de `df`, sem as linhas de aquecimento. Com `ticker`, são
+    servidas do feature store quando ele cobre o intervalo; senão são calculadas sobre
+    `df`. O store só é lido aqui: quem o atualiza é o scheduler (update_features), e
+    workers de backtest nunca escrevem nele.
+    """
+    if ticker is not None and len(df):
+        start, end = df.index[0], df.index[-1]
+        if feature_store.covers(ticker, start, end):
+            return feature_store.frame(ticker, start, end)
+    # Um plano só: RET(1) serve a ret_1 e vol, uma soma acumulada aos dois SMAs
+    matrix, _ = feature_matrix(df, FEATURES, cache=cache)
+    df_feat = pd.DataFrame(matrix, columns=list(FEATURES), index=df.index, copy=False)
+    return df_feat.dropna()
+
+def update_features(db, ticker: str) -> int:
+    """Atualiza a matriz de features do símbolo a partir dos preços gravados; retorna as linhas novas."""
+    symbol_id = price_cache.symbol_id(db, ticker)
+    if symbol_id is None:
+        return 0
+    return feature_store.update(ticker, price_cache.frame(db, symbol_id))
+
+def training_matrix(tickers: List[str], start=None, end=None) -> Tuple[np.ndarray, pd.MultiIndex]:
+    """Features de vários símbolos numa matriz float32 única, direto do feature store (sem recalcular)."""
+    return feature_store.stack(tickers, start, end)
+
+def train_model(X: pd.DataFrame, y: pd.Series, model_type: str = 'logreg', db=None, params: Optional[Dict] = None,
+                search: Union[bool, Dict] = False) -> Tuple[object, Dict]:
+    """
+    Treina e registra uma nova versão do modelo no registro de modelos (ver
+    model_registry). As métricas devolvidas incluem o id e a versão registrados.
+
+    Com `search` (True ou opções de model_selection.search: n_splits, purge, embargo,
+    dates, grids, scoring, n_jobs...), os hiperparâmetros são escolhidos por validação
+    cruzada purgada sobre o grid de `model_type` (ou de logreg e rf com "auto") antes do
+    ajuste final em todo X; o resumo da busca fica em metrics["cv"]. A métrica principal
+    passa a ser a média da validação cruzada da configuração escolhida (metrics[scoring]);
+    accuracy/precision/recall do ajuste final, dentro da amostra, ficam em
+    metrics["in_sample"].
+    """
+    cv = None
+    if search:
+        options = search if isinstance(search, dict) else {}
+        model_types = ("logreg", "rf") if model_type == "auto" else (model_type,)
+        cv = model_selection.search(X, y, model_types, **options)
+        model_type, params = cv["best"]["model_type"], cv["best"]["params"]
 
-def prepare_features(df: pd.DataFrame) -> pd.DataFrame:
-    df_feat = pd.DataFrame(index=df.index)
-
-    for lag in [1,3,5,10]:
-        df_feat[f'ret_{lag}'] = df['close'].pct_change(lag)
-
-    df_feat['SMA_10'] = talib.SMA(df['close'], timeperiod=10)
-    df_feat['SMA_50'] = talib.SMA(df['close'], timeperiod=50)
-
-    df_feat['RSI'] = talib.RSI(df['close'], timeperiod=14)
-
-    df_feat['ATR'] = talib.ATR(df['high'], df['low'], df['close'], timeperiod=14)
-
-    df_feat['vol'] = df['close'].pct_change().rolling(10).std()
-
-    df_feat['momentum'] = df['close'] - df['close'].shift(20)
-
-    df_feat = df_feat.dropna()
-    return df_feat
-
-def train_model(X: pd.DataFrame, y: pd.Series, model_type: str = 'logreg') -> Tuple[object, Dict]:
     scaler = StandardScaler()
-    X_scaled = scaler.fit_transform(X)
-
-    if model_type == 'logreg':
-        model = LogisticRegression()
-    elif model_type == 'rf':
-        model = RandomForestClassifier(n_estimators=100)
-    else:
-        raise ValueError("model_type inválido")
+    X_scaled = scaler.fit_transform(np.asarray(X, dtype=np.float32))
 
+    model = model_selection.make_estimator(model_type, params, n_jobs=model_selection.ML_N_JOBS)
     model.fit(X_scaled, y)
     y_pred = model.predict(X_scaled)
 
@@ -46,17 +86,83 @@ def train_model(X: pd.DataFrame, y: pd.Series, model_type: str = 'logreg') -> Tu
         'precision': precision_score(y, y_pred, zero_division=0),
         'recall': recall_score(y, y_pred, zero_division=0)
     }
-
-    joblib.dump({'model': model, 'scaler': scaler}, f'{model_type}_model.pkl')
-
-    return model, metrics
-
-def predict(df: pd.DataFrame, model_path: str = 'logreg_model.pkl') -> pd.Series:
-    model_dict = joblib.load(model_path)
-    model = model_dict['model']
-    scaler = model_dict['scaler']
-
-    X = prepare_features(df)
-    X_scaled = scaler.transform(X)
-    y_pred = model.predict(X_scaled)
+    if cv is not None:
+        metrics = {cv['scoring']: cv['best']['mean_score'], 'in_sample': metrics, 'cv': cv}
+
+    # Último candle visto no treino: backtests do modelo só são fora da amostra depois dele
+    dates = model_selection.sample_dates(X)
+    train_end = str(pd.Timestamp(dates.max()).date()) if len(dates) and np.issubdtype(dates.dtype, np.datetime64) else None
+    artifact = {'model': model, 'scaler': scaler, 'features': list(FEATURES), 'feature_version': feature_store.version,
+                'train_end': train_end}
+    entry = register_model(artifact, model_type, metrics, model.get_params(), feature_store.version, db)
+
+    return model, {**metrics, 'model_id': entry.id, 'version': entry.version}
+
+def _load_artifact(model: Union[int, str], db=None) -> Dict:
+    artifact = load_model(model, db)
+    version = artifact.get('feature_version')
+    if version is not None and version != feature_store.version:
+        raise ValueError(f"modelo {model} foi treinado com outra definição de features")
+    return artifact
+
+def model_train_end(model: Union[int, str], db=None) -> Optional[str]:
+    """Último candle (ISO) do treino de `model`; None se o artefato não o registra."""
+    return _load_artifact(model, db).get('train_end')
+
+def _predict(artifact: Dict, df: pd.DataFrame, ticker: Optional[str], proba: bool) -> pd.Series:
+    X = prepare_features(df, ticker=ticker)
+    if X.empty:
+        return pd.Series([], index=X.index, dtype=float)
+    X_scaled = artifact['scaler'].transform(X.to_numpy())
+    y_pred = artifact['model'].predict_proba(X_scaled)[:, -1] if proba else artifact['model'].predict(X_scaled)
     return pd.Series(y_pred, index=X.index)
+
+def predict(df: pd.DataFrame, model: Union[int, str] = 'logreg', ticker: Optional[str] = None, db=None,
+            proba: bool = False) -> pd.Series:
+    """
+    Previsões para os candles de `df`. `model` é o id do registro, o tipo (última versão)
+    ou o caminho de um artefato; o modelo carregado fica em cache no processo. Com
+    `proba`, devolve a probabilidade da classe positiva em vez da classe.
+    """
+    return _predict(_load_artifact(model, db), df, ticker, proba)
+
+def signal_probabilities(df: pd.DataFrame, model: Union[int, str] = 'logreg', out_of_sample: bool = True,
+                         db=None) -> np.ndarray:
+    """
+    Probabilidade de alta de cada candle de `df` (alinhada às linhas, NaN no
+    aquecimento), numa única chamada ao modelo. As features do candle t usam só dados
+    até o fechamento de t, então a probabilidade pode decidir uma ordem executada em
+    t+1. Com `out_of_sample`, os candles até o fim do treino do modelo ficam NaN.
+    """
+    # Um único artefato para as probabilidades e o fim do treino
+    artifact = _load_artifact(model, db)
+    proba = _predict(artifact, df, None, True).reindex(df.index).to_numpy(dtype=float)
+    train_end = artifact.get('train_end')
+    if out_of_sample and train_end:
+        proba[pd.DatetimeIndex(df.index) <= pd.Timestamp(train_end)] = np.nan
+    return proba
+
+def predict_many(frames: Dict[str, pd.DataFrame], model: Union[int, str] = 'logreg', proba: bool = False,
+                 db=None) -> Dict[str, pd.Series]:
+    """
+    Previsões de vários símbolos ({ticker: preços}) com uma única chamada ao modelo: as
+    features (do feature store, quando ele cobre o intervalo) são empilhadas numa matriz
+    float32 e pontuadas de uma vez. Com `proba`, devolve a probabilidade da classe positiva em vez da classe.
+    """
+    artifact = _load_artifact(model, db)
+    features = {ticker: prepare_features(df, ticker=ticker) for ticker, df in frames.items()}
+    X = np.empty((sum(len(f) for f in features.values()), len(FEATURES)), dtype=np.float32)
+    row = 0
+    for f in features.values():
+        X[row:row + len(f)] = f.to_numpy()
+        row += len(f)
+    if not len(X):
+        return {ticker: pd.Series([], index=f.index, dtype=float) for ticker, f in features.items()}
+
+    X_scaled = artifact['scaler'].transform(X)
+    scores = artifact['model'].predict_proba(X_scaled)[:, -1] if proba else artifact['model'].predict(X_scaled)
+    out, row = {}, 0
+    for ticker, f in features.items():
+        out[ticker] = pd.Series(scores[row:row + len(f)], index=f.index)
+        row += len(f)
+    return out
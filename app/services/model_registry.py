@@ -0,0 +1,154 @@
+import os
+import time
+import uuid
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple, Union
+import joblib
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from app.db.session import SessionLocal
+from app.db.models import MLModel
+
+MODEL_REGISTRY_DIR = os.getenv("MODEL_REGISTRY_DIR", "./models")
+MODEL_CACHE_SIZE = int(os.getenv("MODEL_CACHE_SIZE", "16"))
+# Arrays dos modelos mapeados em memória (somente leitura): workers que carregam o
+# mesmo artefato compartilham as páginas do arquivo em vez de copiá-las
+MODEL_MMAP = os.getenv("MODEL_MMAP", "true").lower() == "true"
+# Por quanto tempo "logreg" (última versão do tipo) é resolvido sem consultar o banco
+MODEL_ALIAS_TTL = float(os.getenv("MODEL_ALIAS_TTL", "60"))
+
+class ModelCache:
+    """
+    Modelos carregados, por caminho do artefato, em LRU limitado por quantidade. Os
+    artefatos são imutáveis (cada treino grava uma versão nova), então uma entrada nunca
+    fica desatualizada.
+    """
+
+    def __init__(self, max_models: int = MODEL_CACHE_SIZE, mmap: bool = MODEL_MMAP):
+        self.max_models = max_models
+        self.mmap = mmap
+        self._entries: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, path: str) -> Dict:
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None:
+                self._entries.move_to_end(path)
+                return entry
+        entry = joblib.load(path, mmap_mode="r" if self.mmap else None)
+        with self._lock:
+            entry = self._entries.setdefault(path, entry)
+            self._entries.move_to_end(path)
+            while len(self._entries) > self.max_models:
+                self._entries.popitem(last=False)
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+model_cache = ModelCache()
+
+_paths: Dict[int, str] = {}
+_aliases: Dict[str, tuple] = {}  # model_type -> (id, resolvido em)
+
+# Treinos simultâneos do mesmo tipo disputam a próxima versão; o perdedor tenta a seguinte
+REGISTER_ATTEMPTS = 5
+
+def artifact_path(model_type: str, version: int) -> str:
+    # Nome único: um treino concorrente que calcule a mesma versão nunca sobrescreve o artefato
+    return os.path.join(MODEL_REGISTRY_DIR, model_type, f"v{version}-{uuid.uuid4().hex[:12]}.joblib")
+
+def register_model(artifact: Dict, model_type: str, metrics: Dict, params: Optional[Dict] = None,
+                   feature_version: Optional[str] = None, db=None) -> MLModel:
+    """
+    Grava `artifact` (model, scaler, features...) como a próxima versão de `model_type`
+    e registra os metadados em ml_models. O artefato vai sem compressão, para que seus
+    arrays possam ser mapeados em memória na carga. Se outro treino registra a mesma
+    versão antes (uq_ml_models_type_version), o artefato é descartado e a próxima
+    versão é tentada.
+    """
+    owns_session = db is None
+    db = db or SessionLocal()
+    try:
+        for attempt in range(REGISTER_ATTEMPTS):
+            version = (db.query(func.max(MLModel.version)).filter(MLModel.model_type == model_type).scalar() or 0) + 1
+            path = artifact_path(model_type, version)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            joblib.dump(artifact, tmp, compress=0)
+            os.replace(tmp, path)
+
+            entry = MLModel(
+                model_type=model_type,
+                version=version,
+                path=path,
+                features=list(artifact.get("features") or []),
+                feature_version=feature_version,
+                params=params or {},
+                metrics=metrics,
+            )
+            db.add(entry)
+            try:
+                db.commit()
+                break
+            except IntegrityError:
+                db.rollback()
+                os.remove(path)
+                if attempt == REGISTER_ATTEMPTS - 1:
+                    raise
+        db.refresh(entry)
+        _paths[entry.id] = path
+        _aliases[model_type] = (entry.id, time.monotonic())
+        return entry
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        if owns_session:
+            db.close()
+
+def _resolve(model: Union[int, str], db=None) -> Tuple[Optional[int], str]:
+    if isinstance(model, str) and os.path.isfile(model):
+        return None, model
+    if isinstance(model, int) and model in _paths:
+        return model, _paths[model]
+    if isinstance(model, str) and model in _aliases:
+        model_id, resolved_at = _aliases[model]
+        if time.monotonic() - resolved_at < MODEL_ALIAS_TTL:
+            return model_id, _paths[model_id]
+
+    owns_session = db is None
+    db = db or SessionLocal()
+    try:
+        query = db.query(MLModel)
+        if isinstance(model, int):
+            entry = query.filter(MLModel.id == model).first()
+        else:
+            entry = query.filter(MLModel.model_type == model).order_by(MLModel.version.desc()).first()
+        if entry is None:
+            raise ValueError(f"modelo não encontrado: {model}")
+        _paths[entry.id] = entry.path
+        if not isinstance(model, int):
+            _aliases[model] = (entry.id, time.monotonic())
+        return entry.id, entry.path
+    finally:
+        if owns_session:
+            db.close()
+
+def resolve_model(model: Union[int, str], db=None) -> str:
+    """
+    Caminho do artefato de `model`: id do registro, tipo (última versão, resolvida no
+    máximo a cada MODEL_ALIAS_TTL segundos) ou caminho de um arquivo .pkl/.joblib.
+    """
+    return _resolve(model, db)[1]
+
+def resolve_model_id(model: Union[int, str], db=None) -> Optional[int]:
+    """Id do registro de `model` (o tipo vira a versão atual); None para um caminho de artefato."""
+    return _resolve(model, db)[0]
+
+def load_model(model: Union[int, str], db=None) -> Dict:
+    """Artefato ({"model", "scaler", ...}) do cache do processo; o disco só é lido na primeira vez."""
+    return model_cache.get(resolve_model(model, db))
@@ -0,0 +1,140 @@
+import math
+import os
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import get_scorer
+from sklearn.model_selection import ParameterGrid
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+
+# Processos da busca (cada um ajusta uma configuração num fold) e threads do ajuste final
+ML_N_JOBS = int(os.getenv("ML_N_JOBS", os.cpu_count() or 1))
+
+# Candles à frente que o rótulo olha (ml_pipeline: alta do fechamento seguinte). É o
+# purge padrão: as datas de treino cujos rótulos caem dentro do bloco de teste saem
+LABEL_HORIZON = 1
+
+PARAM_GRIDS = {
+    "logreg": {"C": [0.01, 0.1, 1.0, 10.0]},
+    "rf": {"n_estimators": [100, 300], "max_depth": [4, 8, None], "min_samples_leaf": [1, 20]},
+}
+
+def make_estimator(model_type: str, params: Optional[Dict] = None, n_jobs: Optional[int] = None):
+    params = dict(params or {})
+    if model_type == "logreg":
+        return LogisticRegression(**params)
+    if model_type == "rf":
+        return RandomForestClassifier(**{"n_estimators": 100, "n_jobs": n_jobs, **params})
+    raise ValueError("model_type inválido")
+
+def sample_dates(X, dates=None) -> np.ndarray:
+    """Data de cada linha: `dates`, o nível "date" de um MultiIndex, um DatetimeIndex ou a posição."""
+    if dates is not None:
+        return np.asarray(dates)
+    index = getattr(X, "index", None)
+    if isinstance(index, pd.MultiIndex) and "date" in index.names:
+        return index.get_level_values("date").to_numpy()
+    if isinstance(index, pd.DatetimeIndex):
+        return index.to_numpy()
+    return np.arange(len(X))
+
+def purged_folds(dates, n_splits: int = 5) -> Tuple[np.ndarray, List[Tuple[int, int]]]:
+    """
+    Folds por data: as datas distintas viram `n_splits` blocos consecutivos de teste.
+    Linhas de vários símbolos na mesma data caem sempre no mesmo lado. Retorna (posição
+    da data de cada linha, [(lo, hi) do bloco de teste, em posições de data]).
+    """
+    unique, position = np.unique(np.asarray(dates), return_inverse=True)
+    if n_splits < 2 or len(unique) < n_splits:
+        raise ValueError("n_splits deve ser >= 2 e <= número de datas")
+    bounds = np.linspace(0, len(unique), n_splits + 1).astype(int)
+    return position, [(int(lo), int(hi)) for lo, hi in zip(bounds[:-1], bounds[1:])]
+
+def split_masks(position: np.ndarray, fold: Tuple[int, int], purge: int = 0, embargo: int = 0):
+    """
+    Máscaras (treino, teste) de um fold: o treino é todo o resto menos as `purge` datas
+    antes do bloco de teste (rótulos que olham para dentro dele) e as `embargo` depois.
+    """
+    lo, hi = fold
+    test = (position >= lo) & (position < hi)
+    train = (position < lo - purge) | (position >= hi + embargo)
+    return train, test
+
+def _fit_fold(X, y, position, fold, purge, embargo, model_type, params, scoring) -> Dict:
+    started = time.perf_counter()
+    train, test = split_masks(position, fold, purge, embargo)
+    # Escalonador ajustado só no treino do fold; um thread por ajuste (o paralelismo é da busca)
+    pipeline = make_pipeline(StandardScaler(), make_estimator(model_type, params, n_jobs=1))
+    pipeline.fit(X[train], y[train])
+    fitted = time.perf_counter()
+    score = get_scorer(scoring)(pipeline, X[test], y[test])
+    return {
+        "score": float(score),
+        "train_rows": int(train.sum()),
+        "test_rows": int(test.sum()),
+        "fit_ms": round(1000 * (fitted - started), 2),
+        "score_ms": round(1000 * (time.perf_counter() - fitted), 2),
+    }
+
+def search(X, y, model_types: Sequence[str] = ("logreg", "rf"), grids: Optional[Dict] = None, dates=None,
+           n_splits: int = 5, purge: int = LABEL_HORIZON, embargo: int = 0, scoring: str = "accuracy",
+           n_jobs: Optional[int] = None, keep: float = 0.5, min_folds: int = 2) -> Dict:
+    """
+    Busca de hiperparâmetros com validação cruzada purgada (ver purged_folds).
+
+    Os folds são avaliados em rodadas: em cada uma, todas as configurações ainda vivas
+    ajustam o mesmo fold em paralelo (joblib, `n_jobs` processos; X é mapeado em memória
+    nos workers). A partir de `min_folds` folds, só a fração `keep` com melhor média
+    segue para o próximo fold (successive halving). A melhor é a de maior média entre as
+    que passaram por todos os folds. `purge` deve cobrir o horizonte dos rótulos.
+    """
+    if purge < 0 or embargo < 0:
+        raise ValueError("purge e embargo devem ser >= 0")
+    grids = {**PARAM_GRIDS, **(grids or {})}
+    configs = [(model_type, params) for model_type in model_types for params in ParameterGrid(grids[model_type])]
+    position, folds = purged_folds(sample_dates(X, dates), n_splits)
+    X = np.ascontiguousarray(np.asarray(X, dtype=np.float32))
+    y = np.asarray(y)
+
+    results = [{"model_type": m, "params": p, "folds": [], "pruned_after": None} for m, p in configs]
+    alive = list(range(len(configs)))
+    started = time.perf_counter()
+    with Parallel(n_jobs=n_jobs or ML_N_JOBS) as parallel:
+        for k, fold in enumerate(folds):
+            outputs = parallel(
+                delayed(_fit_fold)(X, y, position, fold, purge, embargo, *configs[i], scoring) for i in alive
+            )
+            for i, out in zip(alive, outputs):
+                results[i]["folds"].append(out)
+            if min_folds <= k + 1 < len(folds) and len(alive) > 1:
+                ranked = sorted(alive, key=lambda i: -np.mean([f["score"] for f in results[i]["folds"]]))
+                survivors = ranked[:max(1, math.ceil(len(alive) * keep))]
+                for i in ranked[len(survivors):]:
+                    results[i]["pruned_after"] = k + 1
+                alive = survivors
+    elapsed = time.perf_counter() - started
+
+    for result in results:
+        scores = [f["score"] for f in result["folds"]]
+        result["mean_score"] = float(np.mean(scores))
+        result["std_score"] = float(np.std(scores))
+    complete = [r for r in results if r["pruned_after"] is None]
+    best = max(complete, key=lambda r: r["mean_score"])
+    return {
+        "best": {"model_type": best["model_type"], "params": best["params"],
+                 "mean_score": best["mean_score"], "std_score": best["std_score"]},
+        "results": sorted(results, key=lambda r: (r["pruned_after"] is not None, -r["mean_score"])),
+        "scoring": scoring,
+        "timing": {
+            "total_ms": round(1000 * elapsed, 2),
+            "n_jobs": n_jobs or ML_N_JOBS,
+            "fits": sum(len(r["folds"]) for r in results),
+            "configs": len(configs),
+            "n_splits": len(folds),
+        },
+    }
@@ -0,0 +1,198 @@
+import inspect
+import warnings
+import numpy as np
+import pandas as pd
+from typing import Dict, List
+from sqlalchemy import text, bindparam
+from app.services.metrics import total_return, sharpe_ratio, max_drawdown
+
+PRICE_FIELDS = ("high", "low", "close")
+
+def load_price_matrix(db, tickers: List[str], start_date, end_date, fields=PRICE_FIELDS) -> Dict:
+    """
+    Carrega os preços de todos os tickers em uma única consulta e devolve matrizes
+    float64 alinhadas (símbolos x datas). Datas sem pregão para um símbolo ficam NaN.
+    O filtro por symbol_id IN (...) permite ao Postgres podar as partições HASH.
+    """
+    symbols = db.execute(
+        text("SELECT id, ticker FROM symbols WHERE ticker IN :tickers").bindparams(bindparam("tickers", expanding=True)),
+        {"tickers": list(tickers)},
+    ).fetchall()
+    ticker_by_id = {row.id: row.ticker for row in symbols}
+    missing = set(tickers) - set(ticker_by_id.values())
+    if missing:
+        raise ValueError(f"Tickers sem cadastro: {sorted(missing)}")
+
+    columns = ", ".join(f"{f}::float8 AS {f}" for f in fields)
+    query = text(
+        f"SELECT symbol_id, date, {columns} FROM prices "
+        "WHERE symbol_id IN :ids AND date BETWEEN :start AND :end ORDER BY date"
+    ).bindparams(bindparam("ids", expanding=True))
+    df = pd.read_sql(query, db.bind, params={"ids": list(ticker_by_id), "start": start_date, "end": end_date})
+
+    dates = pd.DatetimeIndex(sorted(df["date"].unique()))
+    date_pos = dates.get_indexer(pd.DatetimeIndex(df["date"]))
+    symbol_pos = df["symbol_id"].map({sid: i for i, sid in enumerate(ticker_by_id)}).to_numpy()
+
+    matrix = {"tickers": list(ticker_by_id.values()), "dates": dates}
+    for field in fields:
+        values = np.full((len(ticker_by_id), len(dates)), np.nan)
+        values[symbol_pos, date_pos] = df[field].to_numpy(dtype=float)
+        matrix[field] = values
+    return matrix
+
+def _rolling(values: np.ndarray, window: int):
+    # pandas faz a janela ao longo das linhas; transpomos para (datas x símbolos)
+    return pd.DataFrame(values.T).rolling(window)
+
+def sma_cross_states(matrix: Dict, fast: int = 50, slow: int = 200) -> np.ndarray:
+    sma_fast = _rolling(matrix["close"], fast).mean().to_numpy().T
+    sma_slow = _rolling(matrix["close"], slow).mean().to_numpy().T
+    return sma_fast > sma_slow
+
+def donchian_breakout_states(matrix: Dict, lookback_high: int = 20, lookback_low: int = 10) -> np.ndarray:
+    high_max = _rolling(matrix["high"], lookback_high).max().shift(1).to_numpy().T
+    low_min = _rolling(matrix["low"], lookback_low).min().shift(1).to_numpy().T
+    close = matrix["close"]
+
+    # Rompimento liga, perda da mínima desliga; o estado é propagado até o próximo evento
+    events = np.where(close > high_max, 1.0, np.where(close < low_min, 0.0, np.nan))
+    return pd.DataFrame(events.T).ffill().fillna(0).to_numpy().T > 0
+
+def momentum_states(matrix: Dict, lookback: int = 60, percentile_threshold: int = 70) -> np.ndarray:
+    """
+    Cross-sectional: em cada data compra os símbolos cujo retorno acumulado está
+    acima do percentil `percentile_threshold` do universo.
+    """
+    close = matrix["close"]
+    ret_acum = np.full_like(close, np.nan)
+    ret_acum[:, lookback:] = close[:, lookback:] / close[:, :-lookback] - 1
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # datas ainda sem histórico
+        threshold = np.nanpercentile(ret_acum, percentile_threshold, axis=0)
+    return ret_acum > threshold
+
+def ml_signal_states(matrix: Dict, model="logreg", entry_threshold: float = 0.55, exit_threshold: float = 0.45,
+                     out_of_sample: bool = True) -> np.ndarray:
+    """
+    Probabilidade de alta de um modelo do registro para todos os símbolos, numa única
+    chamada ao modelo (ver ml_pipeline.predict_many): acima de `entry_threshold` liga,
+    abaixo de `exit_threshold` desliga, e o estado é propagado até o próximo evento.
+    """
+    # Import local: o sklearn só é carregado por quem usa a estratégia
+    from app.services.ml_pipeline import predict_many, model_train_end
+
+    dates = matrix["dates"]
+    frames = {}
+    for i, ticker in enumerate(matrix["tickers"]):
+        frame = pd.DataFrame({field: matrix[field][i] for field in PRICE_FIELDS}, index=dates)
+        frames[ticker] = frame[np.isfinite(matrix["close"][i])]
+    proba = np.full(matrix["close"].shape, np.nan)
+    for i, series in enumerate(predict_many(frames, model, proba=True).values()):
+        proba[i, dates.get_indexer(series.index)] = series.to_numpy()
+
+    train_end = model_train_end(model)
+    if out_of_sample and train_end:
+        proba[:, dates <= pd.Timestamp(train_end)] = np.nan
+    events = np.where(proba > entry_threshold, 1.0, np.where(proba < exit_threshold, 0.0, np.nan))
+    return pd.DataFrame(events.T).ffill().fillna(0).to_numpy().T > 0
+
+PORTFOLIO_STATES = {
+    "sma_cross": sma_cross_states,
+    "donchian_breakout": donchian_breakout_states,
+    "momentum": momentum_states,
+    "ml_signal": ml_signal_states,
+}
+
+def build_portfolio_states(matrix: Dict, strategy_type: str, params: Dict = None) -> np.ndarray:
+    func = PORTFOLIO_STATES.get(strategy_type.lower())
+    if func is None:
+        raise ValueError(f"strategy_type inválido: {strategy_type}")
+    params = params or {}
+    accepted = list(inspect.signature(func).parameters)[1:]
+    return func(matrix, **{k: v for k, v in params.items() if k in accepted})
+
+def portfolio_trades(matrix: Dict, weights: np.ndarray, pnl: np.ndarray, commissions: np.ndarray,
+                     equity_before: np.ndarray) -> List[Dict]:
+    """
+    Um trade por período contínuo com peso > 0 de cada símbolo: entra no fechamento em
+    que o peso liga e sai no fechamento em que desliga. O PnL é a contribuição do símbolo
+    ao capital no período (retornos dos candles mantidos menos as comissões dos seus
+    rebalanceamentos) e `size` a quantidade comprada na entrada. Trades ainda abertos no
+    último candle ficam sem saída nem PnL, como nos motores de um símbolo.
+    """
+    dates = pd.DatetimeIndex(matrix["dates"])
+    filled = pd.DataFrame(matrix["close"].T).ffill().to_numpy().T
+    trades = []
+    for i, ticker in enumerate(matrix["tickers"]):
+        on = np.concatenate(([False], weights[i] > 0, [False]))
+        entries = np.flatnonzero(on[1:] & ~on[:-1])
+        exits = np.flatnonzero(~on[1:] & on[:-1])
+        for a, b in zip(entries, exits):
+            closed = b < len(dates)
+            commission = float(commissions[i, a:b + 1].sum())
+            trades.append({
+                "ticker": ticker,
+                "entry_date": dates[a].date(),
+                "exit_date": dates[b].date() if closed else None,
+                "side": "LONG",
+                "entry_price": float(filled[i, a]),
+                "exit_price": float(filled[i, b]) if closed else None,
+                "size": float(weights[i, a] * equity_before[a] / filled[i, a]),
+                "commission": commission,
+                "pnl": float(pnl[i, a + 1:b + 1].sum()) - commission if closed else None,
+            })
+    trades.sort(key=lambda t: t["entry_date"])
+    return trades
+
+def run_portfolio_backtest(matrix: Dict, states: np.ndarray, initial_cash: float = 100000,
+                           commission: float = 0.0) -> Dict:
+    """
+    Capital compartilhado: a cada fechamento os símbolos ativos recebem pesos iguais
+    e a carteira é rebalanceada; o retorno do candle seguinte usa os pesos do anterior.
+    A comissão incide sobre o giro de cada rebalanceamento: soma de |Δpeso| entre os
+    pesos-alvo e os pesos que a carteira tinha depois de os preços andarem. Os trades
+    são gerados por símbolo (ver portfolio_trades).
+    """
+    close = matrix["close"]
+    tradable = states & np.isfinite(close)
+    active = tradable.sum(axis=0)
+    weights = np.where(tradable, 1.0 / np.maximum(active, 1), 0.0)
+
+    # Dias sem pregão de um símbolo mantêm o último preço para o cálculo do retorno
+    filled = pd.DataFrame(close.T).ffill().to_numpy().T
+    returns = np.zeros_like(close)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        returns[:, 1:] = filled[:, 1:] / filled[:, :-1] - 1
+    returns[~np.isfinite(returns)] = 0.0
+
+    held = np.zeros_like(weights)
+    held[:, 1:] = weights[:, :-1]
+    gross = (held * returns).sum(axis=0)
+    # Pesos antes do rebalanceamento: os do candle anterior depois da variação dos preços
+    drifted = held * (1 + returns) / (1 + gross)
+    traded = np.abs(weights - drifted)
+    turnover = traded.sum(axis=0)
+
+    portfolio_returns = (1 + gross) * (1 - commission * turnover) - 1
+    equity = initial_cash * np.cumprod(1 + portfolio_returns)
+    equity_prev = np.concatenate(([initial_cash], equity[:-1]))
+    exposure = weights.sum(axis=0)
+    trades = portfolio_trades(matrix, weights, held * returns * equity_prev,
+                              commission * traded * equity_prev * (1 + gross), equity_prev * (1 + gross))
+    return {
+        "tickers": matrix["tickers"],
+        "dates": matrix["dates"],
+        "equity": equity,
+        "cash": equity * (1 - exposure),
+        "exposure": exposure,
+        "position": active,  # número de símbolos em carteira
+        "weights": weights,
+        "turnover": turnover,
+        "trades": trades,
+        "metrics": {
+            "total_return": float(total_return(equity)),
+            "sharpe": float(sharpe_ratio(equity)),
+            "max_drawdown": float(max_drawdown(equity)),
+        },
+    }
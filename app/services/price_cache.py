@@ -0,0 +1,145 @@
+import os
+import threading
+from collections import OrderedDict
+from datetime import date, datetime
+from typing import Dict, Optional
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+PRICE_CACHE_BYTES = int(os.getenv("PRICE_CACHE_BYTES", str(256 * 1024 * 1024)))
+PRICE_FIELDS = ("open", "high", "low", "close", "volume")
+
+def _as_date(value) -> date:
+    # date.min/date.max (intervalo aberto) estão fora do alcance de pd.Timestamp
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+def _covered_end(end, version: tuple) -> date:
+    # Até onde há candles na versão: nada depois do último existe (ainda)
+    end, last = _as_date(end), version[1]
+    return min(end, _as_date(last)) if last is not None else end
+
+def _nbytes(arrays: Dict[str, np.ndarray]) -> int:
+    return sum(a.nbytes for a in arrays.values())
+
+class PriceCache:
+    """
+    Cache em processo das séries de preços já decodificadas: arrays float64 contíguos
+    (e datas datetime64) por (symbol_id, [start, end]). Um intervalo em cache atende
+    qualquer sub-intervalo por fatia. Eviction LRU limitada por bytes.
+
+    Cada entrada guarda a versão dos preços do símbolo no banco (symbols.prices_version,
+    incrementada por persist_prices, e o último candle) lida antes da consulta, e só é
+    servida enquanto o banco está nessa versão. Assim gravações feitas por qualquer
+    processo (outra API, o job de ingestão) são vistas no próximo acesso. O fim da chave
+    é o último candle existente, não o pedido: uma carga até date.max não afirma cobrir
+    candles gravados depois dela.
+    """
+
+    def __init__(self, max_bytes: int = PRICE_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        # (symbol_id, start, fim coberto) -> (versão, arrays)
+        self._entries: "OrderedDict[tuple[int, date, date], tuple[tuple, Dict[str, np.ndarray]]]" = OrderedDict()
+        self._symbol_ids: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def _drop(self, key):
+        self.nbytes -= _nbytes(self._entries.pop(key)[1])
+
+    def get(self, symbol_id: int, start, end, version: tuple) -> Optional[Dict[str, np.ndarray]]:
+        """Fatia [start, end] (datas inclusivas) de uma entrada da `version` que contém o intervalo, ou None."""
+        start, end = _as_date(start), _covered_end(end, version)
+        with self._lock:
+            for key, (entry_version, arrays) in reversed(list(self._entries.items())):
+                if key[0] != symbol_id:
+                    continue
+                if entry_version != version:
+                    self._drop(key)  # o banco mudou desde a carga
+                elif key[1] <= start and end <= key[2]:
+                    self._entries.move_to_end(key)
+                    lo = np.searchsorted(arrays["date"], np.datetime64(start), side="left")
+                    hi = np.searchsorted(arrays["date"], np.datetime64(end), side="right")
+                    return {name: a[lo:hi] for name, a in arrays.items()}
+        return None
+
+    def put(self, symbol_id: int, start, end, arrays: Dict[str, np.ndarray], version: tuple):
+        start, end = _as_date(start), _covered_end(end, version)
+        size = _nbytes(arrays)
+        if size > self.max_bytes:
+            return
+        for a in arrays.values():
+            a.flags.writeable = False  # fatias são compartilhadas entre chamadores
+        with self._lock:
+            # Entradas contidas no novo intervalo ficam redundantes; as de outra versão, inválidas
+            for key, (entry_version, _) in list(self._entries.items()):
+                if key[0] == symbol_id and (entry_version != version or (start <= key[1] and key[2] <= end)):
+                    self._drop(key)
+            self._entries[(symbol_id, start, end)] = (version, arrays)
+            self.nbytes += size
+            while self.nbytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self.nbytes -= _nbytes(evicted)
+
+    def invalidate(self, symbol_id: Optional[int] = None):
+        """Descarta já as séries do símbolo (ou todas) neste processo; os demais veem a nova versão no banco."""
+        with self._lock:
+            for key in [k for k in self._entries if symbol_id is None or k[0] == symbol_id]:
+                self._drop(key)
+
+    def symbol_id(self, db, ticker: str) -> Optional[int]:
+        symbol_id = self._symbol_ids.get(ticker)
+        if symbol_id is None:
+            symbol_id = db.execute(text("SELECT id FROM symbols WHERE ticker = :ticker"), {"ticker": ticker}).scalar()
+            if symbol_id is not None:
+                self._symbol_ids[ticker] = symbol_id
+        return symbol_id
+
+    def _query(self, symbol_id: int, start, end):
+        columns = ", ".join(f"{f}::float8 AS {f}" for f in PRICE_FIELDS)
+        stmt = text(f"SELECT date, {columns} FROM prices WHERE symbol_id = :symbol_id "
+                    "AND date BETWEEN :start AND :end ORDER BY date")
+        return stmt, {"symbol_id": symbol_id, "start": _as_date(start), "end": _as_date(end)}
+
+    def _version_query(self, symbol_id: int):
+        stmt = text("SELECT prices_version, (SELECT max(date) FROM prices WHERE symbol_id = :symbol_id) "
+                    "FROM symbols WHERE id = :symbol_id")
+        return stmt, {"symbol_id": symbol_id}
+
+    def _store(self, symbol_id: int, start, end, rows, version: tuple) -> Dict[str, np.ndarray]:
+        arrays = {"date": np.array([r[0] for r in rows], dtype="datetime64[D]")}
+        values = np.array([r[1:] for r in rows], dtype=np.float64).reshape(len(rows), len(PRICE_FIELDS))
+        for i, field in enumerate(PRICE_FIELDS):
+            arrays[field] = np.ascontiguousarray(values[:, i])
+        self.put(symbol_id, start, end, arrays, version)
+        return arrays
+
+    def load(self, db, symbol_id: int, start=date.min, end=date.max) -> Dict[str, np.ndarray]:
+        """Série [start, end] do cache ou, na falta, do banco (e guarda o resultado)."""
+        # A versão é lida antes dos preços: uma gravação no meio deixa a entrada já velha, nunca nova demais
+        version = tuple(db.execute(*self._version_query(symbol_id)).one_or_none() or (None, None))
+        arrays = self.get(symbol_id, start, end, version)
+        if arrays is not None:
+            return arrays
+        return self._store(symbol_id, start, end, db.execute(*self._query(symbol_id, start, end)).fetchall(), version)
+
+    async def aload(self, db, symbol_id: int, start=date.min, end=date.max) -> Dict[str, np.ndarray]:
+        """Como load, com uma AsyncSession."""
+        version = tuple((await db.execute(*self._version_query(symbol_id))).one_or_none() or (None, None))
+        arrays = self.get(symbol_id, start, end, version)
+        if arrays is not None:
+            return arrays
+        result = await db.execute(*self._query(symbol_id, start, end))
+        return self._store(symbol_id, start, end, result.fetchall(), version)
+
+    def frame(self, db, symbol_id: int, start=date.min, end=date.max) -> pd.DataFrame:
+        """DataFrame OHLCV float64 indexado por data (cópia; o cache continua imutável)."""
+        arrays = self.load(db, symbol_id, start, end)
+        index = pd.DatetimeIndex(arrays["date"].astype("datetime64[ns]"), name="date")
+        return pd.DataFrame({f: arrays[f] for f in PRICE_FIELDS}, index=index, copy=True)
+
+price_cache = PriceCache()
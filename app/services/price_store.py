@@ -0,0 +1,118 @@
+import os
+import glob
+import threading
+import json
+import pickle
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+from typing import List, Optional, Tuple
+
+OHLCV_COLUMNS = ["date", "close", "high", "low", "open", "volume"]
+
+def _merge_ranges(ranges: List[Tuple[str, str]]) -> List[Tuple[str, str]]:
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+class PriceStore:
+    """
+    Cache OHLCV colunar: um arquivo Arrow IPC (Feather v2, sem compressão) por símbolo,
+    lido via memory-map. Os intervalos [start, end) já baixados ficam nos metadados do
+    schema, então qualquer sub-intervalo é servido por fatia e só as lacunas são baixadas.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+
+    def lock(self, ticker: str) -> threading.Lock:
+        """Lock por símbolo: pedidos simultâneos do mesmo ticker baixam as lacunas uma vez só."""
+        with self._locks_guard:
+            return self._locks.setdefault(ticker, threading.Lock())
+
+    def path(self, ticker: str) -> str:
+        return os.path.join(self.root, f"{ticker}.arrow")
+
+    def _load(self, ticker: str, columns: Optional[List[str]] = None) -> Optional[pa.Table]:
+        path = self.path(ticker)
+        if not os.path.exists(path):
+            return None
+        if columns is not None and "date" not in columns:
+            columns = ["date"] + list(columns)
+        return feather.read_table(path, columns=columns, memory_map=True)
+
+    def coverage(self, ticker: str) -> List[Tuple[str, str]]:
+        path = self.path(ticker)
+        if not os.path.exists(path):
+            return []
+        metadata = pa.ipc.open_file(pa.memory_map(path)).schema.metadata or {}
+        return [tuple(r) for r in json.loads(metadata.get(b"coverage", b"[]"))]
+
+    def missing_ranges(self, ticker: str, start: str, end: str) -> List[Tuple[str, str]]:
+        gaps = []
+        cursor = start
+        for cov_start, cov_end in self.coverage(ticker):
+            if cov_end <= cursor:
+                continue
+            if cov_start >= end:
+                break
+            if cov_start > cursor:
+                gaps.append((cursor, cov_start))
+            cursor = max(cursor, cov_end)
+        if cursor < end:
+            gaps.append((cursor, end))
+        return gaps
+
+    def read(self, ticker: str, start: str, end: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """Fatia [start, end) do arquivo mapeado; `columns` lê só as colunas pedidas (+ date)."""
+        table = self._load(ticker, columns)
+        if table is None:
+            return pd.DataFrame(columns=["date"] + list(columns or OHLCV_COLUMNS[1:]))
+        dates = table.column("date").to_numpy()
+        lo, hi = np.searchsorted(dates, [np.datetime64(start), np.datetime64(end)])
+        return table.slice(lo, hi - lo).to_pandas()
+
+    def write(self, ticker: str, df: pd.DataFrame, start: str, end: str):
+        """Mescla `df` ao arquivo existente (datas novas prevalecem) e registra [start, end)."""
+        existing = self._load(ticker)
+        coverage = self.coverage(ticker)
+        frames = [existing.to_pandas()] if existing is not None else []
+        if not df.empty:
+            frames.append(df[OHLCV_COLUMNS])
+        merged = (
+            pd.concat(frames, ignore_index=True)
+            .drop_duplicates(subset="date", keep="last")
+            .sort_values("date", ignore_index=True)
+        )
+        merged["date"] = pd.to_datetime(merged["date"]).astype("datetime64[ns]")
+
+        table = pa.Table.from_pandas(merged, preserve_index=False)
+        if start < end:
+            coverage = _merge_ranges(coverage + [(start, end)])
+        table = table.replace_schema_metadata({b"coverage": json.dumps(coverage).encode()})
+        # Temporário único por escritor: os.replace só publica arquivos completos
+        tmp = f"{self.path(ticker)}.{os.getpid()}.{threading.get_ident()}.tmp"
+        feather.write_feather(table, tmp, compression="uncompressed")
+        os.replace(tmp, self.path(ticker))
+
+    def import_pickles(self, ticker: str, pickle_dir: str):
+        """
+        Importa caches antigos `{ticker}_{start}_{end}.pkl`. Os arquivos ficam onde estão:
+        o chamador só importa enquanto o ticker ainda não tem arquivo no store.
+        """
+        for path in glob.glob(os.path.join(pickle_dir, f"{glob.escape(ticker)}_*_*.pkl")):
+            start, end = os.path.basename(path)[len(ticker) + 1:-len(".pkl")].split("_")
+            with open(path, "rb") as f:
+                df = pickle.load(f)
+            if isinstance(df.columns, pd.MultiIndex):
+                df.columns = [c[0] for c in df.columns]
+            if not df.empty:
+                self.write(ticker, df, start, end)
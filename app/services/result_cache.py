@@ -0,0 +1,93 @@
+import hashlib
+import inspect
+import json
+import os
+from datetime import date, datetime
+from typing import Dict, Optional
+from sqlalchemy import case, text
+from app.db.models import Backtest, BacktestStatus
+from app.services.price_cache import price_cache
+
+# Status em que um backtest idêntico pode ser reaproveitado: concluído ou ainda na fila
+# / rodando (o pedido novo passa a acompanhar a mesma execução)
+REUSABLE_STATUSES = (BacktestStatus.COMPLETED, BacktestStatus.PENDING, BacktestStatus.RUNNING)
+
+def _code_version() -> str:
+    # Mudar estratégias, motores ou indicadores invalida os resultados anteriores
+    from app.services import (
+        backtest_runner, indicator_registry, metrics, portfolio, risk_management, strategies, vectorized_engine,
+    )
+    from app.strategies import signal_strategy
+    digest = hashlib.sha256()
+    for module in (backtest_runner, indicator_registry, metrics, portfolio, risk_management,
+                   strategies, vectorized_engine, signal_strategy):
+        digest.update(inspect.getsource(module).encode())
+    return digest.hexdigest()[:16]
+
+_strategy_code_version = os.getenv("STRATEGY_CODE_VERSION")
+
+def strategy_code_version() -> str:
+    """Hash do código que produz os resultados (ou STRATEGY_CODE_VERSION, se definido)."""
+    global _strategy_code_version
+    if _strategy_code_version is None:
+        _strategy_code_version = _code_version()
+    return _strategy_code_version
+
+def _as_iso(value) -> str:
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()[:10]
+    return date.fromisoformat(str(value)[:10]).isoformat()
+
+def normalize_request(request: Dict) -> Dict:
+    """Campos que definem o resultado, em forma canônica (datas ISO, números float, parâmetros ordenados)."""
+    return {
+        "ticker": request["ticker"].strip(),
+        "start_date": _as_iso(request["start_date"]),
+        "end_date": _as_iso(request["end_date"]),
+        "strategy_type": request["strategy_type"].strip().lower(),
+        "strategy_params": json.loads(json.dumps(request.get("strategy_params") or {}, sort_keys=True)),
+        "initial_cash": float(request.get("initial_cash") or 0.0),
+        "commission": float(request.get("commission") or 0.0),
+        "timeframe": request.get("timeframe") or "1d",
+        "engine": request.get("engine") or "backtrader",
+    }
+
+def data_version(db, ticker: str, start, end) -> str:
+    """
+    Digest dos preços do intervalo (datas e OHLCV): muda quando candles são gravados ou
+    corrigidos dentro de [start, end], e só então.
+    """
+    symbol_id = price_cache.symbol_id(db, ticker)
+    if symbol_id is None:
+        return "none"
+    row = db.execute(text(
+        "SELECT count(*) AS n, md5(string_agg(concat_ws(',', date, open, high, low, close, volume), ';' ORDER BY date)) AS digest "
+        "FROM prices WHERE symbol_id = :symbol_id AND date BETWEEN :start AND :end"
+    ), {"symbol_id": symbol_id, "start": _as_iso(start), "end": _as_iso(end)}).one()
+    return f"{row.n}:{row.digest or ''}"
+
+def request_hash(normalized: Dict, data: str, code: str) -> str:
+    payload = json.dumps({"request": normalized, "data": data, "code": code}, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+def backtest_key(db, normalized: Dict) -> str:
+    """Chave de conteúdo do backtest: pedido normalizado + versão dos dados + versão do código."""
+    data = data_version(db, normalized["ticker"], normalized["start_date"], normalized["end_date"])
+    return request_hash(normalized, data, strategy_code_version())
+
+def lock_key(db, key: str):
+    """
+    Serializa, até o fim da transação de `db`, pedidos com a mesma chave (advisory lock
+    do Postgres): o segundo de dois pedidos simultâneos encontra a linha do primeiro.
+    """
+    if db.bind.dialect.name == "postgresql":
+        db.execute(text("SELECT pg_advisory_xact_lock(hashtextextended(:key, 0))"), {"key": key})
+
+def find_reusable(db, key: str) -> Optional[Backtest]:
+    """Backtest com a mesma chave já concluído (preferido) ou em andamento."""
+    return (
+        db.query(Backtest)
+        .filter(Backtest.request_hash == key, Backtest.status.in_(REUSABLE_STATUSES))
+        .order_by(case((Backtest.status == BacktestStatus.COMPLETED, 0), else_=1), Backtest.created_at.desc())
+        .first()
+    )
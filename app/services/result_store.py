@@ -0,0 +1,143 @@
+import io
+import os
+from typing import Dict, Optional
+import numpy as np
+import pandas as pd
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db import async_crud
+from app.db.bulk import copy_insert
+from app.db.models import Backtest, BacktestResult, DailyPosition, Metric, Trade
+from app.services.metrics import drawdown, summarize, trade_returns
+
+# "rows": uma linha por candle em daily_positions; "blob": curva comprimida em backtest_results
+EQUITY_STORAGE = os.getenv("BACKTEST_EQUITY_STORAGE", "rows")
+CURVE_FIELDS = ("equity", "cash", "position_size", "drawdown")
+TRADE_COLUMNS = ["entry_date", "exit_date", "side", "entry_price", "exit_price", "size", "commission", "pnl", "ticker"]
+
+def equity_curve(result: Dict) -> Dict[str, np.ndarray]:
+    """Curva colunar (date + CURVE_FIELDS) a partir do resultado de um motor de backtest."""
+    equity = np.asarray(result["equity"], dtype=float)
+    return {
+        "date": pd.DatetimeIndex(result["dates"]).to_numpy().astype("datetime64[D]"),
+        "equity": equity,
+        "cash": np.asarray(result["cash"], dtype=float),
+        "position_size": np.asarray(result["position"], dtype=float),
+        "drawdown": drawdown(equity) if len(equity) else equity,
+    }
+
+def encode_curve(curve: Dict[str, np.ndarray]) -> bytes:
+    """Curva em .npz comprimido (datas datetime64, valores float64)."""
+    buf = io.BytesIO()
+    np.savez_compressed(buf, **curve)
+    return buf.getvalue()
+
+def decode_curve(blob: bytes, fields=CURVE_FIELDS) -> Dict[str, np.ndarray]:
+    with np.load(io.BytesIO(blob), allow_pickle=False) as npz:
+        return {name: npz[name] for name in ("date",) + tuple(fields)}
+
+def result_metrics(curve: Dict[str, np.ndarray], trades: pd.DataFrame) -> Dict[str, float]:
+    returns = trade_returns(trades["pnl"], trades["entry_price"], trades["size"]) if len(trades) else None
+    metrics = summarize(curve["equity"], returns, position=curve["position_size"])
+    return {**{name: float(value) for name, value in metrics.items()}, "num_trades": len(trades)}
+
+def persist_backtest_result(db, backtest_id: int, result: Dict, storage: str = EQUITY_STORAGE) -> Dict:
+    """
+    Grava o resultado de um backtest na transação de `db` (o commit fica com o
+    chamador, junto com o status): trades e curva diária via COPY, metrics e
+    backtest_results como uma linha cada. Resultados anteriores do mesmo backtest são
+    substituídos. Com storage="blob" a curva vai comprimida em backtest_results.equity_blob
+    em vez de daily_positions. Retorna as métricas.
+    """
+    if storage not in ("rows", "blob"):
+        raise ValueError("storage deve ser 'rows' ou 'blob'")
+    curve = equity_curve(result)
+    trades = pd.DataFrame(result.get("trades") or [], columns=TRADE_COLUMNS)
+    metrics = result_metrics(curve, trades)
+
+    for model in (Trade, DailyPosition, Metric, BacktestResult):
+        db.query(model).filter(model.backtest_id == backtest_id).delete(synchronize_session=False)
+    db.flush()
+
+    if len(trades):
+        copy_insert(db, "trades", trades.assign(backtest_id=backtest_id)[["backtest_id"] + TRADE_COLUMNS])
+    if storage == "rows" and len(curve["date"]):
+        copy_insert(db, "daily_positions", pd.DataFrame({
+            "backtest_id": backtest_id,
+            "date": np.datetime_as_string(curve["date"], unit="D"),
+            **{field: curve[field] for field in CURVE_FIELDS},
+        }))
+
+    db.add(Metric(backtest_id=backtest_id, **{k: metrics[k] for k in
+                  ("total_return", "sharpe", "max_drawdown", "win_rate", "avg_trade_return")}))
+    db.add(BacktestResult(
+        backtest_id=backtest_id,
+        metrics={**result.get("metrics", {}), **metrics},
+        num_bars=len(curve["date"]),
+        equity_blob=encode_curve(curve) if storage == "blob" else None,
+    ))
+    return metrics
+
+def load_backtest_series(db, backtest_id: int) -> Optional[Dict[str, np.ndarray]]:
+    """
+    Curva de capital (date, equity) e PnL dos trades fechados, em ordem, de um
+    resultado gravado por persist_backtest_result. None se não houver resultado.
+    """
+    stored = db.query(BacktestResult).filter(BacktestResult.backtest_id == backtest_id).first()
+    if stored is None:
+        return None
+    if stored.equity_blob is not None:
+        curve = decode_curve(stored.equity_blob, fields=("equity",))
+    else:
+        rows = (db.query(DailyPosition.date, DailyPosition.equity)
+                .filter(DailyPosition.backtest_id == backtest_id).order_by(DailyPosition.date).all())
+        curve = {
+            "date": np.array([r.date for r in rows], dtype="datetime64[D]"),
+            "equity": np.array([r.equity for r in rows], dtype=np.float64),
+        }
+    pnl = (db.query(Trade.pnl)
+           .filter(Trade.backtest_id == backtest_id, Trade.pnl.isnot(None)).order_by(Trade.entry_date).all())
+    curve["pnl"] = np.array([r.pnl for r in pnl], dtype=np.float64)
+    return curve
+
+async def aload_backtest_result(db: AsyncSession, backtest_id: int) -> Optional[Dict]:
+    """
+    Resultado gravado por persist_backtest_result: status, métricas, trades e a curva
+    diária colunar (de daily_positions ou do blob). None se o backtest ainda não tem resultado.
+    """
+    backtest = await db.get(Backtest, backtest_id)
+    if backtest is None:
+        return None
+    stored = await async_crud.get_backtest_results(db, backtest_id)
+    if stored is None:
+        return None
+
+    if stored.equity_blob is not None:
+        curve = decode_curve(stored.equity_blob)
+    else:
+        rows = await async_crud.get_daily_positions(db, backtest_id)
+        curve = {"date": np.array([r.date for r in rows], dtype="datetime64[D]")}
+        values = np.array([tuple(r)[1:] for r in rows], dtype=np.float64).reshape(len(rows), len(CURVE_FIELDS))
+        for i, field in enumerate(CURVE_FIELDS):
+            curve[field] = values[:, i]
+
+    trades = [
+        {
+            "entry_date": t.entry_date.isoformat(),
+            "exit_date": t.exit_date.isoformat() if t.exit_date else None,
+            "side": t.side.value,
+            "entry_price": t.entry_price,
+            "exit_price": t.exit_price,
+            "size": t.size,
+            "commission": t.commission,
+            "pnl": t.pnl,
+            "ticker": t.ticker,
+        }
+        for t in await async_crud.get_trades(db, backtest_id)
+    ]
+    return {
+        "backtest_id": backtest_id,
+        "status": backtest.status.value if backtest.status else None,
+        "metrics": stored.metrics or {},
+        "trades": trades,
+        "equity_curve": curve,
+    }
@@ -1,5 +1,9 @@
+import numpy as np
+
+RISK_PER_TRADE = 0.01
+
 def calculate_position_size(initial_cash, entry_price, stop_price, atr=0, atr_multiplier=1.0, commission_per_unit=0.0):
-    risk_amount = initial_cash * 0.01
+    risk_amount = initial_cash * RISK_PER_TRADE
     stop_distance = abs(entry_price - stop_price)
     if stop_distance <= 0:
         return 0, "Stop muito próximo"
@@ -7,3 +11,14 @@ def calculate_position_size(initial_cash, entry_price, stop_price, atr=0, atr_mu
     if size < 1:
         return 0, "Posição mínima < 1"
     return int(size), None
+
+def calculate_position_sizes(initial_cash, entry_prices, stop_prices, commission_per_unit=0.0) -> np.ndarray:
+    """
+    Versão vetorizada de calculate_position_size: 0 onde o stop é inválido ou a posição < 1.
+    """
+    risk_amount = initial_cash * RISK_PER_TRADE
+    stop_distance = np.abs(np.asarray(entry_prices, dtype=float) - np.asarray(stop_prices, dtype=float))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        size = risk_amount / (stop_distance + commission_per_unit)
+    valid = np.isfinite(size) & (stop_distance > 0) & (size >= 1)
+    return np.where(valid, np.floor(np.where(valid, size, 0)), 0).astype(np.int64)
@@ -0,0 +1,196 @@
+import io
+import os
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional
+import numpy as np
+from app.db.session import SessionLocal
+from app.db.models import Backtest, BacktestStatus, RobustnessAnalysis
+from app.services.metrics import max_drawdown, summarize, total_return
+from app.services.result_store import encode_curve, load_backtest_series
+
+ROBUSTNESS_WORKERS = int(os.getenv("ROBUSTNESS_WORKERS", os.cpu_count() or 1))
+# Reamostragens por lote: cada lote é uma matriz (lote, n) processada de uma vez
+ROBUSTNESS_BATCH = int(os.getenv("ROBUSTNESS_BATCH", "1000"))
+
+METHODS = ("bootstrap", "shuffle", "noise")
+# "returns": retornos diários da curva (capital composto); "trades": PnL dos trades (capital somado)
+SOURCES = ("returns", "trades")
+PERCENTILES = (5, 25, 50, 75, 95)
+RETURN_METRICS = ("total_return", "cagr", "volatility", "sharpe", "sortino", "max_drawdown", "calmar")
+TRADE_METRICS = ("total_return", "max_drawdown")
+
+def resample(values: np.ndarray, method: str, size: int, rng: np.random.Generator,
+             block_size: int = 1, noise_scale: float = 0.5) -> np.ndarray:
+    """
+    Matriz (size, n) de séries sintéticas a partir de `values`:
+    - bootstrap: sorteio com reposição em blocos circulares de `block_size` (1 = i.i.d.);
+    - shuffle: permutação da ordem (mesmo resultado final, caminho diferente);
+    - noise: soma ruído gaussiano de desvio `noise_scale` x desvio da série.
+    """
+    values = np.asarray(values, dtype=float)
+    n = len(values)
+    if method == "bootstrap":
+        if block_size <= 1:
+            return values[rng.integers(0, n, (size, n))]
+        # Série estendida com o começo repetido no fim: blocos circulares sem módulo
+        extended = np.concatenate([values, values[:block_size - 1]])
+        starts = rng.integers(0, n, (size, -(-n // block_size)))
+        idx = (starts[:, :, None] + np.arange(block_size)).reshape(size, -1)[:, :n]
+        return extended[idx]
+    if method == "shuffle":
+        return rng.permuted(np.broadcast_to(values, (size, n)), axis=1)
+    if method == "noise":
+        scale = noise_scale * (values.std(ddof=1) if n > 1 else 0.0)
+        return values + rng.normal(0.0, scale, (size, n))
+    raise ValueError(f"method deve ser um de {METHODS}")
+
+def build_paths(samples: np.ndarray, source: str, initial_cash: float) -> np.ndarray:
+    """Curvas (k, n + 1) começando em `initial_cash`: retornos compostos ou PnL acumulado."""
+    equity = np.empty(samples.shape[:-1] + (samples.shape[-1] + 1,))
+    equity[..., 0] = initial_cash
+    if source == "returns":
+        # Retorno abaixo de -100% (ruído) zeraria o capital de vez
+        np.cumprod(1.0 + np.maximum(samples, -1.0), axis=-1, out=equity[..., 1:])
+        equity[..., 1:] *= initial_cash
+    else:
+        np.cumsum(samples, axis=-1, out=equity[..., 1:])
+        equity[..., 1:] += initial_cash
+    return equity
+
+def path_metrics(equity: np.ndarray, source: str, samples: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+    # Métricas anualizadas só fazem sentido por candle; por trade ficam retorno e drawdown
+    if source == "returns":
+        metrics = summarize(equity, daily=samples)
+        return {name: metrics[name] for name in RETURN_METRICS}
+    return dict(zip(TRADE_METRICS, (total_return(equity), max_drawdown(equity))))
+
+def band_points(n: int, points: int) -> np.ndarray:
+    """Índices (até `points`, igualmente espaçados, incluindo o primeiro e o último) das bandas."""
+    return np.unique(np.linspace(0, n - 1, max(min(points, n), 2)).round().astype(int))
+
+def _run_batch(args) -> Dict[str, np.ndarray]:
+    values, source, method, size, seed, block_size, noise_scale, initial_cash, idx = args
+    rng = np.random.default_rng(seed)
+    samples = resample(values, method, size, rng, block_size, noise_scale)
+    equity = build_paths(samples, source, initial_cash)
+    if source == "returns":
+        np.maximum(samples, -1.0, out=samples)
+    out = path_metrics(equity, source, samples)
+    del samples
+    # Só os pontos das bandas: o pico acumulado precisa da curva toda, a divisão não
+    peak = np.maximum.accumulate(equity, axis=-1)
+    out["equity"] = equity[:, idx]
+    out["drawdown"] = out["equity"] / peak[:, idx] - 1
+    return out
+
+def run_robustness(values: np.ndarray, source: str = "returns", method: str = "bootstrap", num_samples: int = 1000,
+                   initial_cash: float = 100000, block_size: int = 1, noise_scale: float = 0.5,
+                   seed: Optional[int] = None, points: int = 252, workers: Optional[int] = None,
+                   batch_size: Optional[int] = None) -> Dict:
+    """
+    Distribuição das métricas de `num_samples` séries sintéticas (ver resample), em
+    lotes vetorizados distribuídos num pool de processos. Cada lote tem sua semente
+    derivada de `seed`, então o resultado não depende do número de workers.
+
+    Retorna as métricas da série original, percentis/média/desvio de cada métrica, a
+    probabilidade de prejuízo (e de Sharpe <= 0) e as bandas de percentis de capital e
+    drawdown em até `points` pontos da curva.
+    """
+    if source not in SOURCES:
+        raise ValueError(f"source deve ser um de {SOURCES}")
+    if method not in METHODS:
+        raise ValueError(f"method deve ser um de {METHODS}")
+    values = np.asarray(values, dtype=float)
+    values = values[np.isfinite(values)]
+    if len(values) < 2:
+        raise ValueError("série insuficiente para reamostrar (mínimo 2 valores)")
+    if num_samples < 1:
+        raise ValueError("num_samples deve ser >= 1")
+
+    batch_size = batch_size or ROBUSTNESS_BATCH
+    sizes = [min(batch_size, num_samples - lo) for lo in range(0, num_samples, batch_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    idx = band_points(len(values) + 1, points)
+    args = [(values, source, method, size, s, block_size, noise_scale, initial_cash, idx)
+            for size, s in zip(sizes, seeds)]
+    workers = min(workers or ROBUSTNESS_WORKERS, len(args))
+
+    started = time.perf_counter()
+    if workers <= 1:
+        batches = [_run_batch(a) for a in args]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            batches = list(pool.map(_run_batch, args))
+    merged = {key: np.concatenate([b[key] for b in batches]) for key in batches[0]}
+    elapsed = time.perf_counter() - started
+
+    summary = {}
+    for name in RETURN_METRICS if source == "returns" else TRADE_METRICS:
+        dist = merged[name]
+        summary[name] = {"mean": float(dist.mean()), "std": float(dist.std()),
+                         **{f"p{p}": float(v) for p, v in zip(PERCENTILES, np.percentile(dist, PERCENTILES))}}
+    probabilities = {"loss": float((merged["total_return"] < 0).mean())}
+    if "sharpe" in merged:
+        probabilities["sharpe_le_0"] = float((merged["sharpe"] <= 0).mean())
+
+    bands = {"bar": idx}
+    for key in ("equity", "drawdown"):
+        for p, band in zip(PERCENTILES, np.percentile(merged[key], PERCENTILES, axis=0)):
+            bands[f"{key}_p{p}"] = band
+    observed = path_metrics(build_paths(values, source, initial_cash), source)
+    return {
+        "observed": {name: float(v) for name, v in observed.items()},
+        "summary": summary,
+        "probabilities": probabilities,
+        "bands": bands,
+        "timing": {"total_ms": round(1000 * elapsed, 2), "workers": workers, "batches": len(args)},
+    }
+
+def run_robustness_job(analysis_id: int):
+    db = SessionLocal()
+    try:
+        analysis = db.query(RobustnessAnalysis).filter(RobustnessAnalysis.id == analysis_id).first()
+        if not analysis or analysis.status == BacktestStatus.CANCELLED:
+            return
+        analysis.status = BacktestStatus.RUNNING
+        db.commit()
+
+        series = load_backtest_series(db, analysis.backtest_id)
+        if series is None:
+            raise ValueError("backtest sem resultado gravado")
+        if analysis.source == "returns":
+            equity = series["equity"]
+            values, initial_cash = equity[1:] / equity[:-1] - 1, float(equity[0]) if len(equity) else 0.0
+        else:
+            backtest = db.get(Backtest, analysis.backtest_id)
+            values, initial_cash = series["pnl"], backtest.initial_cash
+        # Já roda num worker do executor (que limita a concorrência): lotes no próprio processo
+        result = run_robustness(values, analysis.source, analysis.method, analysis.num_samples, initial_cash,
+                                analysis.block_size, analysis.noise_scale, analysis.seed, workers=1)
+
+        db.refresh(analysis)
+        if analysis.status == BacktestStatus.CANCELLED:
+            return
+
+        bands = result["bands"]
+        if analysis.source == "returns":
+            # Ponto i da banda = candle i da curva original
+            bands = {"date": series["date"][bands["bar"]], **bands}
+        analysis.observed = result["observed"]
+        analysis.summary = {**result["summary"], "probabilities": result["probabilities"], "timing": result["timing"]}
+        analysis.bands_blob = encode_curve(bands)
+        analysis.status = BacktestStatus.COMPLETED
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        analysis.status = BacktestStatus.FAILED
+        analysis.message = str(e)
+        db.commit()
+    finally:
+        db.close()
+
+def decode_bands(blob: bytes) -> Dict[str, np.ndarray]:
+    with np.load(io.BytesIO(blob), allow_pickle=False) as npz:
+        return {name: npz[name] for name in npz.files}
@@ -0,0 +1,194 @@
+import io
+import csv
+import json
+from datetime import date
+from typing import Dict, Iterator, List, Optional, Tuple
+import numpy as np
+import pyarrow as pa
+from sqlalchemy import text, bindparam, select, cast, Float
+from app.db.session import SessionLocal
+from app.db.models import Price
+from app.services.indicator_service import params_hash
+from app.services.price_cache import price_cache, PRICE_FIELDS
+
+FORMATS = ("json", "arrow")
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+STREAM_FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+STREAM_CHUNK_ROWS = 5000
+
+def parse_columns(columns: Optional[str], allowed=PRICE_FIELDS) -> List[str]:
+    """"close,volume" -> ["close", "volume"]; vazio = todas as colunas."""
+    if not columns:
+        return list(allowed)
+    selected = [c.strip() for c in columns.split(",") if c.strip()]
+    invalid = [c for c in selected if c not in allowed]
+    if invalid:
+        raise ValueError(f"colunas inválidas: {invalid}")
+    return selected
+
+def _param_value(value: str):
+    for convert in (int, float):
+        try:
+            return convert(value)
+        except ValueError:
+            pass
+    return value
+
+def parse_series(series: List[str]) -> List[Tuple[str, str, str]]:
+    """
+    "SMA" ou "SMA:period=50,foo=1" -> (coluna, name, params_hash). O hash é o mesmo que
+    calculate_indicators grava para esses parâmetros.
+    """
+    parsed = []
+    for spec in series:
+        name, _, raw = spec.partition(":")
+        params = {}
+        for item in filter(None, raw.split(",")):
+            key, sep, value = item.partition("=")
+            if not sep:
+                raise ValueError(f"parâmetro inválido em {spec}: {item}")
+            params[key.strip()] = _param_value(value.strip())
+        parsed.append((spec, name.strip(), params_hash(params)))
+    return parsed
+
+def _price_page(arrays: Dict[str, np.ndarray], columns: List[str], after: Optional[date],
+                limit: Optional[int]) -> Dict[str, np.ndarray]:
+    lo = np.searchsorted(arrays["date"], np.datetime64(after), side="right") if after else 0
+    hi = len(arrays["date"]) if limit is None else lo + limit
+    data = {"date": arrays["date"][lo:hi]}
+    for column in columns:
+        values = arrays[column][lo:hi]
+        data[column] = values.astype(np.int64) if column == "volume" else values
+    return data
+
+def load_price_columns(db, symbol_id: int, start: date, end: date, columns: List[str],
+                       after: Optional[date] = None, limit: Optional[int] = None) -> Dict[str, np.ndarray]:
+    """Colunas OHLCV pedidas, servidas pelo cache de preços (arrays float64)."""
+    return _price_page(price_cache.load(db, symbol_id, start, end), columns, after, limit)
+
+async def aload_price_columns(db, symbol_id: int, start: date, end: date, columns: List[str],
+                              after: Optional[date] = None, limit: Optional[int] = None) -> Dict[str, np.ndarray]:
+    return _price_page(await price_cache.aload(db, symbol_id, start, end), columns, after, limit)
+
+def stream_prices(symbol_id: int, start: date, end: date, fmt: str, columns: List[str],
+                  after: Optional[date] = None, limit: Optional[int] = None,
+                  chunk_rows: int = STREAM_CHUNK_ROWS) -> Iterator[bytes]:
+    """
+    Gera NDJSON ou CSV em blocos de `chunk_rows` linhas lidas por cursor no servidor
+    (yield_per): a memória fica constante, independente do tamanho do histórico.
+    Abre a própria sessão, que vive enquanto a resposta é transmitida.
+    """
+    if fmt not in STREAM_FORMATS:
+        raise ValueError(f"format deve ser um de {STREAM_FORMATS}")
+    fields = [Price.volume if c == "volume" else cast(getattr(Price, c), Float).label(c) for c in columns]
+    stmt = (
+        select(Price.date, *fields)
+        .where(Price.symbol_id == symbol_id, Price.date >= start, Price.date <= end)
+        .order_by(Price.date)
+    )
+    if after is not None:
+        stmt = stmt.where(Price.date > after)
+    if limit is not None:
+        stmt = stmt.limit(limit)
+
+    db = SessionLocal()
+    try:
+        result = db.execute(stmt.execution_options(yield_per=chunk_rows))
+        if fmt == "csv":
+            yield (",".join(["date"] + columns) + "\n").encode()
+        for rows in result.partitions():
+            buf = io.StringIO()
+            if fmt == "csv":
+                csv.writer(buf, lineterminator="\n").writerows((r[0].isoformat(), *r[1:]) for r in rows)
+            else:
+                for r in rows:
+                    buf.write(json.dumps({"date": r[0].isoformat(), **dict(zip(columns, r[1:]))}))
+                    buf.write("\n")
+            yield buf.getvalue().encode()
+    finally:
+        db.close()
+
+def _indicator_query(symbol_id: int, start: date, end: date, series: List[Tuple[str, str, str]] = None):
+    # Uma linha por série, com datas e valores agregados em texto: evita decodificar
+    # milhares de linhas no driver e vira array numpy com um split
+    query = (
+        "SELECT name, params_hash, string_agg(date::text, ',' ORDER BY date) AS dates, "
+        "string_agg(value::text, ',' ORDER BY date) AS vals FROM indicators "
+        "WHERE symbol_id = :symbol_id AND date BETWEEN :start AND :end"
+    )
+    params = {"symbol_id": symbol_id, "start": start, "end": end}
+    if series:
+        query += " AND name IN :names AND params_hash IN :hashes"
+        params.update(names=sorted({s[1] for s in series}), hashes=sorted({s[2] for s in series}))
+        stmt = text(query + " GROUP BY name, params_hash").bindparams(
+            bindparam("names", expanding=True), bindparam("hashes", expanding=True))
+    else:
+        stmt = text(query + " GROUP BY name, params_hash ORDER BY name, params_hash")
+    return stmt, params
+
+def _indicator_columns(result, series: List[Tuple[str, str, str]] = None) -> Dict[str, np.ndarray]:
+    rows = {(r.name, r.params_hash): r for r in result}
+    if not series:
+        names = [n for n, _ in rows]
+        # O nome basta como coluna quando há um único conjunto de parâmetros
+        series = [(n if names.count(n) == 1 else f"{n}:{h[:8]}", n, h) for n, h in rows]
+
+    parsed = {}
+    for column, name, h in series:
+        row = rows.get((name, h))
+        if row is not None:
+            parsed[column] = (np.array(row.dates.split(","), dtype="datetime64[D]"),
+                              np.array(row.vals.split(","), dtype=np.float64))
+    dates = np.unique(np.concatenate([d for d, _ in parsed.values()])) if parsed else np.array([], dtype="datetime64[D]")
+
+    data = {"date": dates}
+    for column, _, _ in series:
+        data[column] = np.full(len(dates), np.nan)
+        if column in parsed:
+            series_dates, values = parsed[column]
+            data[column][np.searchsorted(dates, series_dates)] = values
+    return data
+
+def load_indicator_columns(db, symbol_id: int, start: date, end: date,
+                           series: List[Tuple[str, str, str]] = None) -> Dict[str, np.ndarray]:
+    """
+    Várias séries de indicadores numa única consulta, alinhadas pela data (NaN onde a
+    série não tem valor). Sem `series`, devolve tudo o que está gravado para o símbolo.
+    """
+    return _indicator_columns(db.execute(*_indicator_query(symbol_id, start, end, series)), series)
+
+async def aload_indicator_columns(db, symbol_id: int, start: date, end: date,
+                                  series: List[Tuple[str, str, str]] = None) -> Dict[str, np.ndarray]:
+    result = await db.execute(*_indicator_query(symbol_id, start, end, series))
+    return _indicator_columns(result, series)
+
+def to_columnar_json(data: Dict[str, np.ndarray], **meta) -> bytes:
+    """{"columns": [...], "data": {coluna: [valores]}} com datas ISO e NaN -> null."""
+    payload = {}
+    for column, values in data.items():
+        if values.dtype.kind == "M":
+            payload[column] = np.datetime_as_string(values, unit="D").tolist()
+        elif values.dtype.kind == "f":
+            payload[column] = np.where(np.isnan(values), None, values).tolist()
+        else:
+            payload[column] = values.tolist()
+    return json.dumps({**meta, "columns": list(data), "data": payload}, separators=(",", ":")).encode()
+
+def to_arrow_ipc(data: Dict[str, np.ndarray], **meta) -> bytes:
+    """Arrow IPC (stream) com uma coluna por série; `meta` vai nos metadados do schema."""
+    table = pa.table({
+        column: pa.array(values, from_pandas=True) for column, values in data.items()
+    })
+    table = table.replace_schema_metadata({k: str(v) for k, v in meta.items()})
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue()
+
+def encode_columns(data: Dict[str, np.ndarray], fmt: str, **meta) -> Tuple[bytes, str]:
+    """(corpo, media type) no formato pedido: "json" (colunar) ou "arrow"."""
+    if fmt == "arrow":
+        return to_arrow_ipc(data, **meta), ARROW_MEDIA_TYPE
+    if fmt == "json":
+        return to_columnar_json(data, **meta), "application/json"
+    raise ValueError(f"format deve ser um de {FORMATS}")
@@ -1,13 +1,17 @@
+import inspect
 from typing import Dict
 import pandas as pd
-import talib
+from app.services.indicator_registry import indicator
 
-def sma_cross_signals(df: pd.DataFrame, fast: int = 50, slow: int = 200) -> pd.Series:
+# `cache` é repassado ao registro de indicadores: entre variantes de um sweep cada
+# série (SMA, máximas/mínimas, ATR...) é calculada uma única vez.
+
+def sma_cross_signals(df: pd.DataFrame, fast: int = 50, slow: int = 200, cache: Dict = None) -> pd.Series:
     """
      1 (compra), -1 (venda), 0 (nenhum)
     """
-    sma_fast = talib.SMA(df['close'], timeperiod=fast)
-    sma_slow = talib.SMA(df['close'], timeperiod=slow)
+    sma_fast = indicator(df, "SMA", cache, period=fast)
+    sma_slow = indicator(df, "SMA", cache, period=slow)
 
     signal = pd.Series(0, index=df.index)
     signal[sma_fast > sma_slow] = 1
@@ -15,25 +19,74 @@ def sma_cross_signals(df: pd.DataFrame, fast: int = 50, slow: int = 200) -> pd.S
     signal = signal.diff().fillna(0)
     return signal
 
-def donchian_breakout_signals(df: pd.DataFrame, lookback_high: int = 20, lookback_low: int = 10) -> pd.Series:
-    high_max = df['high'].rolling(lookback_high).max()
-    low_min = df['low'].rolling(lookback_low).min()
+def donchian_breakout_signals(df: pd.DataFrame, lookback_high: int = 20, lookback_low: int = 10, cache: Dict = None) -> pd.Series:
+    high_max = indicator(df, "MAX_HIGH", cache, period=lookback_high)
+    low_min = indicator(df, "MIN_LOW", cache, period=lookback_low)
 
     signal = pd.Series(0, index=df.index)
-    signal[df['close'] > high_max.shift(1)] = 1
-    signal[df['close'] < low_min.shift(1)] = -1
+    signal[df['close'] > high_max] = 1
+    signal[df['close'] < low_min] = -1
     return signal
 
-def momentum_signals(df: pd.DataFrame, lookback: int = 60, percentile_threshold: int = 70) -> pd.Series:
-    ret_acum = df['close'].pct_change(periods=lookback)
-    threshold = ret_acum.quantile(percentile_threshold/100)
+def momentum_signals(df: pd.DataFrame, lookback: int = 60, percentile_threshold: int = 70, cache: Dict = None) -> pd.Series:
+    ret_acum = indicator(df, "RET", cache, period=lookback)
+    # Percentil só dos retornos conhecidos até cada candle: sem look-ahead (walk-forward)
+    threshold = ret_acum.expanding().quantile(percentile_threshold/100)
 
     signal = pd.Series(0, index=df.index)
     signal[ret_acum > threshold] = 1
     signal[ret_acum < -threshold] = -1
     return signal
 
-def atr_stop(df: pd.DataFrame, period: int = 14, multiplier: float = 3.0) -> pd.Series:
-    atr = talib.ATR(df['high'], df['low'], df['close'], timeperiod=period)
+def atr_stop(df: pd.DataFrame, period: int = 14, multiplier: float = 3.0, cache: Dict = None) -> pd.Series:
+    atr = indicator(df, "ATR", cache, period=period)
     stop_distance = atr * multiplier
     return stop_distance
+
+def ml_signal_signals(df: pd.DataFrame, model="logreg", entry_threshold: float = 0.55, exit_threshold: float = 0.45,
+                      out_of_sample: bool = True, cache: Dict = None) -> pd.Series:
+    """
+    Sinais de um modelo do registro (id, tipo ou artefato): compra com probabilidade de
+    alta acima de `entry_threshold`, venda abaixo de `exit_threshold`. As probabilidades
+    da série toda saem de uma única chamada ao modelo e, no `cache`, servem a todas as
+    variantes de limiares de um sweep.
+    """
+    # Import local: o sklearn só é carregado por quem usa a estratégia
+    from app.services.ml_pipeline import signal_probabilities
+
+    key = ("ML_PROBA", model, out_of_sample)
+    proba = cache.get(key) if cache is not None else None
+    if proba is None:
+        proba = signal_probabilities(df, model, out_of_sample)
+        if cache is not None:
+            cache[key] = proba
+
+    # Sem deslocamento: a probabilidade do candle t usa dados até o fechamento de t e os
+    # motores executam a ordem na abertura de t+1. NaN (aquecimento, treino) fica em 0.
+    signal = pd.Series(0, index=df.index)
+    signal[proba > entry_threshold] = 1
+    signal[proba < exit_threshold] = -1
+    return signal
+
+STRATEGY_SIGNALS = {
+    "sma_cross": sma_cross_signals,
+    "donchian_breakout": donchian_breakout_signals,
+    "momentum": momentum_signals,
+    "ml_signal": ml_signal_signals,
+}
+
+def strategy_param_names(strategy_type: str) -> tuple:
+    func = STRATEGY_SIGNALS.get(strategy_type.lower())
+    if func is None:
+        raise ValueError(f"strategy_type inválido: {strategy_type}")
+    return tuple(p for p in list(inspect.signature(func).parameters)[1:] if p != "cache")
+
+def build_signals(df: pd.DataFrame, strategy_type: str, params: Dict = None, cache: Dict = None) -> pd.Series:
+    """
+    Resolve strategy_type (ex.: "sma_cross", "SMA_Cross") para a função de sinais,
+    repassando apenas os parâmetros que ela aceita.
+    """
+    accepted = strategy_param_names(strategy_type)
+    params = params or {}
+    func = STRATEGY_SIGNALS[strategy_type.lower()]
+    return func(df, cache=cache, **{k: v for k, v in params.items() if k in accepted})
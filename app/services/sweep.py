@@ -0,0 +1,129 @@
+import itertools
+import numpy as np
+import pandas as pd
+from typing import Dict, List
+from app.db.session import SessionLocal
+from app.db.models import Sweep, SweepResult, BacktestStatus
+from app.services.backtest_runner import load_price_frame
+from app.services.metrics import summarize, trade_returns, pad_trade_returns
+from app.services.strategies import build_signals, atr_stop, strategy_param_names
+from app.services.vectorized_engine import run_vectorized_backtest
+
+CHUNK_SIZE = 500
+STOP_PARAMS = ("atr_period", "atr_multiplier")
+# Métricas de cada variante gravadas em sweep_results (e aceitas em sort_by)
+RESULT_METRICS = ("total_return", "sharpe", "max_drawdown", "cagr", "sortino", "calmar", "win_rate", "exposure", "turnover")
+# Direção de sort_by (melhor primeiro): max_drawdown é negativo, então o menor drawdown é o
+# maior valor; menos giro e menos tempo posicionado vêm primeiro
+RESULT_DESCENDING = {name: name not in ("exposure", "turnover") for name in RESULT_METRICS}
+
+def expand_range(spec) -> list:
+    """
+    Aceita lista de valores, valor único ou {"start", "stop", "step"} (stop inclusivo).
+    """
+    if isinstance(spec, dict):
+        start, stop, step = spec["start"], spec["stop"], spec.get("step", 1)
+        if all(isinstance(v, int) for v in (start, stop, step)):
+            return list(range(start, stop + 1, step))
+        return [v.item() for v in np.arange(start, stop + step / 2, step)]
+    if isinstance(spec, (list, tuple)):
+        return list(spec)
+    return [spec]
+
+def expand_grid(strategy_type: str, param_grid: Dict) -> List[Dict]:
+    accepted = strategy_param_names(strategy_type) + STOP_PARAMS
+    unknown = set(param_grid) - set(accepted)
+    if unknown:
+        raise ValueError(f"Parâmetros inválidos para {strategy_type}: {sorted(unknown)}")
+
+    names = list(param_grid)
+    combos = [dict(zip(names, values)) for values in itertools.product(*(expand_range(param_grid[n]) for n in names))]
+    if strategy_type.lower() == "sma_cross":
+        combos = [c for c in combos if c.get("fast", 50) < c.get("slow", 200)]
+    return combos
+
+def run_sweep(df: pd.DataFrame, strategy_type: str, param_grid: Dict,
+              initial_cash: float = 100000, commission: float = 0.0) -> pd.DataFrame:
+    """
+    Avalia todas as combinações sobre o mesmo DataFrame. Indicadores intermediários
+    (cada período de SMA, ATR, máximas/mínimas) são calculados uma única vez e as
+    métricas (metrics.summarize) são calculadas em lote sobre as matrizes de equity e
+    posição (variantes x candles).
+    """
+    combos = expand_grid(strategy_type, param_grid)
+    cache = {}
+    rows = []
+    for start in range(0, len(combos), CHUNK_SIZE):
+        chunk = combos[start:start + CHUNK_SIZE]
+        equity = np.empty((len(chunk), len(df)))
+        position = np.empty((len(chunk), len(df)))
+        returns = []
+        for i, params in enumerate(chunk):
+            signals = build_signals(df, strategy_type, params, cache=cache)
+            stop_distance = atr_stop(df, period=params.get("atr_period", 14),
+                                     multiplier=params.get("atr_multiplier", 3.0), cache=cache)
+            result = run_vectorized_backtest(df, signals, stop_distance, initial_cash, commission)
+            equity[i] = result["equity"]
+            position[i] = result["position"]
+            trades = result["trades"]
+            returns.append(trade_returns([t["pnl"] if t["pnl"] is not None else np.nan for t in trades],
+                                         [t["entry_price"] for t in trades], [t["size"] for t in trades]))
+
+        metrics = summarize(equity, pad_trade_returns(returns), position, df["close"].to_numpy(dtype=float))
+        rows.append(pd.DataFrame({
+            "params": chunk,
+            **metrics,
+            "num_trades": [len(r) for r in returns],
+        }))
+
+    if not rows:
+        return pd.DataFrame(columns=["params", *RESULT_METRICS, "num_trades", "rank"])
+    results = pd.concat(rows, ignore_index=True)
+    # Sharpe decrescente, desempate pelo menor drawdown (max_drawdown é negativo)
+    results = results.sort_values(["sharpe", "max_drawdown"], ascending=[False, False], ignore_index=True)
+    results["rank"] = np.arange(1, len(results) + 1)
+    return results
+
+def result_order(sort_by: str):
+    """Ordenação de sweep_results por `sort_by`; sharpe usa o rank gravado (com desempate)."""
+    if sort_by == "sharpe":
+        return SweepResult.rank.asc()
+    column = getattr(SweepResult, sort_by)
+    return (column.desc() if RESULT_DESCENDING[sort_by] else column.asc()).nulls_last()
+
+def run_sweep_job(sweep_id: int):
+    db = SessionLocal()
+    try:
+        sweep = db.query(Sweep).filter(Sweep.id == sweep_id).first()
+        if not sweep or sweep.status == BacktestStatus.CANCELLED:
+            return
+
+        sweep.status = BacktestStatus.RUNNING
+        db.commit()
+
+        df = load_price_frame(db, sweep.ticker, sweep.start_date, sweep.end_date)
+        results = run_sweep(df, sweep.strategy_type, sweep.param_grid, sweep.initial_cash, sweep.commission)
+
+        db.refresh(sweep)
+        if sweep.status == BacktestStatus.CANCELLED:
+            return
+        db.bulk_insert_mappings(SweepResult, [
+            {
+                "sweep_id": sweep_id,
+                "rank": int(row["rank"]),
+                "params": row["params"],
+                **{name: float(row[name]) for name in RESULT_METRICS},
+                "num_trades": int(row["num_trades"]),
+            }
+            for row in results.to_dict("records")
+        ])
+        sweep.num_variants = len(results)
+        sweep.status = BacktestStatus.COMPLETED
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        sweep.status = BacktestStatus.FAILED
+        sweep.message = str(e)
+        db.commit()
+    finally:
+        db.close()
@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+from app.services.risk_management import calculate_position_sizes
+
+def run_vectorized_backtest(df: pd.DataFrame, signals: pd.Series, stop_distance: pd.Series,
+                            initial_cash: float = 100000, commission: float = 0.0) -> dict:
+    """
+    Mesmas regras do SignalStrategy (Backtrader), calculadas com arrays NumPy:
+    decisão no fechamento do candle t, execução na abertura de t+1, comissão
+    percentual sobre o valor negociado e ordens rejeitadas por falta de caixa.
+    O laço percorre trades (não candles); cada saída é localizada com np.flatnonzero.
+    """
+    open_ = df["open"].to_numpy(dtype=float)
+    close = df["close"].to_numpy(dtype=float)
+    signal = np.asarray(signals, dtype=float)
+    stop_dist = np.asarray(stop_distance, dtype=float)
+    dates = pd.DatetimeIndex(df.index)
+    n = len(close)
+
+    stop_prices = close - stop_dist
+    sizes = calculate_position_sizes(initial_cash, close, stop_prices, commission)
+    entry_bars = np.flatnonzero((signal > 0) & np.isfinite(stop_dist) & (sizes > 0))
+    entry_bars = entry_bars[entry_bars + 1 < n]
+    exit_signal = signal < 0
+
+    position = np.zeros(n)
+    cash_flow = np.zeros(n)
+    trades = []
+    cash = float(initial_cash)
+    cursor = 0
+
+    while True:
+        k = np.searchsorted(entry_bars, cursor)
+        if k >= len(entry_bars):
+            break
+        t = entry_bars[k]
+        fill = t + 1
+        size = sizes[t]
+        entry_price = open_[fill]
+        entry_comm = size * entry_price * commission
+        cost = size * entry_price + entry_comm
+        if cash - cost < 0.0:
+            # Margin: a ordem é rejeitada e o próximo candle pode gerar nova entrada
+            cursor = fill
+            continue
+
+        cash -= cost
+        cash_flow[fill] -= cost
+        stop_price = stop_prices[t]
+        exits = np.flatnonzero(exit_signal[fill:] | (close[fill:] < stop_price))
+        exit_bar = fill + exits[0] if len(exits) else n
+        exit_fill = exit_bar + 1
+
+        trade = {
+            "entry_date": dates[fill].date(),
+            "exit_date": None,
+            "side": "LONG",
+            "entry_price": entry_price,
+            "exit_price": None,
+            "size": float(size),
+            "commission": entry_comm,
+            "pnl": None,
+        }
+        trades.append(trade)
+
+        if exit_fill >= n:
+            position[fill:] = size
+            break
+
+        position[fill:exit_fill] = size
+        exit_price = open_[exit_fill]
+        exit_comm = size * exit_price * commission
+        proceeds = size * exit_price - exit_comm
+        cash += proceeds
+        cash_flow[exit_fill] += proceeds
+        trade["exit_date"] = dates[exit_fill].date()
+        trade["exit_price"] = exit_price
+        trade["commission"] += exit_comm
+        trade["pnl"] = (exit_price - entry_price) * size - trade["commission"]
+        cursor = exit_fill
+
+    cash_curve = initial_cash + np.cumsum(cash_flow)
+    equity = cash_curve + position * close
+    return {
+        "dates": dates,
+        "equity": equity,
+        "cash": cash_curve,
+        "position": position,
+        "trades": trades,
+    }
@@ -0,0 +1,196 @@
+import os
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from app.db.session import SessionLocal
+from app.db.models import WalkForward, BacktestStatus
+from app.services.backtest_runner import load_price_frame
+from app.services.metrics import summarize
+from app.services.strategies import build_signals, atr_stop
+from app.services.sweep import run_sweep
+from app.services.vectorized_engine import run_vectorized_backtest
+from app.services.result_store import encode_curve, decode_curve
+
+WALK_FORWARD_WORKERS = int(os.getenv("WALK_FORWARD_WORKERS", os.cpu_count() or 1))
+OBJECTIVES = ("sharpe", "sortino", "calmar", "total_return", "cagr")
+SHARED_FIELDS = ("open", "high", "low", "close", "volume")
+
+def make_folds(n_bars: int, train_bars: int, test_bars: int, anchored: bool = False) -> List[Tuple[int, int, int, int]]:
+    """
+    Folds (train_lo, train_hi, test_lo, test_hi) em índices de candle, intervalos
+    semiabertos. As janelas fora da amostra são consecutivas e não se sobrepõem; a de
+    treino termina onde a de teste começa e tem `train_bars` candles (rolling) ou começa
+    sempre no primeiro candle (anchored). O último fold pode ser mais curto.
+    """
+    if train_bars < 2 or test_bars < 2:
+        raise ValueError("train_bars e test_bars devem ser >= 2")
+    folds = []
+    test_lo = train_bars
+    while test_lo + 2 <= n_bars:
+        test_hi = min(test_lo + test_bars, n_bars)
+        folds.append((0 if anchored else test_lo - train_bars, test_lo, test_lo, test_hi))
+        test_lo = test_hi
+    return folds
+
+# --- preços compartilhados entre processos -----------------------------------------
+
+def share_prices(df: pd.DataFrame) -> Tuple[SharedMemory, Dict]:
+    """
+    Copia datas e OHLCV para um bloco de memória compartilhada; os workers montam o
+    DataFrame sobre o mesmo buffer, sem serializar a série a cada fold.
+    """
+    n = len(df)
+    shm = SharedMemory(create=True, size=max(8 * n * (1 + len(SHARED_FIELDS)), 1))
+    dates = np.ndarray((n,), dtype="datetime64[ns]", buffer=shm.buf)
+    dates[:] = pd.DatetimeIndex(df.index).to_numpy().astype("datetime64[ns]")
+    values = np.ndarray((n, len(SHARED_FIELDS)), dtype=np.float64, buffer=shm.buf, offset=8 * n)
+    values[:] = df[list(SHARED_FIELDS)].to_numpy(dtype=np.float64)
+    return shm, {"name": shm.name, "n": n}
+
+def attach_prices(spec: Dict) -> Tuple[SharedMemory, pd.DataFrame]:
+    # Só mapeia: quem cria o bloco (run_walk_forward) é quem o remove
+    shm = SharedMemory(name=spec["name"])
+    n = spec["n"]
+    dates = np.ndarray((n,), dtype="datetime64[ns]", buffer=shm.buf)
+    values = np.ndarray((n, len(SHARED_FIELDS)), dtype=np.float64, buffer=shm.buf, offset=8 * n)
+    df = pd.DataFrame(values, columns=list(SHARED_FIELDS), index=pd.DatetimeIndex(dates, name="date"), copy=False)
+    return shm, df
+
+_worker_shm = None
+_worker_frame = None
+
+def _init_worker(spec: Dict):
+    global _worker_shm, _worker_frame
+    _worker_shm, _worker_frame = attach_prices(spec)
+
+def _run_fold(fold_args):
+    return evaluate_fold(_worker_frame, *fold_args)
+
+# --- avaliação ---------------------------------------------------------------------
+
+def evaluate_fold(df: pd.DataFrame, fold: Tuple[int, int, int, int], strategy_type: str, param_grid: Dict,
+                  initial_cash: float, commission: float, objective: str) -> Dict:
+    """
+    Otimiza os parâmetros na janela de treino (sweep, melhor `objective`) e roda a
+    variante escolhida na janela de teste. Os indicadores da janela de teste são
+    calculados com o histórico de treino como aquecimento; a posição começa zerada.
+    """
+    train_lo, train_hi, test_lo, test_hi = fold
+    started = time.perf_counter()
+    ranked = run_sweep(df.iloc[train_lo:train_hi], strategy_type, param_grid, initial_cash, commission)
+    if ranked.empty:
+        raise ValueError("param_grid não gera nenhuma combinação")
+    best = ranked.sort_values([objective, "max_drawdown"], ascending=[False, False]).iloc[0]
+    optimized = time.perf_counter()
+
+    params = best["params"]
+    history = df.iloc[train_lo:test_hi]
+    signals = build_signals(history, strategy_type, params)
+    stop_distance = atr_stop(history, period=params.get("atr_period", 14), multiplier=params.get("atr_multiplier", 3.0))
+    offset = test_lo - train_lo
+    result = run_vectorized_backtest(history.iloc[offset:], signals.iloc[offset:], stop_distance.iloc[offset:],
+                                     initial_cash, commission)
+    tested = time.perf_counter()
+
+    return {
+        "train_start": df.index[train_lo].date().isoformat(),
+        "train_end": df.index[train_hi - 1].date().isoformat(),
+        "test_start": df.index[test_lo].date().isoformat(),
+        "test_end": df.index[test_hi - 1].date().isoformat(),
+        "params": params,
+        "in_sample": {k: float(best[k]) for k in ("total_return", "sharpe", "sortino", "max_drawdown")},
+        "out_of_sample": {k: float(v) for k, v in summarize(result["equity"]).items()},
+        "num_trades": len(result["trades"]),
+        "equity": result["equity"],
+        "optimize_ms": round(1000 * (optimized - started), 2),
+        "test_ms": round(1000 * (tested - optimized), 2),
+    }
+
+def stitch_equity(folds: List[Dict], initial_cash: float) -> np.ndarray:
+    """Curva fora da amostra: os retornos de cada fold encadeados a partir do capital inicial."""
+    pieces, level = [], float(initial_cash)
+    for fold in folds:
+        equity = np.asarray(fold["equity"], dtype=float)
+        pieces.append(level * equity / equity[0])
+        level = pieces[-1][-1]
+    return np.concatenate(pieces) if pieces else np.array([], dtype=float)
+
+def run_walk_forward(df: pd.DataFrame, strategy_type: str, param_grid: Dict, train_bars: int, test_bars: int,
+                     anchored: bool = False, initial_cash: float = 100000, commission: float = 0.0,
+                     objective: str = "sharpe", workers: Optional[int] = None) -> Dict:
+    """
+    Walk-forward: folds avaliados em paralelo num pool de processos que compartilham a
+    série de preços (memória compartilhada). Com um worker (ou um fold) roda no próprio
+    processo. Retorna os folds (parâmetros escolhidos, métricas e tempos), a curva fora
+    da amostra encadeada e suas métricas.
+    """
+    if objective not in OBJECTIVES:
+        raise ValueError(f"objective deve ser um de {OBJECTIVES}")
+    folds = make_folds(len(df), train_bars, test_bars, anchored)
+    if not folds:
+        raise ValueError("histórico insuficiente para um fold (train_bars + 2 candles)")
+    workers = min(workers or WALK_FORWARD_WORKERS, len(folds))
+    args = [(fold, strategy_type, param_grid, initial_cash, commission, objective) for fold in folds]
+
+    started = time.perf_counter()
+    if workers <= 1:
+        results = [evaluate_fold(df, *a) for a in args]
+    else:
+        shm, spec = share_prices(df)
+        try:
+            with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                     initializer=_init_worker, initargs=(spec,)) as pool:
+                results = list(pool.map(_run_fold, args))
+        finally:
+            shm.close()
+            shm.unlink()
+    elapsed = time.perf_counter() - started
+
+    equity = stitch_equity(results, initial_cash)
+    dates = np.concatenate([pd.DatetimeIndex(df.index[lo:hi]).to_numpy() for _, _, lo, hi in folds])
+    for fold in results:
+        fold.pop("equity")
+    return {
+        "folds": results,
+        "dates": dates,
+        "equity": equity,
+        "metrics": {k: float(v) for k, v in summarize(equity).items()},
+        "timing": {"total_ms": round(1000 * elapsed, 2), "workers": workers, "num_folds": len(folds)},
+    }
+
+def run_walk_forward_job(walk_forward_id: int):
+    db = SessionLocal()
+    try:
+        wf = db.query(WalkForward).filter(WalkForward.id == walk_forward_id).first()
+        if not wf or wf.status == BacktestStatus.CANCELLED:
+            return
+        wf.status = BacktestStatus.RUNNING
+        db.commit()
+
+        df = load_price_frame(db, wf.ticker, wf.start_date, wf.end_date)
+        # Já roda num worker do executor (que limita a concorrência): folds no próprio processo
+        result = run_walk_forward(df, wf.strategy_type, wf.param_grid, wf.train_bars, wf.test_bars, wf.anchored,
+                                  wf.initial_cash, wf.commission, wf.objective, workers=1)
+
+        db.refresh(wf)
+        if wf.status == BacktestStatus.CANCELLED:
+            return
+        wf.folds = result["folds"]
+        wf.metrics = {**result["metrics"], **result["timing"]}
+        wf.equity_blob = encode_curve({"date": result["dates"].astype("datetime64[D]"), "equity": result["equity"]})
+        wf.status = BacktestStatus.COMPLETED
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        wf.status = BacktestStatus.FAILED
+        wf.message = str(e)
+        db.commit()
+    finally:
+        db.close()
+
+def walk_forward_curve(blob: bytes) -> Dict[str, np.ndarray]:
+    return decode_curve(blob, fields=("equity",))
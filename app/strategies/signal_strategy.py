@@ -0,0 +1,78 @@
+import backtrader as bt
+import numpy as np
+from app.services.risk_management import calculate_position_size
+
+class SignalStrategy(bt.Strategy):
+    """
+    Executa uma série de sinais pré-calculada (app/services/strategies.py).
+    Sinal > 0 abre posição comprada na abertura do próximo candle, sinal < 0
+    ou fechamento abaixo do stop ATR encerra a posição.
+    """
+    params = dict(
+        signals=None,
+        stop_distance=None,
+        initial_cash=100000,
+        commission=0.0
+    )
+
+    def __init__(self):
+        self.order = None
+        self.stop_price = None
+        self.entry = None
+        self.trades_log = []
+        self.equity = []
+        self.cash = []
+        self.position_sizes = []
+
+    def notify_order(self, order):
+        if order.status in [order.Submitted, order.Accepted]:
+            return
+
+        if order.status == order.Completed:
+            if order.isbuy():
+                self.entry = {
+                    "entry_date": self.data.datetime.date(0),
+                    "exit_date": None,
+                    "side": "LONG",
+                    "entry_price": order.executed.price,
+                    "exit_price": None,
+                    "size": order.executed.size,
+                    "commission": order.executed.comm,
+                    "pnl": None,
+                }
+                self.trades_log.append(self.entry)
+            else:
+                self.entry["exit_date"] = self.data.datetime.date(0)
+                self.entry["exit_price"] = order.executed.price
+                self.entry["commission"] += order.executed.comm
+                self.entry["pnl"] = (
+                    (self.entry["exit_price"] - self.entry["entry_price"]) * self.entry["size"]
+                    - self.entry["commission"]
+                )
+                self.entry = None
+                self.stop_price = None
+        self.order = None
+
+    def next(self):
+        i = len(self) - 1
+        self.equity.append(self.broker.getvalue())
+        self.cash.append(self.broker.getcash())
+        self.position_sizes.append(self.position.size)
+
+        if self.order or i + 1 >= self.data.buflen():
+            return
+
+        signal = self.params.signals[i]
+        close = self.data.close[0]
+        if not self.position:
+            stop_distance = self.params.stop_distance[i]
+            if signal > 0 and np.isfinite(stop_distance):
+                stop_price = close - stop_distance
+                size, reason = calculate_position_size(
+                    self.params.initial_cash, close, stop_price, commission_per_unit=self.params.commission
+                )
+                if size > 0:
+                    self.stop_price = stop_price
+                    self.order = self.buy(size=size)
+        elif signal < 0 or close < self.stop_price:
+            self.order = self.sell(size=self.position.size)
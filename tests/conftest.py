@@ -0,0 +1,18 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.db.models import Base, MLModel
+from app.services import ml_pipeline, model_registry
+from app.services.feature_store import FeatureStore
+
+@pytest.fixture
+def registry(monkeypatch, tmp_path):
+    """Registro de modelos isolado: ml_models em sqlite e artefatos/features em tmp_path."""
+    engine = create_engine("sqlite://", future=True)
+    Base.metadata.create_all(bind=engine, tables=[MLModel.__table__])
+    monkeypatch.setattr(model_registry, "SessionLocal", sessionmaker(bind=engine))
+    monkeypatch.setattr(model_registry, "MODEL_REGISTRY_DIR", str(tmp_path / "models"))
+    monkeypatch.setattr(model_registry, "model_cache", model_registry.ModelCache())
+    monkeypatch.setattr(model_registry, "_paths", {})
+    monkeypatch.setattr(model_registry, "_aliases", {})
+    monkeypatch.setattr(ml_pipeline, "feature_store", FeatureStore(str(tmp_path / "features"), ml_pipeline.FEATURES))
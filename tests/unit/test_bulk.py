@@ -0,0 +1,81 @@
+from contextlib import contextmanager
+from types import SimpleNamespace
+import numpy as np
+import pandas as pd
+from app.db.bulk import copy_frame, copy_insert, copy_upsert
+
+class Psycopg2Cursor:
+    """Cursor falso no estilo psycopg2: COPY via copy_expert(sql, arquivo)."""
+
+    def __init__(self):
+        self.copies = []      # (sql, csv)
+        self.statements = []
+        self.rowcount = 0
+
+    def copy_expert(self, sql, file):
+        self.copies.append((sql, file.read()))
+
+    def execute(self, sql):
+        self.statements.append(sql)
+        # A mescla "afeta" as linhas do último COPY
+        if sql.startswith("INSERT INTO"):
+            self.rowcount = self.copies[-1][1].count("\n")
+
+class Psycopg3Cursor(Psycopg2Cursor):
+    """Cursor falso no estilo psycopg 3: COPY via cursor.copy(sql).write(dados)."""
+
+    @contextmanager
+    def copy(self, sql):
+        chunks = []
+        yield SimpleNamespace(write=chunks.append)
+        self.copies.append((sql, "".join(chunks)))
+
+def fake_db(cursor):
+    dbapi = SimpleNamespace(cursor=lambda: cursor)
+    return SimpleNamespace(connection=lambda: SimpleNamespace(connection=SimpleNamespace(dbapi_connection=dbapi)))
+
+FRAME = pd.DataFrame({"symbol_id": [1, 1, 2], "date": ["2024-01-02", "2024-01-03", "2024-01-02"],
+                      "value": [1.5, np.nan, None]})
+
+def test_copy_frame_sends_csv_with_nulls_on_both_drivers():
+    for cursor in (Psycopg3Cursor(), Psycopg2Cursor()):
+        copy_frame(cursor, "indicators", FRAME)
+        sql, data = cursor.copies[0]
+        assert sql == "COPY indicators (symbol_id, date, value) FROM STDIN WITH (FORMAT csv)"
+        # NaN e None viram campo vazio sem aspas, que o COPY em CSV lê como NULL
+        assert data.splitlines() == ["1,2024-01-02,1.5", "1,2024-01-03,", "2,2024-01-02,"]
+
+def test_copy_insert_chunks_rows():
+    cursor = Psycopg3Cursor()
+    frame = pd.DataFrame({"a": range(5)})
+
+    assert copy_insert(fake_db(cursor), "daily_positions", frame, chunk_size=2) == 5
+    assert [data.splitlines() for _, data in cursor.copies] == [["0", "1"], ["2", "3"], ["4"]]
+
+def test_copy_upsert_do_update_sql_dedup_and_chunks():
+    cursor = Psycopg2Cursor()
+    frame = pd.DataFrame({"symbol_id": [1, 1, 1, 2], "date": ["d1", "d2", "d1", "d1"], "close": [1.0, 2.0, 3.0, 4.0]})
+
+    affected = copy_upsert(fake_db(cursor), "prices", frame, ["symbol_id", "date"], ["close"], chunk_size=2)
+
+    # Chave repetida: fica a última ocorrência
+    assert [data for _, data in cursor.copies] == ["1,d2,2.0\n1,d1,3.0\n", "2,d1,4.0\n"]
+    assert all(sql.startswith("COPY _staging_prices ") for sql, _ in cursor.copies)
+    assert affected == 3
+    assert cursor.statements[:2] == [
+        "DROP TABLE IF EXISTS _staging_prices",
+        "CREATE TEMP TABLE _staging_prices ON COMMIT DROP AS SELECT symbol_id, date, close FROM prices WITH NO DATA",
+    ]
+    merge = ("INSERT INTO prices (symbol_id, date, close) SELECT symbol_id, date, close FROM _staging_prices "
+             "ON CONFLICT (symbol_id, date) DO UPDATE SET close = EXCLUDED.close")
+    assert cursor.statements[2:] == [merge, "TRUNCATE _staging_prices"] * 2
+
+def test_copy_upsert_without_update_columns_does_nothing_on_conflict():
+    cursor = Psycopg3Cursor()
+    copy_upsert(fake_db(cursor), "indicators", FRAME, ["symbol_id", "date"])
+    assert cursor.statements[2].endswith("ON CONFLICT (symbol_id, date) DO NOTHING")
+
+def test_copy_upsert_empty_frame_skips_database():
+    cursor = Psycopg3Cursor()
+    assert copy_upsert(fake_db(cursor), "prices", FRAME.iloc[:0], ["symbol_id", "date"]) == 0
+    assert cursor.statements == [] and cursor.copies == []
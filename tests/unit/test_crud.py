@@ -0,0 +1,14 @@
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.db import crud
+from app.db.models import Base, Symbol
+
+def test_get_or_create_symbol_reuses_existing_row():
+    engine = create_engine("sqlite://", future=True)
+    Base.metadata.create_all(bind=engine, tables=[Symbol.__table__])
+    db = sessionmaker(bind=engine)()
+
+    created = crud.get_or_create_symbol(db, "VALE3.SA")
+    assert (created.ticker, created.name) == ("VALE3.SA", "VALE3.SA")
+    assert crud.get_or_create_symbol(db, "VALE3.SA").id == created.id
+    assert crud.get_or_create_symbol(db, "PETR4.SA").id != created.id
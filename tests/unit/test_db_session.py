@@ -0,0 +1,40 @@
+import sqlite3
+import pytest
+from sqlalchemy import create_engine, exc, text
+from sqlalchemy.pool import QueuePool
+from app.db.session import engine_options, PoolMetrics, _timed_pool_class, async_database_url
+
+def test_engine_options_statement_timeout_and_pgbouncer():
+    url = "postgresql+psycopg://u:p@localhost/db"
+    options = engine_options(url, statement_timeout_ms=5000, pgbouncer=False)
+    assert options["pool_pre_ping"] is True
+    assert options["connect_args"] == {"options": "-c statement_timeout=5000"}
+
+    bouncer = engine_options(url, statement_timeout_ms=5000, pgbouncer=True)
+    assert bouncer["connect_args"] == {"prepare_threshold": None}
+    assert "connect_args" not in engine_options("postgresql://u:p@localhost/db", pgbouncer=True)
+    assert engine_options("sqlite://") == {}
+    assert async_database_url("postgresql://u:p@h/db") == "postgresql+psycopg://u:p@h/db"
+
+def test_pool_metrics_counts_checkouts_and_timeouts():
+    metrics = PoolMetrics()
+    engine = create_engine(
+        "sqlite://", creator=lambda: sqlite3.connect(":memory:", check_same_thread=False),
+        poolclass=_timed_pool_class(QueuePool, metrics), pool_size=1, max_overflow=0, pool_timeout=0.05,
+    )
+    conn = engine.connect()
+    conn.execute(text("SELECT 1"))
+    snapshot = metrics.snapshot(engine.pool)
+    assert snapshot["checked_out"] == 1 and snapshot["checkouts"] == 1
+
+    with pytest.raises(exc.TimeoutError):
+        engine.connect()
+    conn.close()
+
+    snapshot = metrics.snapshot(engine.pool)
+    assert snapshot["timeouts"] == 1 and snapshot["checked_out"] == 0
+    assert snapshot["wait_max_ms"] >= 50
+
+    # dispose recria o pool com a mesma classe: as métricas continuam
+    engine.dispose()
+    assert engine.pool.metrics is metrics
@@ -0,0 +1,135 @@
+import pytest
+from datetime import date, datetime, timedelta
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.db.models import Base, Backtest, BacktestStatus, RobustnessAnalysis, Sweep, WalkForward
+from app.services import executor as executor_module
+
+@pytest.fixture
+def session_factory(monkeypatch):
+    engine = create_engine("sqlite://", future=True)
+    Base.metadata.create_all(bind=engine, tables=[Backtest.__table__, Sweep.__table__, WalkForward.__table__,
+                                                  RobustnessAnalysis.__table__])
+    factory = sessionmaker(bind=engine)
+    monkeypatch.setattr(executor_module, "SessionLocal", factory)
+    return factory
+
+def add_backtests(factory, n):
+    db = factory()
+    rows = [
+        Backtest(ticker="AAPL", start_date=date(2020, 1, 1), end_date=date(2021, 1, 1),
+                 strategy_type="sma_cross", strategy_params_json={}, initial_cash=100000,
+                 commission=0.0, timeframe="1d", engine="vectorized", status=BacktestStatus.PENDING)
+        for _ in range(n)
+    ]
+    db.add_all(rows)
+    db.commit()
+    ids = [r.id for r in rows]
+    db.close()
+    return ids
+
+def statuses(factory):
+    db = factory()
+    result = {b.id: b.status for b in db.query(Backtest).all()}
+    db.close()
+    return result
+
+def test_claim_respects_limit_and_marks_running(session_factory):
+    ids = add_backtests(session_factory, 3)
+
+    claimed = executor_module.claim_pending(Backtest, 2)
+
+    assert claimed == ids[:2]
+    assert statuses(session_factory) == {
+        ids[0]: BacktestStatus.RUNNING, ids[1]: BacktestStatus.RUNNING, ids[2]: BacktestStatus.PENDING,
+    }
+    assert executor_module.claim_pending(Backtest, 5) == [ids[2]]
+
+def test_release_returns_claimed_rows_to_queue(session_factory):
+    ids = add_backtests(session_factory, 2)
+    executor_module.claim_pending(Backtest, 2)
+
+    executor_module.release(Backtest, [ids[1]])
+
+    assert statuses(session_factory)[ids[1]] == BacktestStatus.PENDING
+
+def test_cancel_only_unfinished(session_factory):
+    ids = add_backtests(session_factory, 1)
+    ex = executor_module.BacktestExecutor(max_workers=1)
+
+    assert ex.cancel(ids[0])
+    assert statuses(session_factory)[ids[0]] == BacktestStatus.CANCELLED
+    assert not ex.cancel(ids[0])
+    assert executor_module.claim_pending(Backtest, 1) == []
+
+def set_heartbeat(factory, backtest_id, heartbeat_at):
+    db = factory()
+    db.get(Backtest, backtest_id).heartbeat_at = heartbeat_at
+    db.commit()
+    db.close()
+
+def test_stale_running_backtests_are_requeued(session_factory):
+    ids = add_backtests(session_factory, 3)
+    executor_module.claim_pending(Backtest, 3)
+    set_heartbeat(session_factory, ids[0], datetime.utcnow() - timedelta(minutes=10))
+    set_heartbeat(session_factory, ids[1], None)  # reservado antes do heartbeat existir
+
+    assert sorted(executor_module.requeue_stale(Backtest, stale_after=60)) == ids[:2]
+    assert statuses(session_factory) == {
+        ids[0]: BacktestStatus.PENDING, ids[1]: BacktestStatus.PENDING, ids[2]: BacktestStatus.RUNNING,
+    }
+    # Voltam a ser reservados normalmente
+    assert executor_module.claim_pending(Backtest, 5) == ids[:2]
+
+def test_heartbeat_keeps_running_backtests_claimed(session_factory):
+    ids = add_backtests(session_factory, 1)
+    executor_module.claim_pending(Backtest, 1)
+    set_heartbeat(session_factory, ids[0], datetime.utcnow() - timedelta(minutes=10))
+
+    executor_module.heartbeat(Backtest, ids)
+
+    assert executor_module.requeue_stale(Backtest, stale_after=60) == []
+    assert statuses(session_factory)[ids[0]] == BacktestStatus.RUNNING
+
+def add_sweep(factory):
+    db = factory()
+    sweep = Sweep(ticker="AAPL", start_date=date(2020, 1, 1), end_date=date(2021, 1, 1), strategy_type="sma_cross",
+                  param_grid={"fast": [10], "slow": [50]}, initial_cash=100000, commission=0.0,
+                  status=BacktestStatus.PENDING)
+    db.add(sweep)
+    db.commit()
+    sweep_id = sweep.id
+    db.close()
+    return sweep_id
+
+def test_cancel_other_job_kinds(session_factory):
+    sweep_id = add_sweep(session_factory)
+    ex = executor_module.BacktestExecutor(max_workers=1)
+
+    assert ex.cancel(sweep_id, "sweep")
+    assert not ex.cancel(sweep_id, "sweep")
+    assert executor_module.claim_pending(Sweep, 1) == []
+
+def test_dispatcher_claims_every_job_kind(session_factory):
+    backtest_ids = add_backtests(session_factory, 2)
+    sweep_id = add_sweep(session_factory)
+    ex = executor_module.BacktestExecutor(max_workers=2)
+
+    # Com só dois slots, a rodada seguinte começa por outra fila e o sweep não espera os backtests
+    claimed = ex._claim(2) + ex._claim(2) + ex._claim(2)
+
+    assert sorted(claimed) == sorted([("backtest", backtest_ids[0]), ("backtest", backtest_ids[1]),
+                                      ("sweep", sweep_id)])
+    assert claimed[:2] == [("sweep", sweep_id), ("backtest", backtest_ids[0])]
+
+def test_stale_jobs_of_every_kind_are_requeued_on_start(session_factory):
+    sweep_id = add_sweep(session_factory)
+    executor_module.claim_pending(Sweep, 1)
+    db = session_factory()
+    db.get(Sweep, sweep_id).heartbeat_at = datetime.utcnow() - timedelta(minutes=10)
+    db.commit()
+    db.close()
+
+    executor_module.BacktestExecutor(max_workers=1, stale_after=60)._recover()
+
+    assert executor_module.claim_pending(Sweep, 1) == [sweep_id]
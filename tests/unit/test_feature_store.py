@@ -0,0 +1,65 @@
+import fcntl
+import threading
+import numpy as np
+from app.services.feature_store import FeatureStore
+from app.services.indicator_registry import indicator_frame
+from app.services.ml_pipeline import FEATURES
+from tests.unit.test_vectorized_engine import make_prices
+
+def test_incremental_updates_match_full_computation(tmp_path):
+    df = make_prices(1500)
+    store = FeatureStore(str(tmp_path), FEATURES)
+    assert store.update("A", df.iloc[:800]) == 800
+    # Cada janela contém o último candle gravado e o aquecimento: só os novos são calculados
+    assert store.update("A", df.iloc[500:1100]) == 300
+    assert store.update("A", df.iloc[900:1500]) == 400
+    assert store.update("A", df.iloc[900:1500]) == 0
+    # Janela que não encosta no último candle gravado não altera a matriz
+    assert store.update("A", df.iloc[1200:1400]) == 0
+
+    dates, values = store.read("A")
+    assert values.dtype == np.float32 and values.shape == (1500, len(FEATURES))
+    expected = indicator_frame(df, FEATURES).to_numpy().astype(np.float32)
+    np.testing.assert_array_equal(values, expected)
+    assert dates[-1] == np.datetime64(df.index[-1].date())
+
+def test_frame_drops_warmup_and_stack_concatenates(tmp_path):
+    store = FeatureStore(str(tmp_path), FEATURES)
+    store.update("A", make_prices(300))
+    store.update("B", make_prices(200))
+
+    frame = store.frame("A")
+    assert not frame.isna().any().any() and len(frame) < 300
+    X, index = store.stack(["A", "B"])
+    assert X.dtype == np.float32 and X.flags["C_CONTIGUOUS"]
+    assert len(X) == len(frame) + len(store.frame("B"))
+    np.testing.assert_array_equal(X[:len(frame)], frame.to_numpy())
+    assert list(index.get_level_values("ticker").unique()) == ["A", "B"]
+
+def test_changed_feature_definition_rebuilds(tmp_path):
+    df = make_prices(200)
+    FeatureStore(str(tmp_path), FEATURES).update("A", df)
+    changed = FeatureStore(str(tmp_path), {**FEATURES, "SMA_50": ("SMA", {"period": 40})})
+    assert changed.meta("A") is None
+    assert changed.update("A", df) == 200
+
+def test_short_window_starting_earlier_keeps_history(tmp_path):
+    df = make_prices(800)
+    store = FeatureStore(str(tmp_path), FEATURES)
+    store.update("A", df.iloc[200:800])
+    # Começa antes do que está gravado mas termina antes do último candle: não recalcula
+    assert store.update("A", df.iloc[:500]) == 0
+    assert store.meta("A")["n"] == 600
+
+def test_update_waits_for_the_file_lock_of_another_writer(tmp_path):
+    store = FeatureStore(str(tmp_path), FEATURES)
+    done = threading.Event()
+    # Outro descritor do arquivo de lock faz o papel de um segundo processo escritor
+    with open(store.path("A", "lock"), "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        writer = threading.Thread(target=lambda: (store.update("A", make_prices(200)), done.set()))
+        writer.start()
+        assert not done.wait(0.3)
+        fcntl.flock(f, fcntl.LOCK_UN)
+    writer.join(5)
+    assert done.is_set() and store.meta("A")["n"] == 200
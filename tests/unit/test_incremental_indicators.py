@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+import pytest
+import talib
+from app.services.indicator_service import compute_indicator, warmup_bars
+
+def make_prices(n=300, seed=3):
+    rng = np.random.default_rng(seed)
+    close = 100 + rng.normal(0, 1, n).cumsum()
+    high = close + rng.uniform(0, 2, n)
+    low = close - rng.uniform(0, 2, n)
+    return pd.DataFrame({"close": close, "high": high, "low": low})
+
+@pytest.mark.parametrize("name,reference", [
+    ("SMA", lambda df: talib.SMA(df["close"].to_numpy(), 10)),
+    ("EMA", lambda df: talib.EMA(df["close"].to_numpy(), 10)),
+    ("RSI", lambda df: talib.RSI(df["close"].to_numpy(), 10)),
+    ("ATR", lambda df: talib.ATR(df["high"].to_numpy(), df["low"].to_numpy(), df["close"].to_numpy(), 10)),
+])
+def test_full_computation_matches_talib(name, reference):
+    df = make_prices()
+    values, _ = compute_indicator(df, name, {"period": 10})
+    np.testing.assert_allclose(values, reference(df), rtol=1e-9, equal_nan=True)
+
+@pytest.mark.parametrize("name", ["SMA", "EMA", "RSI", "ATR"])
+def test_incremental_continues_full_series(name):
+    df = make_prices()
+    params = {"period": 10}
+    full, _ = compute_indicator(df, name, params)
+
+    # Calcula até o candle 249 e depois só os novos, a partir do estado salvo
+    split = 250
+    _, state = compute_indicator(df.iloc[:split], name, params)
+    start = split - warmup_bars(name, params)
+    values, _ = compute_indicator(df.iloc[start:], name, params, state)
+    np.testing.assert_allclose(values[split - start:], full[split:], rtol=1e-9)
+
+def test_short_history_has_no_state():
+    values, state = compute_indicator(make_prices(n=5), "EMA", {"period": 10})
+    assert np.isnan(values).all()
+    assert state is None
+
+def test_calculate_indicators_sends_one_copy_per_symbol(monkeypatch):
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from app.db.models import Base, IndicatorWatermark, Symbol
+    from app.services import indicator_service
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine, tables=[Symbol.__table__, IndicatorWatermark.__table__])
+    db = sessionmaker(bind=engine)()
+    db.add_all([Symbol(ticker=t, name=t, exchange="", currency="") for t in ("A", "B")])
+    db.commit()
+
+    prices = make_prices(n=60).assign(date=pd.bdate_range("2024-01-01", periods=60), open=100.0, volume=1000)
+    sent = []
+    monkeypatch.setattr(indicator_service, "load_prices", lambda db, symbol_id, since=None, warmup=0: prices)
+    monkeypatch.setattr(indicator_service, "copy_upsert",
+                        lambda db, table, frame, key: sent.append((table, frame, key)) or len(frame))
+
+    specs = ["SMA", {"name": "EMA", "params": {"period": 20}}]
+    rows = {t: indicator_service.calculate_indicators(t, specs, db=db) for t in ("A", "B")}
+
+    assert len(sent) == 2
+    for (table, frame, key), ticker in zip(sent, ("A", "B")):
+        symbol_id = db.query(Symbol.id).filter(Symbol.ticker == ticker).scalar()
+        assert (table, key) == ("indicators", indicator_service.INDICATOR_KEY)
+        assert list(frame.columns) == ["symbol_id", "date", "name", "value", "params_hash"]
+        assert (frame["symbol_id"] == symbol_id).all() and not frame["value"].isna().any()
+        # Sem as linhas de aquecimento: SMA(14) e EMA(20) sobre 60 candles
+        assert frame.groupby("name").size().to_dict() == {"EMA": 41, "SMA": 47}
+        assert frame["date"].iloc[-1] == "2024-03-22"
+        assert rows[ticker] == len(frame)
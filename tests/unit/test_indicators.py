@@ -14,3 +14,29 @@ def test_rsi():
     assert rsi.isna().sum() == 3
     assert rsi.max() <= 100
     assert rsi.min() >= 0
+
+def test_plan_shares_intermediates():
+    from app.services.indicator_registry import IndicatorPlan
+    plan = IndicatorPlan([("SMA", {"period": 10}), ("SMA", {"period": 50}), ("ATR", {}), ("ATR", {"period": 7})])
+    names = [key[0] for key in plan.nodes]
+    assert names.count("CUMSUM") == 1
+    assert names.count("TR") == 1
+    assert len(plan.targets) == 4
+
+def test_unknown_indicator_is_rejected():
+    import pytest
+    from app.services.indicator_registry import IndicatorPlan
+    with pytest.raises(ValueError):
+        IndicatorPlan([("FOO", {})])
+    with pytest.raises(ValueError):
+        IndicatorPlan([("TR", {})])  # intermediário, não pode ser pedido
+
+def test_cache_computes_each_series_once():
+    from app.services.indicator_registry import indicator
+    df = pd.DataFrame({"close": np.arange(1.0, 30.0)})
+    cache = {}
+    first = indicator(df, "SMA", cache, period=5)
+    assert len(cache) == 2  # CUMSUM + SMA(5)
+    indicator(df, "SMA", cache, period=10)
+    assert len(cache) == 3
+    pd.testing.assert_series_equal(indicator(df, "SMA", cache, period=5), first)
@@ -0,0 +1,102 @@
+from datetime import date, timedelta
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.db.models import Base, IngestionWatermark, Symbol
+from app.services import ingestion
+
+END = date(2024, 1, 15)
+
+@pytest.fixture
+def db(monkeypatch):
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine, tables=[Symbol.__table__, IngestionWatermark.__table__])
+    # prices particionada não existe no SQLite; load_watermarks só lê symbol_id e date
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE prices (id INTEGER, symbol_id INTEGER, date DATE)"))
+    Session = sessionmaker(bind=engine)
+    monkeypatch.setattr(ingestion, "SessionLocal", Session)
+    monkeypatch.setattr(ingestion, "persist_prices", lambda symbol_id, df: len(df))
+    session = Session()
+    yield session
+    session.close()
+
+class StubFetch:
+    """fetch_ohlcv_many falso: registra os lotes e devolve candles úteis em [start, end)."""
+
+    def __init__(self, frames=None):
+        self.calls = []
+        self.frames = frames or {}
+
+    def __call__(self, tickers, start, end):
+        self.calls.append((date.fromisoformat(start), tuple(tickers)))
+        for ticker in tickers:
+            yield ticker, self.frames.get(ticker, make_frame(start, end))
+
+def make_frame(start, end):
+    dates = pd.bdate_range(start, pd.Timestamp(end) - timedelta(days=1))
+    return pd.DataFrame({"date": dates, "close": 1.0})
+
+def add_symbols(db, *tickers):
+    symbols = [Symbol(ticker=t, name=t, exchange="", currency="") for t in tickers]
+    db.add_all(symbols)
+    db.commit()
+    return {s.ticker: s.id for s in symbols}
+
+def watermark(db, symbol_id):
+    return db.get(IngestionWatermark, symbol_id)
+
+def test_symbols_are_grouped_by_start_date(db, monkeypatch):
+    ids = add_symbols(db, "A", "B", "C", "D", "E")
+    for ticker in ("A", "B"):
+        ingestion.save_watermark(db, ids[ticker], date(2024, 1, 9), date(2024, 1, 10))
+    ingestion.save_watermark(db, ids["E"], date(2024, 1, 12), END)
+    db.execute(text("INSERT INTO prices (symbol_id, date) VALUES (:id, '2024-01-04'), (:id, '2024-01-05')"), {"id": ids["C"]})
+    db.commit()
+    fetch = StubFetch()
+    monkeypatch.setattr(ingestion, "fetch_ohlcv_many", fetch)
+
+    summary = ingestion.run_incremental_ingestion(end=END, default_start=date(2024, 1, 1))
+
+    # Mesmo watermark → um lote; sem watermark → último candle + 1; sem nada → default_start
+    assert sorted(fetch.calls) == [(date(2024, 1, 1), ("D",)), (date(2024, 1, 6), ("C",)), (date(2024, 1, 10), ("A", "B"))]
+    assert summary["skipped"] == ["E"]
+    assert summary["rows"] == {"A": 3, "B": 3, "C": 5, "D": 10}
+
+def test_watermark_advances_to_last_candle(db, monkeypatch):
+    ids = add_symbols(db, "A")
+    monkeypatch.setattr(ingestion, "fetch_ohlcv_many", StubFetch())
+
+    ingestion.run_incremental_ingestion(end=END, default_start=date(2024, 1, 1))
+
+    mark = watermark(db, ids["A"])
+    assert (mark.last_date, mark.checked_until) == (date(2024, 1, 12), END)
+
+def test_empty_frame_keeps_last_date_and_advances_checked_until(db, monkeypatch):
+    # Feriado: nada novo no intervalo, mas ele não é consultado de novo
+    ids = add_symbols(db, "A")
+    ingestion.save_watermark(db, ids["A"], date(2024, 1, 12), date(2024, 1, 13))
+    monkeypatch.setattr(ingestion, "fetch_ohlcv_many", StubFetch({"A": pd.DataFrame()}))
+
+    summary = ingestion.run_incremental_ingestion(end=END)
+
+    db.expire_all()
+    mark = watermark(db, ids["A"])
+    assert summary["rows"] == {"A": 0}
+    assert (mark.last_date, mark.checked_until) == (date(2024, 1, 12), END)
+
+def test_failed_download_keeps_watermark_and_reports_ticker(db, monkeypatch):
+    ids = add_symbols(db, "A", "B")
+    ingestion.save_watermark(db, ids["A"], date(2024, 1, 9), date(2024, 1, 10))
+    ingestion.save_watermark(db, ids["B"], date(2024, 1, 9), date(2024, 1, 10))
+    monkeypatch.setattr(ingestion, "fetch_ohlcv_many", StubFetch({"A": ConnectionError("rate limited")}))
+
+    summary = ingestion.run_incremental_ingestion(end=END)
+
+    db.expire_all()
+    assert summary["failed"] == {"A": "rate limited"}
+    assert summary["rows"] == {"B": 3}
+    assert watermark(db, ids["A"]).checked_until == date(2024, 1, 10)
+    assert watermark(db, ids["B"]).checked_until == END
@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+import pytest
+from app.services import metrics as m
+
+def _curves(k=4, n=500, seed=11):
+    rng = np.random.default_rng(seed)
+    return 100000 * np.cumprod(1 + rng.normal(0.0004, 0.01, (k, n)), axis=1)
+
+def test_batch_matches_single_curves():
+    equity = _curves()
+    position = (np.arange(equity.shape[1]) % 3 == 0) * np.ones_like(equity)
+    batch = m.summarize(equity, position=position, price=np.full(equity.shape[1], 10.0))
+    for i in range(len(equity)):
+        single = m.summarize(equity[i], position=position[i], price=np.full(equity.shape[1], 10.0))
+        for name, values in batch.items():
+            assert values[i] == pytest.approx(float(single[name]))
+
+def test_ratio_definitions():
+    equity = _curves(k=1)[0]
+    returns = equity[1:] / equity[:-1] - 1
+    years = (len(equity) - 1) / m.TRADING_DAYS
+    assert m.cagr(equity) == pytest.approx((equity[-1] / equity[0]) ** (1 / years) - 1)
+    downside = np.sqrt(np.mean(np.minimum(returns, 0) ** 2))
+    assert m.sortino_ratio(equity) == pytest.approx(returns.mean() / downside * np.sqrt(252))
+    assert m.calmar_ratio(equity) == pytest.approx(m.cagr(equity) / abs(m.max_drawdown(equity)))
+    assert m.exposure(np.array([0, 1, 1, 0])) == 0.5
+    flat = np.full(10, 100.0)
+    assert m.sortino_ratio(flat) == 0.0 and m.calmar_ratio(flat) == 0.0
+
+def test_rolling_matches_pandas():
+    equity = _curves(k=2, n=300)
+    window = 20
+    returns = pd.DataFrame(equity.T).pct_change()
+    expected_sharpe = (returns.rolling(window).mean() / returns.rolling(window).std() * np.sqrt(252)).to_numpy().T
+    np.testing.assert_allclose(m.rolling_sharpe(equity, window), expected_sharpe, rtol=1e-6, equal_nan=True)
+
+    def window_mdd(values):
+        return (values / np.maximum.accumulate(values) - 1).min()
+    expected_mdd = pd.Series(equity[0]).rolling(window).apply(window_mdd, raw=True).to_numpy()
+    np.testing.assert_allclose(m.rolling_max_drawdown(equity[0], window), expected_mdd, equal_nan=True)
+    np.testing.assert_allclose(m.rolling_return(equity[0], 5)[5:], equity[0][5:] / equity[0][:-5] - 1)
+
+def test_trade_stats_with_padding():
+    returns = m.pad_trade_returns([np.array([0.1, -0.05, np.nan]), np.array([]), np.array([0.2])])
+    np.testing.assert_allclose(m.win_rate(returns), [0.5, 0.0, 1.0])
+    np.testing.assert_allclose(m.avg_trade_return(returns), [0.025, 0.0, 0.2])
@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+from app.services import ml_pipeline, model_registry
+from app.services.portfolio import build_portfolio_states
+from app.services.strategies import build_signals
+from tests.unit.test_model_registry import training_set
+from tests.unit.test_vectorized_engine import make_prices
+
+PARAMS = {"model": "logreg", "entry_threshold": 0.5, "exit_threshold": 0.5}
+
+def test_signals_use_one_inference_call_across_variants(registry, monkeypatch):
+    X, y = training_set()
+    ml_pipeline.train_model(X, y, "logreg")
+    calls, loads = [], []
+    predict = ml_pipeline._predict
+    monkeypatch.setattr(ml_pipeline, "_predict", lambda *a, **k: calls.append(1) or predict(*a, **k))
+    load_model = ml_pipeline.load_model
+    monkeypatch.setattr(ml_pipeline, "load_model", lambda *a, **k: loads.append(1) or load_model(*a, **k))
+
+    df, cache = make_prices(1000, seed=11), {}
+    for entry in (0.5, 0.52, 0.55):
+        signals = build_signals(df, "ml_signal", {**PARAMS, "entry_threshold": entry}, cache)
+        assert signals.index.equals(df.index)
+    # Probabilidades e fim do treino saem do mesmo artefato
+    assert len(calls) == len(loads) == 1
+
+def test_signals_have_no_look_ahead(registry):
+    X, y = training_set()
+    ml_pipeline.train_model(X, y, "logreg")
+    df = make_prices(1000, seed=11)
+
+    full = build_signals(df, "ml_signal", PARAMS)
+    # Sinal do candle t não muda quando os candles depois de t não existem
+    for k in (600, 800):
+        np.testing.assert_array_equal(build_signals(df.iloc[:k], "ml_signal", PARAMS).to_numpy(), full.iloc[:k].to_numpy())
+    assert (full != 0).any()
+
+def test_out_of_sample_mutes_training_period(registry):
+    X, y = training_set()
+    ml_pipeline.train_model(X, y, "logreg")
+    train_end = pd.Timestamp(X.index.max())
+    assert pd.Timestamp(ml_pipeline.model_train_end("logreg")) == train_end
+    df = make_prices(1000, seed=11)
+
+    signals = build_signals(df, "ml_signal", PARAMS)
+    assert (signals[signals.index <= train_end] == 0).all()
+    assert (signals[signals.index > train_end] != 0).all()
+    in_sample = build_signals(df, "ml_signal", {**PARAMS, "out_of_sample": False})
+    assert (in_sample[in_sample.index <= train_end] != 0).any()
+
+def test_portfolio_states_match_single_symbol_predictions(registry):
+    X, y = training_set()
+    _, metrics = ml_pipeline.train_model(X, y, "logreg")
+    assert model_registry.resolve_model_id("logreg") == metrics["model_id"]
+
+    frames = [make_prices(600, seed=s) for s in (11, 12)]
+    matrix = {"tickers": ["A", "B"], "dates": frames[0].index,
+              **{f: np.vstack([df[f].to_numpy() for df in frames]) for f in ("high", "low", "close")}}
+    states = build_portfolio_states(matrix, "ml_signal", {**PARAMS, "model": metrics["model_id"]})
+    assert states.shape == (2, 600)
+    for i, df in enumerate(frames):
+        signals = build_signals(df, "ml_signal", PARAMS)
+        active = signals != 0
+        np.testing.assert_array_equal(states[i][active.to_numpy()], (signals[active] > 0).to_numpy())
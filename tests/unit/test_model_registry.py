@@ -0,0 +1,89 @@
+import os
+import numpy as np
+import pytest
+from app.db.models import MLModel
+from app.services import ml_pipeline, model_registry
+from tests.unit.test_vectorized_engine import make_prices
+
+def training_set(n=400):
+    X = ml_pipeline.prepare_features(make_prices(n))
+    y = (X["ret_1"].shift(-1) > 0).astype(int)
+    return X, y
+
+def test_train_model_registers_versions(registry):
+    X, y = training_set()
+    _, first = ml_pipeline.train_model(X, y, "logreg")
+    _, second = ml_pipeline.train_model(X, y, "logreg")
+    assert (first["version"], second["version"]) == (1, 2)
+
+    # O tipo resolve para a última versão; o id, para a versão exata
+    assert os.path.basename(model_registry.resolve_model("logreg")).startswith("v2-")
+    assert os.path.basename(model_registry.resolve_model(first["model_id"])).startswith("v1-")
+    with pytest.raises(ValueError):
+        model_registry.resolve_model("rf")
+
+def test_register_retries_when_a_concurrent_training_takes_the_version(registry, monkeypatch):
+    original = model_registry.artifact_path
+    taken = []
+
+    def racing_path(model_type, version):
+        # Outro processo registra a mesma versão entre a leitura do máximo e o commit
+        if not taken:
+            db = model_registry.SessionLocal()
+            db.add(MLModel(model_type=model_type, version=version, path="outro.joblib", features=[]))
+            db.commit()
+            db.close()
+            taken.append(version)
+        return original(model_type, version)
+
+    monkeypatch.setattr(model_registry, "artifact_path", racing_path)
+    entry = model_registry.register_model({"features": []}, "logreg", {})
+
+    assert taken == [1] and entry.version == 2
+    # O artefato da tentativa perdida foi apagado; o da versão registrada ficou
+    assert os.listdir(os.path.dirname(entry.path)) == [os.path.basename(entry.path)]
+
+def test_loaded_model_is_cached_and_memory_mapped(registry):
+    X, y = training_set()
+    _, metrics = ml_pipeline.train_model(X, y, "logreg")
+    artifact = model_registry.load_model(metrics["model_id"])
+    assert model_registry.load_model("logreg") is artifact
+    assert isinstance(artifact["model"].coef_, np.memmap)
+
+def test_predict_many_matches_single_predictions(registry):
+    X, y = training_set()
+    ml_pipeline.train_model(X, y, "logreg")
+    frames = {"A": make_prices(300), "B": make_prices(250)}
+
+    batch = ml_pipeline.predict_many(frames, "logreg")
+    for ticker, df in frames.items():
+        single = ml_pipeline.predict(df, "logreg", ticker=ticker)
+        assert batch[ticker].index.equals(single.index)
+        np.testing.assert_array_equal(batch[ticker].to_numpy(), single.to_numpy())
+    probabilities = ml_pipeline.predict_many(frames, "logreg", proba=True)
+    assert ((probabilities["A"] >= 0) & (probabilities["A"] <= 1)).all()
+
+def test_prediction_reads_the_feature_store_without_writing(registry, monkeypatch):
+    X, y = training_set()
+    ml_pipeline.train_model(X, y, "logreg")
+    frames = {"A": make_prices(300), "B": make_prices(250)}
+
+    expected = ml_pipeline.predict_many(frames, "logreg")
+    # Sem matriz gravada as features são calculadas sobre os preços, e o store fica intocado
+    assert ml_pipeline.feature_store.meta("A") is None and ml_pipeline.feature_store.meta("B") is None
+
+    ml_pipeline.feature_store.update("A", frames["A"])
+    monkeypatch.setattr(ml_pipeline, "feature_matrix", lambda *a, **k: pytest.fail("A deveria vir do store"))
+    served = ml_pipeline.predict_many({"A": frames["A"]}, "logreg")
+    np.testing.assert_array_equal(served["A"].to_numpy(), expected["A"].to_numpy())
+
+def test_train_model_with_search_registers_best_config(registry):
+    X, y = training_set()
+    model, metrics = ml_pipeline.train_model(
+        X, y, "logreg", search={"grids": {"logreg": {"C": [0.01, 1.0]}}, "n_splits": 3, "n_jobs": 1},
+    )
+    assert model.C == metrics["cv"]["best"]["params"]["C"]
+    assert len(metrics["cv"]["results"]) == 2
+    # Métrica principal fora da amostra; a do ajuste final fica separada
+    assert metrics["accuracy"] == metrics["cv"]["best"]["mean_score"]
+    assert set(metrics["in_sample"]) == {"accuracy", "precision", "recall"}
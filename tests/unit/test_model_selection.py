@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+import pandas as pd
+from app.services.model_selection import purged_folds, split_masks, search
+
+def test_purged_folds_group_by_date_and_drop_purge_embargo():
+    dates = np.repeat(pd.bdate_range("2020-01-01", periods=100).to_numpy(), 3)  # 3 símbolos por data
+    position, folds = purged_folds(dates, n_splits=4)
+    assert folds == [(0, 25), (25, 50), (50, 75), (75, 100)]
+
+    train, test = split_masks(position, folds[1], purge=2, embargo=3)
+    assert test.sum() == 25 * 3
+    assert not (train & test).any()
+    # 2 datas antes e 3 depois do bloco de teste ficam fora do treino
+    assert (~train & ~test).sum() == 5 * 3
+    assert set(position[~train & ~test]) == {23, 24, 50, 51, 52}
+
+def test_search_prunes_configs_and_reports_fold_timings():
+    rng = np.random.default_rng(0)
+    index = pd.bdate_range("2015-01-01", periods=600)
+    X = pd.DataFrame(rng.normal(size=(600, 4)), index=index)
+    y = (X[0] + 0.3 * rng.normal(size=600) > 0).astype(int)
+
+    result = search(X, y, ("logreg",), grids={"logreg": {"C": [1e-4, 1e-3, 0.1, 1.0]}},
+                    n_splits=4, purge=1, n_jobs=1, keep=0.5, min_folds=2)
+
+    # 4 configurações -> 2 após o 2º fold -> 1 após o 3º
+    pruned = {r["params"]["C"]: r["pruned_after"] for r in result["results"] if r["pruned_after"] is not None}
+    assert pruned == {1e-4: 2, 1e-3: 2, 1.0: 3}
+    assert result["best"]["params"] == {"C": 0.1}
+    assert result["timing"]["fits"] == 4 * 2 + 2 + 1
+    fold = result["results"][0]["folds"][1]  # purge de 1 data antes do bloco
+    assert fold["fit_ms"] >= 0 and fold["test_rows"] == 150 and fold["train_rows"] == 450 - 1
+
+def test_search_purges_the_label_horizon_by_default():
+    rng = np.random.default_rng(0)
+    index = pd.bdate_range("2015-01-01", periods=300)
+    X = pd.DataFrame(rng.normal(size=(300, 2)), index=index)
+    y = (X[0] > 0).astype(int)
+
+    result = search(X, y, ("logreg",), grids={"logreg": {"C": [1.0]}}, n_splits=3, n_jobs=1)
+
+    # Fold do meio: o rótulo da data anterior ao bloco olha para dentro dele e sai do treino
+    assert result["results"][0]["folds"][1]["train_rows"] == 200 - 1
+    with pytest.raises(ValueError):
+        search(X, y, ("logreg",), n_splits=3, purge=-1, n_jobs=1)
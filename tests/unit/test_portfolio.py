@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+import pytest
+from app.services.portfolio import build_portfolio_states, run_portfolio_backtest
+
+def make_matrix(n_symbols=5, n_dates=400, seed=3):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0.0005, 0.02, (n_symbols, n_dates)), axis=1))
+    return {
+        "tickers": [f"S{i}" for i in range(n_symbols)],
+        "dates": pd.bdate_range("2015-01-01", periods=n_dates),
+        "high": close * 1.01,
+        "low": close * 0.99,
+        "close": close,
+    }
+
+def test_single_symbol_always_invested_tracks_price():
+    matrix = make_matrix(n_symbols=1)
+    states = np.ones_like(matrix["close"], dtype=bool)
+
+    result = run_portfolio_backtest(matrix, states, initial_cash=1000)
+
+    close = matrix["close"][0]
+    np.testing.assert_allclose(result["equity"], 1000 * close / close[0])
+    np.testing.assert_allclose(result["cash"], 0, atol=1e-9)
+
+def test_equal_weight_shared_capital_and_commission():
+    matrix = make_matrix(n_symbols=2, n_dates=3)
+    matrix["close"] = np.array([[10.0, 11.0, 11.0], [20.0, 20.0, 18.0]])
+    states = np.array([[True, True, True], [True, True, True]])
+
+    result = run_portfolio_backtest(matrix, states, initial_cash=100, commission=0.01)
+
+    # dia 0: compra 50/50 paga 1% sobre giro 1.0; dia 1: +5% e a volta a 50/50 gira
+    # |0.5 - 0.55/1.05| * 2; dia 2: -5% e gira |0.5 - 0.45/0.95| * 2
+    turnover = [1.0, 0.05 / 1.05, 0.05 / 0.95]
+    np.testing.assert_allclose(result["turnover"], turnover)
+    np.testing.assert_allclose(result["equity"], 100 * np.cumprod([1.0, 1.05, 0.95] * (1 - 0.01 * np.array(turnover))))
+    assert list(result["position"]) == [2, 2, 2]
+
+def test_trades_per_symbol_add_up_to_equity():
+    matrix = make_matrix(n_symbols=3, n_dates=300)
+    states = build_portfolio_states(matrix, "sma_cross", {"fast": 5, "slow": 20})
+    states[:, -1] = False  # tudo vendido no último candle: todos os trades fechados
+
+    result = run_portfolio_backtest(matrix, states, initial_cash=1000, commission=0.001)
+
+    trades = result["trades"]
+    assert len(trades) > 3 and {t["ticker"] for t in trades} == set(matrix["tickers"])
+    assert all(t["exit_date"] > t["entry_date"] for t in trades)
+    # Cada trade é a contribuição do seu símbolo: a soma dos PnL é o resultado da carteira
+    assert sum(t["pnl"] for t in trades) == pytest.approx(result["equity"][-1] - 1000)
+
+def test_open_trades_have_no_exit():
+    matrix = make_matrix(n_symbols=2, n_dates=10)
+    states = np.ones_like(matrix["close"], dtype=bool)
+
+    trades = run_portfolio_backtest(matrix, states, initial_cash=1000)["trades"]
+
+    assert [t["ticker"] for t in trades] == ["S0", "S1"]
+    for i, t in enumerate(trades):
+        assert t["exit_date"] is None and t["pnl"] is None
+        # Metade do capital no fechamento do primeiro candle
+        assert t["entry_price"] == matrix["close"][i, 0]
+        assert t["size"] == pytest.approx(500 / matrix["close"][i, 0])
+
+def test_missing_prices_are_not_held():
+    matrix = make_matrix(n_symbols=3, n_dates=50)
+    matrix["close"][1, :20] = np.nan
+    states = build_portfolio_states(matrix, "sma_cross", {"fast": 3, "slow": 5})
+
+    result = run_portfolio_backtest(matrix, states)
+
+    assert (result["weights"][1, :20] == 0).all()
+    assert np.isfinite(result["equity"]).all()
+    assert np.all(result["exposure"] <= 1 + 1e-12)
+
+@pytest.mark.parametrize("strategy_type", ["sma_cross", "donchian_breakout", "momentum"])
+def test_states_shape(strategy_type):
+    matrix = make_matrix()
+    states = build_portfolio_states(matrix, strategy_type, {"lookback": 20})
+    assert states.shape == matrix["close"].shape
+    assert states.dtype == bool
+
+def test_states_ignore_local_variable_names():
+    # "close" é variável local de momentum_states, não parâmetro
+    matrix = make_matrix()
+    expected = build_portfolio_states(matrix, "momentum", {"lookback": 20})
+    np.testing.assert_array_equal(build_portfolio_states(matrix, "momentum", {"lookback": 20, "close": 0}), expected)
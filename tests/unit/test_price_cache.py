@@ -0,0 +1,73 @@
+from datetime import date
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+from app.services.price_cache import PriceCache
+
+V1 = (0, date(2020, 12, 31))
+
+def make_arrays(start="2020-01-01", periods=10):
+    dates = pd.bdate_range(start, periods=periods).to_numpy().astype("datetime64[D]")
+    close = np.arange(periods, dtype=float)
+    return {"date": dates, "open": close, "high": close, "low": close, "close": close, "volume": close}
+
+def test_contained_range_is_served_by_slice():
+    cache = PriceCache()
+    cache.put(1, date(2020, 1, 1), date(2020, 12, 31), make_arrays(), V1)
+    hit = cache.get(1, "2020-01-03", "2020-01-07", V1)
+    assert list(hit["close"]) == [2.0, 3.0, 4.0]
+    assert hit["close"].base is not None  # fatia, sem cópia
+    assert cache.get(1, "2019-12-01", "2020-01-07", V1) is None
+    assert cache.get(2, "2020-01-03", "2020-01-07", V1) is None
+
+def test_lru_eviction_respects_byte_budget():
+    entry_bytes = sum(a.nbytes for a in make_arrays().values())
+    cache = PriceCache(max_bytes=2 * entry_bytes)
+    for symbol_id in (1, 2):
+        cache.put(symbol_id, date(2020, 1, 1), date(2020, 12, 31), make_arrays(), V1)
+    cache.get(1, "2020-01-01", "2020-01-02", V1)  # 1 passa a ser o mais recente
+    cache.put(3, date(2020, 1, 1), date(2020, 12, 31), make_arrays(), V1)
+    assert cache.nbytes <= cache.max_bytes
+    assert cache.get(2, "2020-01-01", "2020-01-02", V1) is None
+    assert cache.get(1, "2020-01-01", "2020-01-02", V1) is not None
+
+def test_entries_of_another_version_are_dropped():
+    cache = PriceCache()
+    cache.put(1, date(2020, 1, 1), date.max, make_arrays(), V1)
+    assert cache.get(1, date(2020, 1, 1), date.max, V1) is not None
+
+    # Outro processo gravou o candle seguinte (ou corrigiu um antigo): a versão mudou
+    assert cache.get(1, date(2020, 1, 1), date.max, (1, date(2021, 1, 4))) is None
+    assert cache.get(1, date(2020, 1, 1), date.max, V1) is None
+    assert cache.nbytes == 0
+
+def test_put_of_a_query_older_than_the_write_never_serves_the_new_version():
+    cache = PriceCache()
+    # Consulta iniciada antes de persist_prices (versão lida antes), guardada depois dele
+    cache.put(1, date(2020, 1, 1), date.max, make_arrays(), V1)
+    assert cache.get(1, date(2020, 1, 1), date.max, (1, date(2020, 12, 31))) is None
+
+def test_load_rereads_after_a_write_from_another_process():
+    engine = create_engine("sqlite://", future=True)
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE symbols (id INTEGER PRIMARY KEY, prices_version INTEGER NOT NULL DEFAULT 0)"))
+        conn.execute(text("CREATE TABLE prices (symbol_id INTEGER, date DATE, open REAL, high REAL, low REAL, "
+                          "close REAL, volume REAL)"))
+        conn.execute(text("INSERT INTO symbols (id) VALUES (1)"))
+    cache = PriceCache()
+    # sqlite não tem ::float8; a consulta de preços é trocada por uma equivalente
+    cache._query = lambda symbol_id, start, end: (
+        text("SELECT date, open, high, low, close, volume FROM prices WHERE symbol_id = :s ORDER BY date"),
+        {"s": symbol_id})
+
+    def write(day, close):
+        with engine.begin() as conn:
+            conn.execute(text("INSERT INTO prices VALUES (1, :d, :c, :c, :c, :c, 100)"), {"d": day, "c": close})
+            conn.execute(text("UPDATE symbols SET prices_version = prices_version + 1 WHERE id = 1"))
+
+    write("2024-01-02", 10.0)
+    with Session(engine) as db:
+        assert list(cache.load(db, 1)["close"]) == [10.0]
+        write("2024-01-03", 11.0)  # sem invalidate neste processo
+        assert list(cache.load(db, 1)["close"]) == [10.0, 11.0]
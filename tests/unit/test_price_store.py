@@ -0,0 +1,121 @@
+import pickle
+import numpy as np
+import pandas as pd
+from app.services import data_service
+from app.services.price_store import PriceStore
+
+def make_ohlcv(start, end):
+    dates = pd.bdate_range(start, end, inclusive="left")
+    close = np.arange(len(dates), dtype=float) + 10
+    return pd.DataFrame({
+        "date": dates, "close": close, "high": close + 1, "low": close - 1, "open": close, "volume": 1000,
+    })
+
+def test_missing_ranges_and_merge(tmp_path):
+    store = PriceStore(str(tmp_path))
+    assert store.missing_ranges("AAPL", "2020-01-01", "2020-03-01") == [("2020-01-01", "2020-03-01")]
+
+    store.write("AAPL", make_ohlcv("2020-01-01", "2020-01-20"), "2020-01-01", "2020-01-20")
+    store.write("AAPL", make_ohlcv("2020-02-01", "2020-02-10"), "2020-02-01", "2020-02-10")
+
+    assert store.missing_ranges("AAPL", "2020-01-05", "2020-03-01") == [
+        ("2020-01-20", "2020-02-01"), ("2020-02-10", "2020-03-01"),
+    ]
+    store.write("AAPL", make_ohlcv("2020-01-15", "2020-02-05"), "2020-01-15", "2020-02-05")
+    assert store.coverage("AAPL") == [("2020-01-01", "2020-02-10")]
+
+    df = store.read("AAPL", "2020-01-01", "2020-02-10")
+    assert df["date"].is_monotonic_increasing
+    assert not df["date"].duplicated().any()
+
+def test_read_slices_and_projects_columns(tmp_path):
+    store = PriceStore(str(tmp_path))
+    store.write("MSFT", make_ohlcv("2019-01-01", "2021-01-01"), "2019-01-01", "2021-01-01")
+
+    df = store.read("MSFT", "2020-03-02", "2020-03-07", columns=["close"])
+
+    assert list(df.columns) == ["date", "close"]
+    assert list(df["date"].dt.strftime("%Y-%m-%d")) == [
+        "2020-03-02", "2020-03-03", "2020-03-04", "2020-03-05", "2020-03-06",
+    ]
+
+def test_fetch_downloads_only_gaps(tmp_path, monkeypatch):
+    monkeypatch.setattr(data_service, "price_store", PriceStore(str(tmp_path / "arrow")))
+    monkeypatch.setattr(data_service, "CACHE_DIR", str(tmp_path))
+    calls = []
+    def fake_download(ticker, start, end):
+        calls.append((start, end))
+        return make_ohlcv(start, end)
+    monkeypatch.setattr(data_service, "download_ohlcv", fake_download)
+
+    data_service.fetch_ohlcv("PETR4.SA", "2023-01-01", "2023-06-30")
+    df = data_service.fetch_ohlcv("PETR4.SA", "2023-03-01", "2023-08-01")
+
+    assert calls == [("2023-01-01", "2023-06-30"), ("2023-06-30", "2023-08-01")]
+    assert df["date"].iloc[0] == pd.Timestamp("2023-03-01")
+    assert df["date"].iloc[-1] == pd.Timestamp("2023-07-31")
+
+def test_imports_legacy_pickles(tmp_path, monkeypatch):
+    monkeypatch.setattr(data_service, "price_store", PriceStore(str(tmp_path / "arrow")))
+    monkeypatch.setattr(data_service, "CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(data_service, "download_ohlcv", lambda *a: (_ for _ in ()).throw(AssertionError("download")))
+    legacy = make_ohlcv("2020-01-01", "2020-12-31")
+    legacy.columns = pd.MultiIndex.from_tuples([(c, "" if c == "date" else "AAPL") for c in legacy.columns])
+    with open(tmp_path / "AAPL_2020-01-01_2020-12-31.pkl", "wb") as f:
+        pickle.dump(legacy, f)
+
+    df = data_service.fetch_ohlcv("AAPL", "2020-06-01", "2020-07-01")
+
+    assert len(df) == 22
+    # Os pickles antigos não são apagados
+    assert [p.name for p in tmp_path.glob("*.pkl")] == ["AAPL_2020-01-01_2020-12-31.pkl"]
+
+class StubProvider:
+    def __init__(self, fail_times=0):
+        self.calls = []
+        self.fail_times = fail_times
+
+    def download(self, tickers, start, end):
+        self.calls.append((tuple(tickers), start, end))
+        if self.fail_times:
+            self.fail_times -= 1
+            raise ConnectionError("rate limited")
+        return {t: make_ohlcv(start, end) for t in tickers if t != "MISSING"}
+
+def test_fetch_many_batches_by_gap_and_streams(tmp_path, monkeypatch):
+    monkeypatch.setattr(data_service, "price_store", PriceStore(str(tmp_path / "arrow")))
+    monkeypatch.setattr(data_service, "CACHE_DIR", str(tmp_path))
+    data_service.price_store.write("C", make_ohlcv("2023-01-01", "2023-03-01"), "2023-01-01", "2023-03-01")
+    provider = StubProvider()
+
+    frames = dict(data_service.fetch_ohlcv_many(
+        ["A", "B", "C", "D", "MISSING"], "2023-01-01", "2023-03-01",
+        provider=provider, batch_size=2, max_workers=2, rate_limit=0,
+    ))
+
+    assert sorted(frames) == ["A", "B", "C", "D", "MISSING"]
+    assert frames["MISSING"].empty
+    assert len(frames["A"]) == len(frames["C"]) > 0
+    assert sorted(c[0] for c in provider.calls) == [("A", "B"), ("D", "MISSING")]
+
+def test_fetch_many_retries_with_backoff(tmp_path, monkeypatch):
+    monkeypatch.setattr(data_service, "price_store", PriceStore(str(tmp_path / "arrow")))
+    monkeypatch.setattr(data_service, "CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(data_service.time, "sleep", lambda s: None)
+    provider = StubProvider(fail_times=2)
+
+    frames = dict(data_service.fetch_ohlcv_many(["A"], "2023-01-01", "2023-02-01", provider=provider, max_retries=2))
+
+    assert len(provider.calls) == 3
+    assert not frames["A"].empty
+
+def test_fetch_many_yields_the_error_of_a_failed_batch(tmp_path, monkeypatch):
+    monkeypatch.setattr(data_service, "price_store", PriceStore(str(tmp_path / "arrow")))
+    monkeypatch.setattr(data_service, "CACHE_DIR", str(tmp_path))
+    provider = StubProvider(fail_times=1)
+
+    frames = dict(data_service.fetch_ohlcv_many(["A", "B"], "2023-01-01", "2023-02-01", provider=provider,
+                                                max_retries=0, rate_limit=0))
+
+    # Falha não é confundida com intervalo sem candles
+    assert all(isinstance(frames[t], ConnectionError) for t in ("A", "B"))
@@ -0,0 +1,97 @@
+import os
+from datetime import date, timedelta
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+from app.db.models import Backtest, BacktestStatus
+from app.services import result_cache
+from app.services.price_cache import PriceCache
+from app.services.result_cache import backtest_key, find_reusable, normalize_request, request_hash, strategy_code_version
+
+# Postgres já migrado (data_version usa md5/string_agg); sem ele os testes de banco são pulados
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+BASE = {
+    "ticker": "PETR4.SA", "start_date": "2020-01-01", "end_date": "2021-01-01", "strategy_type": "sma_cross",
+    "strategy_params": {"fast": 10, "slow": 50}, "initial_cash": 100000, "commission": 0.001,
+    "timeframe": "1d", "engine": "vectorized",
+}
+
+def test_equivalent_requests_share_the_key():
+    variant = {**BASE, "start_date": date(2020, 1, 1), "strategy_type": "SMA_Cross",
+               "strategy_params": {"slow": 50, "fast": 10}, "initial_cash": 100000.0}
+    code = strategy_code_version()
+    assert request_hash(normalize_request(BASE), "v1", code) == request_hash(normalize_request(variant), "v1", code)
+
+def test_key_changes_with_params_data_and_code():
+    code = strategy_code_version()
+    key = request_hash(normalize_request(BASE), "v1", code)
+    assert key != request_hash(normalize_request({**BASE, "strategy_params": {"fast": 20, "slow": 50}}), "v1", code)
+    assert key != request_hash(normalize_request(BASE), "v2", code)
+    assert key != request_hash(normalize_request(BASE), "v1", "outro")
+
+@pytest.fixture
+def pg_db(monkeypatch):
+    """Sessão numa transação desfeita ao fim do teste."""
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL não definido")
+    engine = create_engine(TEST_DATABASE_URL)
+    conn = engine.connect()
+    transaction = conn.begin()
+    monkeypatch.setattr(result_cache, "price_cache", PriceCache())
+    db = Session(bind=conn, join_transaction_mode="create_savepoint")
+    try:
+        yield db
+    finally:
+        db.close()
+        transaction.rollback()
+        conn.close()
+        engine.dispose()
+
+def add_prices(db, ticker, closes, start=date(2020, 1, 1)):
+    symbol_id = db.execute(text(
+        "INSERT INTO symbols (ticker, name, exchange, currency) VALUES (:ticker, :ticker, '', '') RETURNING id"
+    ), {"ticker": ticker}).scalar()
+    for i, close in enumerate(closes):
+        db.execute(text(
+            "INSERT INTO prices (symbol_id, date, open, high, low, close, volume) "
+            "VALUES (:symbol_id, :date, :close, :close, :close, :close, 1000)"
+        ), {"symbol_id": symbol_id, "date": start + timedelta(days=i), "close": close})
+    return symbol_id
+
+def set_close(db, symbol_id, day, close):
+    db.execute(text("UPDATE prices SET close = :close WHERE symbol_id = :symbol_id AND date = :date"),
+               {"close": close, "symbol_id": symbol_id, "date": day})
+
+def test_backtest_key_follows_prices_of_the_ticker_in_range(pg_db):
+    a = add_prices(pg_db, "TEST.A", [10, 11, 12, 13])
+    b = add_prices(pg_db, "TEST.B", [20, 21, 22, 23])
+    normalized = normalize_request({**BASE, "ticker": "TEST.A", "start_date": "2020-01-01", "end_date": "2020-01-03"})
+    key = backtest_key(pg_db, normalized)
+
+    set_close(pg_db, b, date(2020, 1, 2), 99)   # outro símbolo
+    set_close(pg_db, a, date(2020, 1, 4), 99)   # fora do intervalo
+    assert backtest_key(pg_db, normalized) == key
+
+    set_close(pg_db, a, date(2020, 1, 2), 11.5)  # correção dentro do intervalo
+    assert backtest_key(pg_db, normalized) != key
+
+def test_find_reusable_prefers_completed_and_skips_failed(pg_db):
+    add_prices(pg_db, "TEST.A", [10, 11, 12])
+    key = backtest_key(pg_db, normalize_request({**BASE, "ticker": "TEST.A"}))
+
+    def add(status):
+        backtest = Backtest(ticker="TEST.A", start_date=date(2020, 1, 1), end_date=date(2021, 1, 1),
+                            strategy_type="sma_cross", strategy_params_json={}, initial_cash=100000, commission=0.001,
+                            timeframe="1d", engine="vectorized", status=status, request_hash=key)
+        pg_db.add(backtest)
+        pg_db.flush()
+        return backtest
+
+    add(BacktestStatus.FAILED)
+    assert find_reusable(pg_db, key) is None
+    pending = add(BacktestStatus.PENDING)
+    assert find_reusable(pg_db, key) is pending
+    completed = add(BacktestStatus.COMPLETED)
+    assert find_reusable(pg_db, key) is completed
+    assert find_reusable(pg_db, "outra-chave") is None
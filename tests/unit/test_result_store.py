@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+from datetime import date
+from app.services.result_store import equity_curve, encode_curve, decode_curve, result_metrics, TRADE_COLUMNS
+
+def _result(n=300):
+    rng = np.random.default_rng(3)
+    equity = 100000 * np.cumprod(1 + rng.normal(0, 0.01, n))
+    return {
+        "dates": pd.date_range("2020-01-01", periods=n, freq="B"),
+        "equity": equity,
+        "cash": equity * 0.5,
+        "position": np.full(n, 10.0),
+        "trades": [
+            {"entry_date": date(2020, 1, 2), "exit_date": date(2020, 2, 3), "side": "LONG", "entry_price": 10.0,
+             "exit_price": 11.0, "size": 100.0, "commission": 0.0, "pnl": 100.0},
+            {"entry_date": date(2020, 3, 2), "exit_date": date(2020, 4, 1), "side": "LONG", "entry_price": 10.0,
+             "exit_price": 9.5, "size": 100.0, "commission": 0.0, "pnl": -50.0},
+            {"entry_date": date(2020, 5, 4), "exit_date": None, "side": "LONG", "entry_price": 10.0,
+             "exit_price": None, "size": 100.0, "commission": 0.0, "pnl": None},
+        ],
+    }
+
+def test_curve_blob_roundtrip():
+    curve = equity_curve(_result())
+    decoded = decode_curve(encode_curve(curve))
+    assert decoded["date"].dtype == np.dtype("datetime64[D]")
+    for name, values in curve.items():
+        np.testing.assert_array_equal(decoded[name], values)
+    assert decoded["drawdown"].max() == 0.0
+
+def test_result_metrics_ignores_open_trades():
+    result = _result()
+    metrics = result_metrics(equity_curve(result), pd.DataFrame(result["trades"], columns=TRADE_COLUMNS))
+    assert metrics["num_trades"] == 3
+    assert metrics["win_rate"] == 0.5
+    assert np.isclose(metrics["avg_trade_return"], (0.1 - 0.05) / 2)
+    assert np.isclose(metrics["total_return"], result["equity"][-1] / result["equity"][0] - 1)
@@ -0,0 +1,97 @@
+import numpy as np
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.db.models import Base, BacktestStatus, RobustnessAnalysis
+from app.services import robustness
+from app.services.metrics import sharpe_ratio
+from app.services.robustness import resample, build_paths, run_robustness
+
+def test_resample_methods():
+    values = np.arange(1.0, 101.0)
+    rng = np.random.default_rng(0)
+
+    boot = resample(values, "bootstrap", 50, rng, block_size=10)
+    assert boot.shape == (50, 100)
+    assert np.isin(boot, values).all()
+    # Blocos circulares: dentro de cada bloco os valores são consecutivos (mod n)
+    assert (((np.diff(boot[:, :10], axis=1)) % 100) == 1).all()
+
+    shuffled = resample(values, "shuffle", 50, rng)
+    assert (np.sort(shuffled, axis=1) == values).all()
+
+    noisy = resample(values, "noise", 50, rng, noise_scale=0.0)
+    assert np.allclose(noisy, values)
+
+def test_build_paths_compounds_returns_and_sums_pnl():
+    equity = build_paths(np.array([[0.1, -0.5]]), "returns", 100.0)
+    assert np.allclose(equity, [[100.0, 110.0, 55.0]])
+    assert np.allclose(build_paths(np.array([10.0, -5.0]), "trades", 100.0), [100.0, 110.0, 105.0])
+
+def test_run_robustness_bands_and_determinism():
+    returns = np.random.default_rng(1).normal(0.0005, 0.01, 500)
+    result = run_robustness(returns, num_samples=300, seed=42, points=50, workers=1, batch_size=100)
+
+    observed = build_paths(returns, "returns", 100000)
+    assert np.isclose(result["observed"]["sharpe"], sharpe_ratio(observed))
+    summary = result["summary"]["sharpe"]
+    assert summary["p5"] <= summary["p50"] <= summary["p95"]
+    assert 0 <= result["probabilities"]["sharpe_le_0"] <= 1
+
+    bands = result["bands"]
+    assert len(bands["bar"]) == 50 and bands["bar"][0] == 0 and bands["bar"][-1] == 500
+    assert (bands["equity_p5"] <= bands["equity_p95"]).all()
+    assert (bands["drawdown_p95"] <= 0).all()
+    assert np.allclose(bands["equity_p50"][0], 100000)
+
+    again = run_robustness(returns, num_samples=300, seed=42, points=50, workers=1, batch_size=100)
+    assert again["summary"] == result["summary"]
+
+def test_trade_shuffle_keeps_final_pnl():
+    pnl = np.random.default_rng(2).normal(50, 500, 80)
+    result = run_robustness(pnl, source="trades", method="shuffle", num_samples=200, seed=1, workers=1)
+    assert set(result["summary"]) == {"total_return", "max_drawdown"}
+    assert np.isclose(result["summary"]["total_return"]["std"], 0.0, atol=1e-12)
+    assert np.isclose(result["summary"]["total_return"]["mean"], pnl.sum() / 100000)
+
+@pytest.fixture
+def job_session(monkeypatch):
+    engine = create_engine("sqlite://", future=True)
+    Base.metadata.create_all(bind=engine, tables=[RobustnessAnalysis.__table__])
+    factory = sessionmaker(bind=engine)
+    monkeypatch.setattr(robustness, "SessionLocal", factory)
+    equity = 100000 * np.cumprod(1 + np.random.default_rng(1).normal(0.0005, 0.01, 300))
+    dates = np.arange("2020-01-01", 300, dtype="datetime64[D]")
+    monkeypatch.setattr(robustness, "load_backtest_series",
+                        lambda db, backtest_id: {"date": dates, "equity": equity, "pnl": np.array([])})
+    # O job já roda num worker do executor: não pode abrir um pool aninhado
+    monkeypatch.setattr(robustness, "ROBUSTNESS_WORKERS", 8)
+    monkeypatch.setattr(robustness, "ProcessPoolExecutor", None)
+    db = factory()
+    yield db
+    db.close()
+
+def add_analysis(db, status=BacktestStatus.PENDING):
+    analysis = RobustnessAnalysis(backtest_id=1, method="bootstrap", source="returns", num_samples=300,
+                                  seed=7, status=status)
+    db.add(analysis)
+    db.commit()
+    return analysis
+
+def test_job_runs_batches_in_process(job_session, monkeypatch):
+    monkeypatch.setattr(robustness, "ROBUSTNESS_BATCH", 100)
+    analysis = add_analysis(job_session)
+
+    robustness.run_robustness_job(analysis.id)
+
+    job_session.refresh(analysis)
+    assert analysis.status == BacktestStatus.COMPLETED, analysis.message
+    assert analysis.summary["timing"] == {**analysis.summary["timing"], "workers": 1, "batches": 3}
+
+def test_cancelled_job_is_not_run(job_session):
+    analysis = add_analysis(job_session, BacktestStatus.CANCELLED)
+
+    robustness.run_robustness_job(analysis.id)
+
+    job_session.refresh(analysis)
+    assert analysis.status == BacktestStatus.CANCELLED and analysis.summary is None
@@ -0,0 +1,68 @@
+import json
+from types import SimpleNamespace
+import numpy as np
+import pyarrow as pa
+import pytest
+from app.services.indicator_service import params_hash
+from app.services.series_export import parse_columns, parse_series, encode_columns
+
+def make_columns():
+    return {
+        "date": np.array(["2024-01-02", "2024-01-03", "2024-01-04"], dtype="datetime64[D]"),
+        "SMA": np.array([np.nan, 10.5, 11.0]),
+        "volume": np.array([100, 200, 300], dtype=np.int64),
+    }
+
+def test_parse_series_matches_stored_hash():
+    column, name, h = parse_series(["SMA:period=50"])[0]
+    assert (column, name) == ("SMA:period=50", "SMA")
+    assert h == params_hash({"period": 50})
+    assert parse_series(["RSI"])[0][2] == params_hash({})
+    with pytest.raises(ValueError):
+        parse_series(["SMA:period"])
+
+def test_parse_columns_projection():
+    assert parse_columns("close, volume") == ["close", "volume"]
+    assert parse_columns(None) == ["open", "high", "low", "close", "volume"]
+    with pytest.raises(ValueError):
+        parse_columns("close,foo")
+
+def test_columnar_json_uses_null_for_missing_values():
+    body, media_type = encode_columns(make_columns(), "json", ticker="AAPL")
+    payload = json.loads(body)
+    assert media_type == "application/json"
+    assert payload["columns"] == ["date", "SMA", "volume"]
+    assert payload["data"]["date"][0] == "2024-01-02"
+    assert payload["data"]["SMA"] == [None, 10.5, 11.0]
+
+def test_arrow_round_trip():
+    body, media_type = encode_columns(make_columns(), "arrow", ticker="AAPL")
+    table = pa.ipc.open_stream(body).read_all()
+    assert media_type == "application/vnd.apache.arrow.stream"
+    assert table.schema.field("date").type == pa.date32()
+    assert table.column("SMA").null_count == 1
+    assert table.schema.metadata[b"ticker"] == b"AAPL"
+
+def test_unknown_format_is_rejected():
+    with pytest.raises(ValueError):
+        encode_columns(make_columns(), "xml")
+
+def test_price_columns_keyset_pagination():
+    from datetime import date
+    from app.services.price_cache import price_cache
+    from app.services.series_export import load_price_columns
+    dates = np.array(["2024-01-02", "2024-01-03", "2024-01-04", "2024-01-05"], dtype="datetime64[D]")
+    values = np.arange(4, dtype=float)
+    version = (0, date(2024, 1, 5))
+    price_cache.put(-1, date(2024, 1, 1), date(2024, 12, 31),
+                    {"date": dates, "open": values, "high": values, "low": values, "close": values, "volume": values},
+                    version)
+    # Só a consulta de versão chega ao "banco": os preços vêm do cache
+    db = SimpleNamespace(execute=lambda *args: SimpleNamespace(one_or_none=lambda: version))
+    try:
+        page = load_price_columns(db, -1, date(2024, 1, 1), date(2024, 12, 31), ["close"],
+                                  after=date(2024, 1, 2), limit=2)
+        assert list(page["close"]) == [1.0, 2.0]
+        assert str(page["date"][-1]) == "2024-01-04"
+    finally:
+        price_cache.invalidate(-1)
@@ -0,0 +1,71 @@
+from datetime import date
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.db.models import Base, BacktestStatus, Sweep, SweepResult
+from app.services import sweep as sweep_module
+from app.services.strategies import build_signals, atr_stop, strategy_param_names
+from app.services.sweep import RESULT_METRICS, expand_grid, result_order, run_sweep
+from app.services.vectorized_engine import run_vectorized_backtest
+from app.services.metrics import sharpe_ratio
+from tests.unit.test_vectorized_engine import make_prices
+
+def test_expand_grid_ranges_and_filters_invalid_sma():
+    combos = expand_grid("sma_cross", {"fast": {"start": 10, "stop": 30, "step": 10}, "slow": [20, 40]})
+    assert {(c["fast"], c["slow"]) for c in combos} == {(10, 20), (10, 40), (20, 40), (30, 40)}
+
+def test_strategy_param_names_skip_dataframe_and_cache():
+    # Parâmetros do grid são os argumentos depois do DataFrame; `cache` é infraestrutura
+    assert strategy_param_names("SMA_Cross") == ("fast", "slow")
+    assert strategy_param_names("donchian_breakout") == ("lookback_high", "lookback_low")
+
+def test_expand_grid_rejects_unknown_param():
+    with pytest.raises(ValueError):
+        expand_grid("donchian_breakout", {"fast": [10]})
+
+def test_sweep_matches_individual_runs():
+    df = make_prices(800)
+    grid = {"fast": [5, 10, 20], "slow": [40, 60], "atr_multiplier": [1.0, 2.0]}
+    results = run_sweep(df, "sma_cross", grid)
+
+    assert len(results) == 12
+    assert list(results["rank"]) == list(range(1, 13))
+    assert results["sharpe"].is_monotonic_decreasing
+
+    best = results.iloc[0]
+    params = best["params"]
+    signals = build_signals(df, "sma_cross", params)
+    stop_distance = atr_stop(df, multiplier=params["atr_multiplier"])
+    single = run_vectorized_backtest(df, signals, stop_distance)
+    assert best["sharpe"] == pytest.approx(sharpe_ratio(single["equity"]))
+    assert best["num_trades"] == len(single["trades"])
+
+def test_sweep_job_persists_every_metric(monkeypatch):
+    engine = create_engine("sqlite://", future=True)
+    Base.metadata.create_all(bind=engine, tables=[Sweep.__table__, SweepResult.__table__])
+    factory = sessionmaker(bind=engine)
+    monkeypatch.setattr(sweep_module, "SessionLocal", factory)
+    monkeypatch.setattr(sweep_module, "load_price_frame", lambda db, ticker, start, end: make_prices(400))
+    db = factory()
+    sweep = Sweep(ticker="AAPL", start_date=date(2020, 1, 1), end_date=date(2021, 1, 1), strategy_type="sma_cross",
+                  param_grid={"fast": [5, 10], "slow": [40]}, initial_cash=100000, commission=0.0)
+    db.add(sweep)
+    db.commit()
+
+    sweep_module.run_sweep_job(sweep.id)
+
+    db.refresh(sweep)
+    assert sweep.status == BacktestStatus.COMPLETED
+    expected = run_sweep(make_prices(400), "sma_cross", sweep.param_grid)
+    stored = db.query(SweepResult).order_by(SweepResult.rank).all()
+    assert len(stored) == len(expected) == 2
+    for row, (_, exp) in zip(stored, expected.iterrows()):
+        for name in RESULT_METRICS:
+            assert getattr(row, name) == pytest.approx(exp[name])
+
+    # Giro: menor primeiro; drawdown (negativo): maior primeiro
+    by_turnover = [r.turnover for r in db.query(SweepResult).order_by(result_order("turnover"))]
+    assert by_turnover == sorted(by_turnover)
+    by_drawdown = [r.max_drawdown for r in db.query(SweepResult).order_by(result_order("max_drawdown"))]
+    assert by_drawdown == sorted(by_drawdown, reverse=True)
+    db.close()
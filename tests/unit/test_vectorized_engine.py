@@ -0,0 +1,62 @@
+import pandas as pd
+import numpy as np
+import pytest
+from app.services.strategies import build_signals, atr_stop
+from app.services.vectorized_engine import run_vectorized_backtest
+from app.services.backtest_runner import run_backtrader_backtest
+
+def make_prices(n=1500, seed=7):
+    rng = np.random.default_rng(seed)
+    close = 50 * np.exp(np.cumsum(rng.normal(0.0003, 0.02, n)))
+    open_ = close * (1 + rng.normal(0, 0.005, n))
+    high = np.maximum(open_, close) * (1 + rng.uniform(0, 0.01, n))
+    low = np.minimum(open_, close) * (1 - rng.uniform(0, 0.01, n))
+    return pd.DataFrame(
+        {"open": open_, "high": high, "low": low, "close": close, "volume": 1000.0},
+        index=pd.bdate_range("2010-01-01", periods=n, name="date"),
+    )
+
+def test_momentum_signals_have_no_look_ahead():
+    df = make_prices(800)
+    params = {"lookback": 30, "percentile_threshold": 60}
+    full = build_signals(df, "momentum", params)
+    # Sinal do candle t não muda quando os candles depois de t não existem
+    for k in (200, 500):
+        np.testing.assert_array_equal(build_signals(df.iloc[:k], "momentum", params).to_numpy(), full.iloc[:k].to_numpy())
+    assert (full != 0).any()
+
+@pytest.mark.parametrize("strategy_type,params", [
+    ("sma_cross", {"fast": 10, "slow": 40}),
+    ("donchian_breakout", {"lookback_high": 20, "lookback_low": 10}),
+    ("momentum", {"lookback": 30, "percentile_threshold": 60}),
+])
+@pytest.mark.parametrize("commission", [0.0, 0.001])
+def test_parity_with_backtrader(strategy_type, params, commission):
+    df = make_prices()
+    signals = build_signals(df, strategy_type, params)
+    stop_distance = atr_stop(df, multiplier=1.0)
+
+    expected = run_backtrader_backtest(df, signals, stop_distance, 100000, commission)
+    result = run_vectorized_backtest(df, signals, stop_distance, 100000, commission)
+
+    assert len(result["trades"]) == len(expected["trades"]) > 0
+    for got, exp in zip(result["trades"], expected["trades"]):
+        assert got["entry_date"] == exp["entry_date"]
+        assert got["exit_date"] == exp["exit_date"]
+        assert got["size"] == exp["size"]
+        assert got["entry_price"] == pytest.approx(exp["entry_price"])
+        assert got["commission"] == pytest.approx(exp["commission"])
+    np.testing.assert_allclose(result["position"], expected["position"])
+    np.testing.assert_allclose(result["cash"], expected["cash"])
+    np.testing.assert_allclose(result["equity"], expected["equity"])
+
+def test_rejects_order_without_cash():
+    df = make_prices(300)
+    signals = build_signals(df, "sma_cross", {"fast": 5, "slow": 20})
+    stop_distance = atr_stop(df, multiplier=0.01)
+
+    expected = run_backtrader_backtest(df, signals, stop_distance, 100000, 0.0)
+    result = run_vectorized_backtest(df, signals, stop_distance, 100000, 0.0)
+
+    assert len(result["trades"]) == len(expected["trades"]) == 0
+    np.testing.assert_allclose(result["equity"], 100000)
@@ -0,0 +1,66 @@
+from datetime import date
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.db.models import Base, BacktestStatus, WalkForward
+from app.services import walk_forward
+from app.services.walk_forward import make_folds, run_walk_forward, share_prices, attach_prices
+from tests.unit.test_vectorized_engine import make_prices
+
+def test_make_folds_rolling_and_anchored():
+    assert make_folds(1000, 400, 250) == [(0, 400, 400, 650), (250, 650, 650, 900), (500, 900, 900, 1000)]
+    assert [f[0] for f in make_folds(1000, 400, 250, anchored=True)] == [0, 0, 0]
+    assert make_folds(401, 400, 250) == []
+
+def test_walk_forward_stitches_out_of_sample_folds():
+    df = make_prices(1200)
+    grid = {"fast": [5, 10], "slow": [40, 80]}
+    result = run_walk_forward(df, "sma_cross", grid, train_bars=400, test_bars=200, workers=1)
+
+    assert len(result["folds"]) == 4
+    assert len(result["equity"]) == len(result["dates"]) == 800
+    assert result["equity"][0] == 100000
+    assert pd.DatetimeIndex(result["dates"])[0] == df.index[400]
+    for fold in result["folds"]:
+        assert fold["params"] in [{"fast": f, "slow": s} for f in (5, 10) for s in (40, 80)]
+        assert fold["optimize_ms"] >= 0 and fold["test_ms"] >= 0
+    # Encadeamento: o retorno total é o produto dos retornos de cada fold
+    folds_return = np.prod([1 + f["out_of_sample"]["total_return"] for f in result["folds"]]) - 1
+    assert np.isclose(result["metrics"]["total_return"], folds_return)
+
+def test_shared_prices_roundtrip():
+    df = make_prices(50)
+    shm, spec = share_prices(df)
+    try:
+        view_shm, shared = attach_prices(spec)
+        np.testing.assert_array_equal(shared["close"].to_numpy(), df["close"].to_numpy())
+        assert (shared.index == df.index).all()
+        del shared
+        view_shm.close()
+    finally:
+        shm.close()
+        shm.unlink()
+
+def test_job_evaluates_folds_in_process(monkeypatch):
+    engine = create_engine("sqlite://", future=True)
+    Base.metadata.create_all(bind=engine, tables=[WalkForward.__table__])
+    factory = sessionmaker(bind=engine)
+    monkeypatch.setattr(walk_forward, "SessionLocal", factory)
+    monkeypatch.setattr(walk_forward, "load_price_frame", lambda db, ticker, start, end: make_prices(1000))
+    # O job já roda num worker do executor: não pode abrir um pool aninhado
+    monkeypatch.setattr(walk_forward, "WALK_FORWARD_WORKERS", 8)
+    monkeypatch.setattr(walk_forward, "ProcessPoolExecutor", None)
+    db = factory()
+    wf = WalkForward(ticker="AAPL", start_date=date(2020, 1, 1), end_date=date(2024, 1, 1),
+                     strategy_type="sma_cross", param_grid={"fast": [5], "slow": [40]}, train_bars=400,
+                     test_bars=200, initial_cash=100000, commission=0.0)
+    db.add(wf)
+    db.commit()
+
+    walk_forward.run_walk_forward_job(wf.id)
+
+    db.refresh(wf)
+    assert wf.status == BacktestStatus.COMPLETED, wf.message
+    assert wf.metrics["workers"] == 1 and wf.metrics["num_folds"] == 3
+    db.close()